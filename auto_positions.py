@@ -0,0 +1,192 @@
+"""
+Filling in missing phrase positions (at_start/at_end and ot_start/ot_end).
+
+Annotations imported without span offsets get the position of the first
+occurrence of their aspect and opinion terms in the text (the same result
+as text.find). Each distinct term of an item is searched once; an item with
+many terms is matched in one pass over its text with an Aho-Corasick
+automaton if pyahocorasick (pip install pyahocorasick) is installed. For a
+few terms a C-level str.find per term is faster than any automaton, so
+that is what is used otherwise.
+
+Large datasets are split into chunks that are matched in a process pool,
+so the work neither holds the server's GIL nor is limited to one core.
+main.py runs this as a background job (POST /auto-add-positions returns
+a Job id, GET /auto-add-positions/{job_id} reports its progress) and saves
+the results with one write.
+"""
+import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+try:
+    import ahocorasick
+except ImportError:  # optional dependency
+    ahocorasick = None
+
+TERM_KEYS = (("aspect_term", "at_start", "at_end"), ("opinion_term", "ot_start", "ot_end"))
+CHUNK_SIZE = 5000
+# Below this many items the chunks are matched in the calling thread (starting processes costs more)
+MIN_ITEMS_FOR_POOL = 50000
+# From this many distinct terms in one text, one automaton pass beats a str.find per term
+MIN_PHRASES_FOR_AUTOMATON = 8
+
+
+def first_occurrences(text, phrases):
+    """Start index of the first occurrence of each phrase that occurs in text."""
+    if ahocorasick is None or len(phrases) < MIN_PHRASES_FOR_AUTOMATON:
+        starts = {}
+        for phrase in phrases:
+            index = text.find(phrase)
+            if index != -1:
+                starts[phrase] = index
+        return starts
+
+    automaton = ahocorasick.Automaton()
+    for phrase in phrases:
+        automaton.add_word(phrase, phrase)
+    automaton.make_automaton()
+    starts = {}
+    # Matches are reported by end index; for one phrase that is also the order of their starts
+    for end, phrase in automaton.iter(text):
+        if phrase not in starts:
+            starts[phrase] = end - len(phrase) + 1
+            if len(starts) == len(phrases):
+                break
+    return starts
+
+
+def parse_label(label):
+    """The annotations of a label (a list or its JSON string); None if there are none."""
+    if isinstance(label, str):
+        if not label:
+            return None
+        try:
+            label = json.loads(label)
+        except json.JSONDecodeError:
+            return None
+    return label if isinstance(label, list) else None
+
+
+def missing_phrases(annotations):
+    """The aspect and opinion terms of the annotations that lack their positions."""
+    phrases = set()
+    for annotation in annotations:
+        if not isinstance(annotation, dict):
+            continue
+        for term_key, start_key, end_key in TERM_KEYS:
+            phrase = annotation.get(term_key)
+            if (isinstance(phrase, str) and phrase and phrase != "NULL"
+                    and not (start_key in annotation and end_key in annotation)):
+                phrases.add(phrase)
+    return phrases
+
+
+def fill_chunk(tasks):
+    """Fill the positions of a chunk of (idx, text, annotations) tasks.
+
+    Returns (idx, annotations, number of positions added) for the items that changed.
+    """
+    results = []
+    for idx, text, annotations in tasks:
+        phrases = missing_phrases(annotations)
+        if not phrases:
+            continue
+        starts = first_occurrences(text, phrases)
+        added = 0
+        for annotation in annotations:
+            if not isinstance(annotation, dict):
+                continue
+            for term_key, start_key, end_key in TERM_KEYS:
+                phrase = annotation.get(term_key)
+                if (not isinstance(phrase, str) or phrase not in starts
+                        or (start_key in annotation and end_key in annotation)):
+                    continue
+                annotation[start_key] = starts[phrase]
+                annotation[end_key] = starts[phrase] + len(phrase) - 1
+                added += 1
+        if added:
+            results.append((idx, annotations, added))
+    return results
+
+
+def fill_positions(tasks, progress=None, cancelled=None, processes=None):
+    """Fill the positions of all (idx, text, annotations) tasks, in a process pool for large inputs.
+
+    progress(number of tasks done) is called after every chunk; the work stops early
+    once cancelled() returns True. Returns (idx, annotations, added) of the changed items.
+    """
+    chunks = [tasks[start:start + CHUNK_SIZE] for start in range(0, len(tasks), CHUNK_SIZE)]
+    processes = min(processes or os.cpu_count() or 1, len(chunks))
+    results, done = [], 0
+
+    if processes <= 1 or len(tasks) < MIN_ITEMS_FOR_POOL:
+        for chunk in chunks:
+            if cancelled and cancelled():
+                break
+            results.extend(fill_chunk(chunk))
+            done += len(chunk)
+            if progress:
+                progress(done)
+        return results
+
+    # spawn: forking a server process with running threads could copy held locks
+    with ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = {pool.submit(fill_chunk, chunk): len(chunk) for chunk in chunks}
+        for future in as_completed(futures):
+            results.extend(future.result())
+            done += futures[future]
+            if progress:
+                progress(done)
+            if cancelled and cancelled():
+                pool.shutdown(cancel_futures=True)
+                break
+    return results
+
+
+class Job:
+    """State of one auto-positions run, readable from any thread."""
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex[:12]
+        self.status = "queued"  # queued, running, completed, failed or cancelled
+        self.total_items = 0
+        self.processed_items = 0
+        self.updated_items = 0
+        self.added_positions = 0
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.cancel_requested = False
+        self._lock = threading.Lock()
+
+    @property
+    def active(self):
+        return self.status in ("queued", "running")
+
+    def update(self, **fields):
+        with self._lock:
+            for key, value in fields.items():
+                setattr(self, key, value)
+            if not self.active and self.finished_at is None:
+                self.finished_at = time.time()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "job_id": self.id,
+                "status": self.status,
+                "total_items": self.total_items,
+                "processed_items": self.processed_items,
+                "progress": round(self.processed_items / self.total_items, 4) if self.total_items else (
+                    0.0 if self.active else 1.0),
+                "updated_items": self.updated_items,
+                "added_positions": self.added_positions,
+                "error": self.error,
+                "created_at": self.created_at,
+                "finished_at": self.finished_at,
+            }
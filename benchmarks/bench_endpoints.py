@@ -0,0 +1,147 @@
+"""
+Endpoint latency benchmark for the FastAPI backend.
+
+Generates synthetic datasets (see synthetic_data.py), points main.py at a
+temporary copy and drives the endpoints in-process through FastAPI's
+TestClient. For every endpoint it reports p50/p95/p99 latency and the peak
+Python allocation of a single request (tracemalloc), plus the process RSS.
+
+Usage (from the repository root, requires httpx for the TestClient):
+    python benchmarks/bench_endpoints.py --sizes 1000 10000 --formats json csv
+    python benchmarks/bench_endpoints.py --compare old.json new.json
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from common import compare_reports, max_rss_mb, summarize, write_report
+from synthetic_data import ASPECTS, generate
+
+# Polling interval of the auto-positions job status
+JOB_POLL_SECONDS = 0.01
+
+ENDPOINTS = ["settings", "data", "annotations", "timing", "avg-annotation-time", "auto-add-positions", "search"]
+
+
+def _request(client, endpoint, n_items, rng):
+    idx = rng.randrange(n_items)
+    if endpoint == "settings":
+        return client.get("/settings")
+    if endpoint == "data":
+        return client.get(f"/data/{idx}")
+    if endpoint == "annotations":
+        value = [{"aspect_term": "NULL", "aspect_category": "food quality",
+                  "sentiment_polarity": "positive", "opinion_term": "great"}]
+        return client.post(f"/annotations/{idx}", json={"name": "bench", "value": value})
+    if endpoint == "timing":
+        return client.post(f"/timing/{idx}", json={"duration": round(rng.uniform(1, 30), 2), "change": True})
+    if endpoint == "avg-annotation-time":
+        return client.get("/avg-annotation-time")
+    if endpoint == "auto-add-positions":
+        # The endpoint only starts a background job; wait for it, so the scan and the save are measured
+        response = client.post("/auto-add-positions")
+        job_id = response.json().get("job_id") if response.status_code < 400 else None
+        if job_id is None:
+            return response
+        while True:
+            response = client.get(f"/auto-add-positions/{job_id}")
+            if response.status_code >= 400 or response.json()["status"] not in ("queued", "running"):
+                if response.status_code < 400 and response.json()["status"] == "failed":
+                    raise RuntimeError(f"auto-add-positions job failed: {response.json()['error']}")
+                return response
+            time.sleep(JOB_POLL_SECONDS)
+    if endpoint == "search":
+        category = rng.choice(list(ASPECTS))
+        return client.get("/search", params={"q": rng.choice(ASPECTS[category]), "aspect_category": category})
+    raise ValueError(f"Unknown endpoint: {endpoint}")
+
+
+def bench_dataset(client, n_items, endpoints, requests, memory_requests, seed):
+    rng = random.Random(seed)
+    results = {}
+    for endpoint in endpoints:
+        # auto-add-positions scans the whole file (the request waits for its job); a few runs are enough
+        n_requests = min(requests, 5) if endpoint == "auto-add-positions" else requests
+        _request(client, endpoint, n_items, rng)  # warm-up
+
+        durations = []
+        for _ in range(n_requests):
+            start = time.perf_counter()
+            response = _request(client, endpoint, n_items, rng)
+            durations.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                raise RuntimeError(f"{endpoint} failed with {response.status_code}: {response.text}")
+
+        peaks = []
+        for _ in range(memory_requests):
+            tracemalloc.start()
+            _request(client, endpoint, n_items, rng)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+        results[endpoint] = summarize(durations)
+        results[endpoint]["peak_alloc_mb"] = round(max(peaks) / 1024 / 1024, 2) if peaks else None
+        print(f"  {endpoint:22s} p50 {results[endpoint]['p50_ms']:10.2f} ms   "
+              f"p99 {results[endpoint]['p99_ms']:10.2f} ms   peak {results[endpoint]['peak_alloc_mb']} MB")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark AnnoABSA backend endpoints on synthetic data")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 10000],
+                        help="Dataset sizes (default: 1000 10000; 100000 and 1000000 are supported but slow)")
+    parser.add_argument("--formats", nargs="+", choices=["json", "csv"], default=["json", "csv"])
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=ENDPOINTS)
+    parser.add_argument("--requests", type=int, default=50, help="Timed requests per endpoint (default: 50)")
+    parser.add_argument("--memory-requests", type=int, default=3,
+                        help="Extra requests per endpoint measured with tracemalloc (default: 3)")
+    parser.add_argument("--label-density", type=float, default=0.5)
+    parser.add_argument("--text-length", type=int, default=20)
+    parser.add_argument("--timings", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_endpoints.json", help="Report path (default: bench_endpoints.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two reports and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare_reports(*args.compare)
+        return
+
+    from fastapi.testclient import TestClient
+    import main as backend
+
+    backend.set_config({**backend.load_config(), "store_time": True, "auto_positions": True})
+    backend.AUTO_POSITIONS = True
+    client = TestClient(backend.app)
+
+    workdir = tempfile.mkdtemp(prefix="absa_bench_")
+    results = {}
+    try:
+        for fmt in args.formats:
+            for size in args.sizes:
+                print(f"📊 {fmt} / {size} items")
+                source = os.path.join(workdir, f"source_{size}.{fmt}")
+                if not os.path.exists(source):
+                    generate(source, size, args.label_density, args.text_length, args.timings, args.seed)
+                # Benchmark on a copy, the write endpoints modify the file
+                path = os.path.join(workdir, f"bench_{size}.{fmt}")
+                shutil.copyfile(source, path)
+                backend.set_data_file(path)
+                results[f"{fmt}/{size}"] = bench_dataset(client, size, args.endpoints,
+                                                         args.requests, args.memory_requests, args.seed)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results["max_rss_mb"] = max_rss_mb()
+    write_report(args.output, "endpoints", results, {
+        key: getattr(args, key) for key in
+        ["sizes", "formats", "endpoints", "requests", "label_density", "text_length", "timings", "seed"]
+    })
+
+
+if __name__ == "__main__":
+    main()
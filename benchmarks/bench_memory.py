@@ -0,0 +1,103 @@
+"""
+Memory benchmark of the dataset representations.
+
+For every size and format, generates a synthetic dataset and measures the
+Python memory (tracemalloc) held by what load_data() returns (a list of
+dicts for JSON, a DataFrame for CSV) and by the CompactStore built from
+it, plus the store's build time and the latency of serializing one item
+for /data/{idx}.
+
+Usage (from the repository root):
+    python benchmarks/bench_memory.py --sizes 10000 100000 --formats json csv
+    python benchmarks/bench_memory.py --sizes 1000000 --formats json --requests 2000
+"""
+import argparse
+import gc
+import os
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from common import max_rss_mb, summarize, write_report
+from synthetic_data import generate
+
+
+def measure(build):
+    """Return (result, bytes still allocated by it, seconds) for build()."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    duration = time.perf_counter() - start
+    gc.collect()
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, allocated, duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the memory of loaded datasets and compact stores")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--formats", nargs="+", choices=["json", "csv"], default=["json", "csv"])
+    parser.add_argument("--label-density", type=float, default=0.5)
+    parser.add_argument("--requests", type=int, default=1000, help="Items serialized per dataset (default: 1000)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench_memory.json", help="Report path (default: bench_memory.json)")
+    args = parser.parse_args()
+
+    import main as backend
+    from compact_store import CompactStore
+
+    workdir = tempfile.mkdtemp(prefix="absa_bench_")
+    results = {}
+    try:
+        for data_format in args.formats:
+            for size in args.sizes:
+                path = generate(os.path.join(workdir, f"memory_{size}.{data_format}"), size, args.label_density,
+                                timings=1, seed=args.seed)
+                backend.set_data_file(path)
+                data, loaded_bytes, load_seconds = measure(backend.load_data)
+                if data_format == "json":
+                    store, store_bytes, build_seconds = measure(lambda: CompactStore.from_json(data))
+                else:
+                    store, store_bytes, build_seconds = measure(lambda: CompactStore.from_dataframe(data))
+                del data
+                gc.collect()
+
+                rng = random.Random(args.seed)
+                durations = []
+                for _ in range(args.requests):
+                    idx = rng.randrange(size)
+                    start = time.perf_counter()
+                    store.serialize(idx, [])
+                    durations.append(time.perf_counter() - start)
+
+                results[f"{data_format} | {size}"] = {
+                    "file_mb": round(os.path.getsize(path) / 1024 ** 2, 2),
+                    "load_data_mb": round(loaded_bytes / 1024 ** 2, 2),
+                    "load_data_seconds": round(load_seconds, 3),
+                    "compact_store_mb": round(store_bytes / 1024 ** 2, 2),
+                    "compact_store_estimate_mb": round(store.nbytes() / 1024 ** 2, 2),
+                    "build_seconds": round(build_seconds, 3),
+                    "reduction": round(loaded_bytes / store_bytes, 1) if store_bytes else None,
+                    "serialize": summarize(durations),
+                }
+                result = results[f"{data_format} | {size}"]
+                print(f"🗜️  {data_format} {size:>8} items: load_data {result['load_data_mb']} MB, "
+                      f"compact store {result['compact_store_mb']} MB ({result['reduction']}x smaller, "
+                      f"built in {build_seconds:.2f} s), serialize p50 {result['serialize']['p50_ms']} ms")
+                del store
+                os.remove(path)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results["max_rss_mb"] = max_rss_mb()
+    write_report(args.output, "memory", results, {
+        key: getattr(args, key) for key in ["sizes", "formats", "label_density", "requests", "seed"]
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Load test for the AI prediction path against the fake LLM server.
+
+Starts fake_llm_server.py in-process, points main.py's Ollama or OpenAI
+client at it and fires /ai_prediction/{idx} requests through the TestClient,
+optionally from several threads. This covers example collection, BM25
+retrieval, prompt and schema building, the HTTP round trip, validation and
+position lookup without a real model.
+
+Usage (from the repository root, requires httpx for the TestClient):
+    python benchmarks/bench_prediction.py --items 2000 --requests 100 --concurrency 4
+    python benchmarks/bench_prediction.py --provider openai --latency-ms 800 --failure-rate 0.05
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import max_rss_mb, summarize, write_report
+from fake_llm_server import add_options_arguments, options_from_args, start_server
+from synthetic_data import generate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test /ai_prediction against a fake LLM server")
+    parser.add_argument("--provider", choices=["ollama", "openai"], default="ollama")
+    parser.add_argument("--format", choices=["json", "csv"], default="json")
+    parser.add_argument("--items", type=int, default=1000, help="Synthetic dataset size (default: 1000)")
+    parser.add_argument("--label-density", type=float, default=0.5)
+    parser.add_argument("--requests", type=int, default=50, help="Number of prediction requests (default: 50)")
+    parser.add_argument("--concurrency", type=int, default=1, help="Parallel client threads (default: 1)")
+    parser.add_argument("--n-few-shot", type=int, default=10)
+    parser.add_argument("--output", default="bench_prediction.json", help="Report path (default: bench_prediction.json)")
+    add_options_arguments(parser)
+    args = parser.parse_args()
+
+    server, url = start_server(options=options_from_args(args))
+    # Both clients read these when they are created, i.e. on first use in main.py
+    os.environ["OLLAMA_HOST"] = url
+    os.environ["OPENAI_BASE_URL"] = f"{url}/v1"
+
+    from fastapi.testclient import TestClient
+    import main as backend
+
+    workdir = tempfile.mkdtemp(prefix="absa_bench_")
+    path = generate(os.path.join(workdir, f"predict.{args.format}"), args.items, args.label_density, seed=args.seed or 0)
+    config = {**backend.load_config(), "n_few_shot": args.n_few_shot,
+              "llm_model": "fake-gpt" if args.provider == "openai" else "fake-gemma"}
+    if args.provider == "openai":
+        config["openai_key"] = "sk-fake"
+
+    backend.set_data_file(path)
+    backend.set_config(config)
+    # get_ai_prediction reads the config file, so write one for this run
+    config_path = os.path.join(workdir, "config.json")
+    with open(config_path, "w", encoding="utf-8") as f:
+        json.dump(config, f)
+    backend.set_config_file(config_path)
+    client = TestClient(backend.app)
+
+    rng = random.Random(args.seed)
+    indices = [rng.randrange(args.items) for _ in range(args.requests)]
+
+    def predict(idx):
+        start = time.perf_counter()
+        response = client.get(f"/ai_prediction/{idx}")
+        return time.perf_counter() - start, response.status_code
+
+    try:
+        client.get(f"/ai_prediction/{indices[0]}")  # warm-up (imports, client creation)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            outcomes = list(pool.map(predict, indices))
+        wall_time = time.perf_counter() - started
+    finally:
+        server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    ok = [duration for duration, status in outcomes if status < 400]
+    results = {
+        "ai_prediction": summarize(ok),
+        "errors": sum(1 for _, status in outcomes if status >= 400),
+        "throughput_rps": round(len(outcomes) / wall_time, 2) if wall_time else None,
+        "max_rss_mb": max_rss_mb(),
+    }
+    print(f"🤖 {args.provider}: p50 {results['ai_prediction']['p50_ms']:.1f} ms, "
+          f"p99 {results['ai_prediction']['p99_ms']:.1f} ms, {results['errors']} errors, "
+          f"{results['throughput_rps']} req/s")
+    write_report(args.output, "prediction", results, {
+        key: getattr(args, key) for key in
+        ["provider", "format", "items", "label_density", "requests", "concurrency", "n_few_shot",
+         "latency_ms", "latency_jitter_ms", "latency_dist", "tokens_per_second", "failure_rate", "malformed_rate"]
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Retrieval micro-benchmark on the evaluation corpora.
+
+Times get_most_similar_examples and find_valid_phrases_list from main.py on
+the datasets in evaluation/data, with pools built exactly like eval.py
+(shuffled train split, first int(1000 * pool_size) sentences) and the test
+sentences as queries. The retrieval is split into its stages (tokenization,
+BM25 index build, scoring, top-k) so a different retrieval engine can be
+compared stage by stage against the current BM25Okapi baseline.
+
+Usage (from the repository root):
+    python benchmarks/bench_retrieval.py
+    python benchmarks/bench_retrieval.py --datasets rest16 hotels --pool-sizes 0.1 1.0 --queries 200
+    python benchmarks/bench_retrieval.py --compare before.json after.json
+"""
+import argparse
+import os
+import random
+import time
+import tracemalloc
+
+from rank_bm25 import BM25Okapi
+
+from common import REPO_ROOT, compare_reports, summarize, write_report
+from main import find_valid_phrases_list, get_most_similar_examples, tokenize_for_bm25, top_n_indices
+
+POOL_SIZES = ["0.1", "0.2", "0.3", "0.4", "0.5", "0.6", "0.7", "0.8", "0.9", "1.0"]
+DATASET_NAMES = ["rest16", "flightabsa", "coursera", "hotels"]
+
+
+def load_texts(task_str, dataset_name, split):
+    with open(os.path.join(REPO_ROOT, "evaluation", "data", task_str, dataset_name, f"{split}.txt"),
+              "r", encoding="utf-8") as f:
+        return [line.strip().split("####")[0] for line in f]
+
+
+def bench_pool(pool, queries, n):
+    """Time every retrieval stage for each query against one pool."""
+    stages = {"tokenize": [], "index_build": [], "scoring": [], "top_k": [], "total": []}
+    examples = [{"text": t} for t in pool]
+    for query in queries:
+        t0 = time.perf_counter()
+        tokenized_pool = [tokenize_for_bm25(t) for t in pool]
+        tokenized_query = tokenize_for_bm25(query)
+        t1 = time.perf_counter()
+        bm25 = BM25Okapi(tokenized_pool)
+        t2 = time.perf_counter()
+        scores = bm25.get_scores(tokenized_query)
+        t3 = time.perf_counter()
+        top_n_indices(scores, min(n, len(pool)))
+        t4 = time.perf_counter()
+        get_most_similar_examples(query, examples, n)
+        t5 = time.perf_counter()
+        stages["tokenize"].append(t1 - t0)
+        stages["index_build"].append(t2 - t1)
+        stages["scoring"].append(t3 - t2)
+        stages["top_k"].append(t4 - t3)
+        stages["total"].append(t5 - t4)
+
+    tracemalloc.start()
+    get_most_similar_examples(queries[0], examples, n)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    result = {stage: summarize(durations) for stage, durations in stages.items()}
+    result["peak_alloc_mb"] = round(peak / 1024 / 1024, 3)
+    result["pool_size"] = len(pool)
+    return result
+
+
+def bench_phrases(queries):
+    durations, counts = [], []
+    for query in queries:
+        start = time.perf_counter()
+        counts.append(len(find_valid_phrases_list(query)))
+        durations.append(time.perf_counter() - start)
+    tracemalloc.start()
+    find_valid_phrases_list(max(queries, key=len))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    result = summarize(durations)
+    result["mean_phrases"] = round(sum(counts) / len(counts), 1)
+    result["max_phrases"] = max(counts)
+    result["peak_alloc_mb"] = round(peak / 1024 / 1024, 3)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark BM25 retrieval and phrase enumeration on evaluation data")
+    parser.add_argument("--task-str", choices=["tasd", "asqp"], default="asqp", help="Data directory (default: asqp)")
+    parser.add_argument("--datasets", nargs="+", default=DATASET_NAMES)
+    parser.add_argument("--pool-sizes", nargs="+", default=POOL_SIZES)
+    parser.add_argument("--queries", type=int, default=50, help="Test sentences per dataset (default: 50)")
+    parser.add_argument("--n", type=int, default=10, help="Number of retrieved examples (default: 10)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench_retrieval.json", help="Report path (default: bench_retrieval.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two reports and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare_reports(*args.compare)
+        return
+
+    results = {}
+    for dataset_name in args.datasets:
+        train = load_texts(args.task_str, dataset_name, "train")
+        random.seed(args.seed)
+        random.shuffle(train)
+        queries = load_texts(args.task_str, dataset_name, "test")[:args.queries]
+        print(f"📚 {dataset_name}: {len(train)} train, {len(queries)} queries")
+
+        results[dataset_name] = {"find_valid_phrases_list": bench_phrases(queries)}
+        for pool_size in args.pool_sizes:
+            pool = train[:int(1000 * float(pool_size))]
+            result = bench_pool(pool, queries, args.n)
+            results[dataset_name][f"pool_{pool_size}"] = result
+            print(f"  pool {pool_size:>4} ({len(pool):4d}): total p50 {result['total']['p50_ms']:7.2f} ms "
+                  f"(tokenize {result['tokenize']['p50_ms']:.2f}, build {result['index_build']['p50_ms']:.2f}, "
+                  f"score {result['scoring']['p50_ms']:.2f}, top-k {result['top_k']['p50_ms']:.3f})")
+
+    write_report(args.output, "retrieval", results, {
+        key: getattr(args, key) for key in ["task_str", "datasets", "pool_sizes", "queries", "n", "seed"]
+    })
+
+
+if __name__ == "__main__":
+    main()
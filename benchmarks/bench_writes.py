@@ -0,0 +1,226 @@
+"""
+Concurrent write load test.
+
+Fires hundreds of concurrent POST /annotations/{idx} requests (and,
+optionally, /timing events and batch writes) at the backend from many
+threads, then reloads the data file and checks that every single write is
+present. Exits with status 1 if any write was lost, so it can be used as a
+regression check for the write queue.
+
+With --workers N the backend runs as N uvicorn processes on one data file,
+as annoabsa --workers N does, but each on its own port, so the saves can be
+spread over the workers deliberately: with --rounds R every item is saved R
+times in a row, round r through worker (item + r) % N. The final label must
+be the one of the last round (a lost or reordered write leaves an earlier
+one), and every worker must serve that label from GET /data/{idx}, which
+checks the change feed replay of the other workers.
+
+Usage (from the repository root, requires httpx for the TestClient):
+    python benchmarks/bench_writes.py --items 2000 --writes 500 --concurrency 64
+    python benchmarks/bench_writes.py --format csv --batch-size 20
+    python benchmarks/bench_writes.py --workers 2 --rounds 3
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from common import REPO_ROOT, max_rss_mb, summarize, write_report
+from synthetic_data import generate
+
+# Seconds to wait for the worker processes to answer
+STARTUP_TIMEOUT = 60
+# Items whose label is read back from every worker after the writes
+MAX_READ_BACK = 200
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_workers(n, data_path, config_path, log_dir):
+    """Start n backend processes sharing data_path, like annoabsa --workers n but on separate ports.
+
+    Returns [(process, base_url)] once all of them answer.
+    """
+    import httpx
+    from shared_state import reset_change_feed
+
+    reset_change_feed(data_path)
+    env = {**os.environ, "ABSA_DATA_PATH": data_path, "ABSA_CONFIG_PATH": config_path,
+           "ABSA_WORKERS": str(n), "ABSA_INSTANCE_ID": uuid.uuid4().hex[:12]}
+    workers = []
+    for i in range(n):
+        port = _free_port()
+        log = open(os.path.join(log_dir, f"worker{i}.log"), "wb")
+        process = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+                                    f"--port={port}", "--log-level=warning"],
+                                   cwd=REPO_ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+        workers.append((process, f"http://127.0.0.1:{port}"))
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    for process, url in workers:
+        while True:
+            if process.poll() is not None:
+                stop_workers(workers)
+                raise RuntimeError(f"Worker {url} exited with status {process.returncode} (logs in {log_dir})")
+            try:
+                if httpx.get(f"{url}/settings", timeout=1).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                stop_workers(workers)
+                raise RuntimeError(f"Worker {url} did not start within {STARTUP_TIMEOUT} s (logs in {log_dir})")
+            time.sleep(0.1)
+    return workers
+
+
+def stop_workers(workers):
+    for process, _ in workers:
+        process.terminate()
+    for process, _ in workers:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that concurrent annotation saves are never lost")
+    parser.add_argument("--format", choices=["json", "csv"], default="json")
+    parser.add_argument("--items", type=int, default=1000, help="Synthetic dataset size (default: 1000)")
+    parser.add_argument("--writes", type=int, default=500, help="Number of annotation saves (default: 500)")
+    parser.add_argument("--concurrency", type=int, default=64, help="Parallel client threads (default: 64)")
+    parser.add_argument("--batch-size", type=int, default=1,
+                        help="Annotations per request; >1 uses POST /annotations/batch (default: 1)")
+    parser.add_argument("--timings", action="store_true", help="Also post a timing event with every save")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Backend processes sharing the data file; >1 starts them with uvicorn (default: 1)")
+    parser.add_argument("--rounds", type=int, default=1,
+                        help="Consecutive saves per item, alternating between workers (default: 1)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench_writes.json", help="Report path (default: bench_writes.json)")
+    args = parser.parse_args()
+
+    import main as backend
+    import metrics
+
+    rounds = max(args.rounds, 1)
+    workdir = tempfile.mkdtemp(prefix="absa_bench_")
+    path = generate(os.path.join(workdir, f"writes.{args.format}"), args.items, 0.0, timings=0, seed=args.seed)
+    backend.set_data_file(path)
+    workers = []
+    if args.workers > 1:
+        import httpx
+        config_path = os.path.join(workdir, "config.json")
+        with open(config_path, "w", encoding="utf-8") as f:
+            json.dump({"store_time": args.timings}, f)
+        workers = start_workers(args.workers, path, config_path, workdir)
+        clients = [httpx.Client(base_url=url, timeout=60) for _, url in workers]
+    else:
+        from fastapi.testclient import TestClient
+        backend.set_config({**backend.load_config(), "store_time": args.timings})
+        clients = [TestClient(backend.app)]
+
+    # Every write gets its own item and a unique marker per round, so a lost or reordered write is detectable
+    rng = random.Random(args.seed)
+    indices = rng.sample(range(args.items), min(args.writes * args.batch_size, args.items))
+    groups = [indices[i:i + args.batch_size] for i in range(0, len(indices), args.batch_size)]
+
+    def value(idx, round_=rounds - 1):
+        return [{"aspect_term": f"marker-{idx}-{round_}", "aspect_category": "food quality",
+                 "sentiment_polarity": "positive", "opinion_term": "NULL"}]
+
+    def write(group):
+        # The rounds of one group are sent one after the other, each through the next worker
+        outcomes = []
+        for round_ in range(rounds):
+            client = clients[(group[0] + round_) % len(clients)]
+            start = time.perf_counter()
+            if len(group) == 1:
+                response = client.post(f"/annotations/{group[0]}",
+                                       json={"name": "bench", "value": value(group[0], round_)})
+            else:
+                response = client.post("/annotations/batch", json={
+                    "annotations": [{"idx": idx, "value": value(idx, round_)} for idx in group]})
+            if args.timings:
+                client.post(f"/timing/{group[0]}", json={"duration": 1.0, "change": True})
+            outcomes.append((time.perf_counter() - start, response.status_code))
+        return outcomes
+
+    def served_label(client, idx):
+        response = client.get(f"/data/{idx}")
+        return json.loads(response.json()["label"] or "null") if response.status_code == 200 else None
+
+    saves_before = metrics.FILE_SAVE_SECONDS.count(format=args.format)
+    try:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            outcomes = [outcome for group_outcomes in pool.map(write, groups) for outcome in group_outcomes]
+        wall_time = time.perf_counter() - started
+
+        data = backend.load_data()
+        if args.format == "json":
+            labels = {idx: data[idx].get("label") for idx in indices}
+        else:
+            labels = {idx: json.loads(data.iloc[idx]["label"]) if isinstance(data.iloc[idx]["label"], str) else None
+                      for idx in indices}
+        lost = [idx for idx in indices if labels[idx] != value(idx)]
+        # Every worker has to serve the saved labels, including those saved through the others
+        stale = []
+        if workers:
+            stale = sorted({idx for client in clients for idx in indices[:MAX_READ_BACK]
+                            if served_label(client, idx) != value(idx)})
+        timing_events = 0
+        if args.timings:
+            with open(path + ".timings.jsonl", "r", encoding="utf-8") as f:
+                timing_events = sum(1 for _ in f)
+    finally:
+        for client in clients:
+            client.close()
+        stop_workers(workers)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    # Saves of worker processes are not counted in this process
+    saves = None if workers else metrics.FILE_SAVE_SECONDS.count(format=args.format) - saves_before
+    errors = sum(1 for _, status in outcomes if status >= 400)
+    results = {
+        "requests": summarize([duration for duration, _ in outcomes]),
+        "errors": errors,
+        "lost_writes": len(lost),
+        "file_saves": saves,
+        "throughput_rps": round(len(outcomes) / wall_time, 2) if wall_time else None,
+        "max_rss_mb": max_rss_mb(),
+    }
+    if workers:
+        results["stale_reads"] = len(stale)
+    if args.timings:
+        results["lost_timings"] = len(outcomes) - timing_events
+    print(f"✍️  {len(indices)} annotations x {rounds} rounds in {len(outcomes)} requests over "
+          f"{len(clients)} worker(s): {results['throughput_rps']} req/s, "
+          f"{'?' if saves is None else saves} file saves, {errors} errors, {len(lost)} lost or reordered"
+          + (f", {len(stale)} stale reads" if workers else ""))
+    write_report(args.output, "writes", results, {
+        key: getattr(args, key) for key in ["format", "items", "writes", "concurrency", "batch_size", "timings",
+                                            "workers", "rounds", "seed"]
+    })
+    if lost or errors or results.get("lost_timings"):
+        print(f"❌ Lost or reordered writes: {lost[:20]}")
+        sys.exit(1)
+    if workers and stale:
+        print(f"❌ Items served with an outdated label: {stale[:20]}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Shared helpers for the benchmark scripts: percentiles, JSON reports and report comparison."""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list (p in 0..100)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(p / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(durations_s):
+    """Summarize a list of durations in seconds as milliseconds."""
+    values = sorted(d * 1000 for d in durations_s)
+    return {
+        "n": len(values),
+        "mean_ms": round(sum(values) / len(values), 3) if values else 0.0,
+        "p50_ms": round(percentile(values, 50), 3),
+        "p95_ms": round(percentile(values, 95), 3),
+        "p99_ms": round(percentile(values, 99), 3),
+        "max_ms": round(values[-1], 3) if values else 0.0,
+    }
+
+
+def max_rss_mb():
+    """Peak resident set size of this process in MB (None where unavailable)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def write_report(path, benchmark, results, params=None):
+    """Write a benchmark report that can later be compared with compare_reports()."""
+    report = {
+        "benchmark": benchmark,
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": params or {},
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Report written to {path}")
+    return report
+
+
+def compare_reports(old_path, new_path, metric="p50_ms"):
+    """Print the relative change of a metric for every result present in both reports."""
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+    print(f"Comparing {metric}: {old.get('commit')} -> {new.get('commit')}")
+
+    def flatten(results, prefix=""):
+        for key, value in results.items():
+            if isinstance(value, dict) and metric in value:
+                yield prefix + key, value[metric]
+            elif isinstance(value, dict):
+                yield from flatten(value, prefix + key + " | ")
+
+    old_values = dict(flatten(old["results"]))
+    for key, new_value in flatten(new["results"]):
+        if key not in old_values:
+            continue
+        old_value = old_values[key]
+        change = (new_value - old_value) / old_value * 100 if old_value else 0.0
+        print(f"{key:70s} {old_value:12.3f} {new_value:12.3f} {change:+8.1f}%")
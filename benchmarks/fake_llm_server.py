@@ -0,0 +1,245 @@
+"""
+Local stand-in LLM server for reproducible prediction benchmarks.
+
+Speaks just enough of two protocols for main.py's prediction functions:
+
+- Ollama:  POST /api/generate with a JSON schema in "format" (predict_llm)
+- OpenAI:  POST /v1/chat/completions with response_format json_schema (predict_openai)
+
+Every response is a random but schema-valid JSON document (enum values are
+picked from the schema, so aspect/opinion terms are real phrases of the
+text). Latency, token rate and failure rates are configurable, which makes
+it possible to load-test the whole prediction path on an offline machine.
+
+Usage:
+    python benchmarks/fake_llm_server.py --port 11434 --latency-ms 400 --tokens-per-second 40
+
+    # Point the backend at it
+    OLLAMA_HOST=http://127.0.0.1:11434 ...
+    OPENAI_BASE_URL=http://127.0.0.1:11434/v1 ...
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeLLMOptions:
+    """Behaviour of the fake server. Latencies are in milliseconds."""
+
+    def __init__(self, latency_ms=200.0, latency_jitter_ms=50.0, latency_dist="normal",
+                 tokens_per_second=0.0, failure_rate=0.0, malformed_rate=0.0,
+                 max_items=3, seed=None):
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.latency_dist = latency_dist
+        self.tokens_per_second = tokens_per_second
+        self.failure_rate = failure_rate
+        self.malformed_rate = malformed_rate
+        self.max_items = max_items
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    def sample_latency(self):
+        """Time to first token in seconds."""
+        with self.lock:
+            if self.latency_dist == "fixed":
+                value = self.latency_ms
+            elif self.latency_dist == "uniform":
+                value = self.rng.uniform(self.latency_ms - self.latency_jitter_ms,
+                                         self.latency_ms + self.latency_jitter_ms)
+            elif self.latency_dist == "lognormal":
+                # latency_ms is the median, jitter scales the spread
+                sigma = self.latency_jitter_ms / self.latency_ms if self.latency_ms else 0.0
+                value = self.latency_ms * self.rng.lognormvariate(0.0, sigma)
+            else:
+                value = self.rng.gauss(self.latency_ms, self.latency_jitter_ms)
+        return max(0.0, value) / 1000
+
+    def roll(self, rate):
+        with self.lock:
+            return self.rng.random() < rate
+
+
+def _resolve(schema, root):
+    while "$ref" in schema:
+        # Only local references ("#/$defs/Name") are produced by pydantic
+        node = root
+        for part in schema["$ref"].lstrip("#/").split("/"):
+            node = node[part]
+        schema = node
+    return schema
+
+
+def generate_instance(schema, root, rng, max_items=3):
+    """Generate a random JSON value that validates against a (pydantic-style) JSON schema."""
+    schema = _resolve(schema, root)
+    if "enum" in schema:
+        return rng.choice(schema["enum"])
+    if "const" in schema:
+        return schema["const"]
+    for key in ("anyOf", "oneOf", "allOf"):
+        if key in schema:
+            return generate_instance(schema[key][0], root, rng, max_items)
+
+    schema_type = schema.get("type", "object")
+    if isinstance(schema_type, list):
+        schema_type = schema_type[0]
+    if schema_type == "object":
+        properties = schema.get("properties", {})
+        return {name: generate_instance(sub, root, rng, max_items) for name, sub in properties.items()}
+    if schema_type == "array":
+        n = rng.randint(schema.get("minItems", 0), max(schema.get("minItems", 0), max_items))
+        return [generate_instance(schema.get("items", {}), root, rng, max_items) for _ in range(n)]
+    if schema_type == "string":
+        return "lorem"
+    if schema_type == "integer":
+        return rng.randint(0, 10)
+    if schema_type == "number":
+        return round(rng.random(), 3)
+    if schema_type == "boolean":
+        return rng.random() < 0.5
+    return None
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    server_version = "FakeLLM/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        # Keep benchmark output clean
+        pass
+
+    def _send_json(self, status, payload):
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path in ("/api/version", "/"):
+            self._send_json(200, {"version": "0.0.0-fake"})
+        elif self.path == "/api/tags":
+            self._send_json(200, {"models": []})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        options = self.server.options
+        with options.lock:
+            options.requests += 1
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        if self.path == "/api/generate":
+            schema = request.get("format")
+        elif self.path.rstrip("/").endswith("/chat/completions"):
+            response_format = request.get("response_format") or {}
+            schema = (response_format.get("json_schema") or {}).get("schema")
+        else:
+            self._send_json(404, {"error": f"unsupported path {self.path}"})
+            return
+
+        started = time.perf_counter()
+        time.sleep(options.sample_latency())
+        if options.roll(options.failure_rate):
+            self._send_json(500, {"error": "simulated failure"})
+            return
+
+        if isinstance(schema, dict):
+            with options.lock:
+                content = json.dumps(generate_instance(schema, schema, options.rng, options.max_items))
+        else:
+            content = "{}"
+        if options.roll(options.malformed_rate):
+            content = content[:len(content) // 2]
+
+        # Roughly 4 characters per token
+        prompt_tokens = len(request.get("prompt") or json.dumps(request.get("messages", []))) // 4
+        completion_tokens = max(1, len(content) // 4)
+        if options.tokens_per_second > 0:
+            time.sleep(completion_tokens / options.tokens_per_second)
+        elapsed_ns = int((time.perf_counter() - started) * 1e9)
+
+        if self.path == "/api/generate":
+            self._send_json(200, {
+                "model": request.get("model", "fake"),
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "response": content,
+                "done": True,
+                "done_reason": "stop",
+                "total_duration": elapsed_ns,
+                "prompt_eval_count": prompt_tokens,
+                "eval_count": completion_tokens,
+                "eval_duration": elapsed_ns,
+            })
+        else:
+            self._send_json(200, {
+                "id": f"chatcmpl-{uuid.uuid4().hex}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "fake"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content, "refusal": None},
+                    "finish_reason": "stop",
+                    "logprobs": None,
+                }],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                          "total_tokens": prompt_tokens + completion_tokens},
+            })
+
+
+def start_server(host="127.0.0.1", port=0, options=None):
+    """Start the fake server in a daemon thread. Returns (server, base_url); stop with server.shutdown()."""
+    server = ThreadingHTTPServer((host, port), FakeLLMHandler)
+    server.daemon_threads = True
+    server.options = options or FakeLLMOptions()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def add_options_arguments(parser):
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="Mean/median time to first token (default: 200)")
+    parser.add_argument("--latency-jitter-ms", type=float, default=50.0, help="Spread of the latency distribution (default: 50)")
+    parser.add_argument("--latency-dist", choices=["fixed", "normal", "uniform", "lognormal"], default="normal")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0,
+                        help="Simulated generation speed, 0 disables (default: 0)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Fraction of responses with truncated JSON")
+    parser.add_argument("--max-items", type=int, default=3, help="Maximum sentiment tuples per response (default: 3)")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def options_from_args(args):
+    return FakeLLMOptions(args.latency_ms, args.latency_jitter_ms, args.latency_dist, args.tokens_per_second,
+                          args.failure_rate, args.malformed_rate, args.max_items, args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Ollama/OpenAI server for prediction benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    add_options_arguments(parser)
+    args = parser.parse_args()
+
+    server, url = start_server(args.host, args.port, options_from_args(args))
+    print(f"🤖 Fake LLM server listening on {url}")
+    print(f"   OLLAMA_HOST={url}")
+    print(f"   OPENAI_BASE_URL={url}/v1")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print(f"\n🛑 Stopping after {server.options.requests} requests")
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
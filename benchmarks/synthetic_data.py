@@ -0,0 +1,115 @@
+"""
+Synthetic ABSA dataset generator for benchmarks.
+
+Writes datasets in the same JSON/CSV layout AnnoABSA reads (see README,
+"Data Format"), with configurable size, label density, text length and
+`timings` history. Aspect and opinion terms are taken from the generated
+text, so their positions are valid.
+
+Usage:
+    python benchmarks/synthetic_data.py out.json --items 10000
+    python benchmarks/synthetic_data.py out.csv --items 100000 --label-density 0.3 --timings 2
+"""
+import argparse
+import csv
+import json
+import os
+import random
+
+ASPECTS = {
+    "food quality": ["pasta", "pizza", "sushi", "steak", "dessert", "salad", "soup", "burger"],
+    "service general": ["service", "staff", "waiter", "waitress", "host"],
+    "ambience general": ["atmosphere", "decor", "music", "interior", "terrace"],
+    "restaurant prices": ["prices", "bill", "menu prices"],
+    "drinks quality": ["wine", "coffee", "cocktails", "beer"],
+    "location general": ["location", "view", "neighborhood"],
+}
+OPINIONS = {
+    "positive": ["great", "amazing", "excellent", "friendly", "delicious", "cozy", "fresh"],
+    "negative": ["slow", "rude", "bland", "overpriced", "noisy", "cold", "terrible"],
+    "neutral": ["okay", "average", "standard", "fine"],
+}
+FILLER = ["the", "was", "and", "but", "we", "had", "really", "quite", "a", "very", "it", "our",
+          "table", "evening", "dinner", "lunch", "time", "place", "again", "there", "not"]
+
+
+def _item(rng, text_length, label_density, timings):
+    """Build one item. text_length is the approximate number of words."""
+    words = []
+    annotations = []
+    n_tuples = max(1, min(4, text_length // 8))
+    for _ in range(n_tuples):
+        category = rng.choice(list(ASPECTS))
+        polarity = rng.choice(list(OPINIONS))
+        aspect = rng.choice(ASPECTS[category])
+        opinion = rng.choice(OPINIONS[polarity])
+        words.extend(rng.choices(FILLER, k=rng.randint(1, 3)))
+        words.extend(["the", aspect, "was", opinion])
+        annotations.append({"aspect_term": aspect, "aspect_category": category,
+                            "sentiment_polarity": polarity, "opinion_term": opinion})
+    while len(words) < text_length:
+        words.append(rng.choice(FILLER))
+    text = " ".join(words).capitalize() + " ."
+
+    item = {"text": text, "translation": text.upper()}
+    if rng.random() < label_density:
+        for annotation in annotations:
+            start = text.find(annotation["aspect_term"])
+            annotation["at_start"], annotation["at_end"] = start, start + len(annotation["aspect_term"]) - 1
+            # leave some opinion positions missing so /auto-add-positions has work to do
+            if rng.random() < 0.7:
+                start = text.find(annotation["opinion_term"])
+                annotation["ot_start"], annotation["ot_end"] = start, start + len(annotation["opinion_term"]) - 1
+        item["label"] = annotations if rng.random() < 0.9 else []
+        if timings:
+            item["timings"] = [{"duration": round(rng.lognormvariate(2.5, 0.6), 2),
+                                "change": rng.random() < 0.6}
+                               for _ in range(rng.randint(1, 2 * timings))]
+    return item
+
+
+def generate(path, items=1000, label_density=0.5, text_length=20, timings=1, seed=0):
+    """Write a synthetic dataset to path (.json or .csv) and return the path."""
+    rng = random.Random(seed)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    if path.endswith(".json"):
+        # Stream items to keep memory flat for the large sizes
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("[\n")
+            for i in range(items):
+                if i:
+                    f.write(",\n")
+                f.write(json.dumps(_item(rng, text_length, label_density, timings), ensure_ascii=False))
+            f.write("\n]\n")
+    else:
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["text", "translation", "label", "timings"])
+            for _ in range(items):
+                item = _item(rng, text_length, label_density, timings)
+                writer.writerow([
+                    item["text"],
+                    item["translation"],
+                    json.dumps(item["label"], ensure_ascii=False) if "label" in item else "",
+                    json.dumps(item["timings"], ensure_ascii=False) if "timings" in item else "",
+                ])
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic ABSA dataset (JSON or CSV)")
+    parser.add_argument("path", help="Output file, .json or .csv")
+    parser.add_argument("--items", type=int, default=1000, help="Number of items (default: 1000)")
+    parser.add_argument("--label-density", type=float, default=0.5, help="Fraction of annotated items (default: 0.5)")
+    parser.add_argument("--text-length", type=int, default=20, help="Approximate words per text (default: 20)")
+    parser.add_argument("--timings", type=int, default=1, help="Average timing entries per annotated item (default: 1)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    generate(args.path, args.items, args.label_density, args.text_length, args.timings, args.seed)
+    print(f"✅ Wrote {args.items} items to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
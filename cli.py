@@ -21,6 +21,10 @@ from typing import List, Dict, Any
 backend_process = None
 shutdown_flag = threading.Event()
 
+# Seconds uvicorn waits for open connections (event streams never finish) on shutdown or reload;
+# below the 5 s cleanup_backend gives the process before killing it
+GRACEFUL_SHUTDOWN_SECONDS = 3
+
 
 def cleanup_backend():
     """Clean up backend process on exit."""
@@ -75,7 +79,14 @@ class ABSAAnnotatorConfig:
             "disable_ai_automatic_prediction": False,
             "annotation_guideline": None,
             "n_few_shot": 10,
-            "openai_key": None
+            "cache_predictions": False,
+            "openai_key": None,
+            "profile_dir": None,
+            "profile_threshold_ms": 1000,
+            "csv_engine": None,
+            "exclude_near_duplicates": False,
+            "propagate_duplicate_labels": False,
+            "near_duplicate_threshold": 0.8
         }
 
     def set_sentiment_elements(self, elements: List[str]) -> None:
@@ -120,6 +131,20 @@ class ABSAAnnotatorConfig:
         """Set whether automatic position data filling is enabled for existing phrases on startup."""
         self.config["auto_positions"] = enabled
 
+    def set_exclude_near_duplicates(self, enabled: bool) -> None:
+        """Set whether near-duplicates of an item are excluded from its few-shot examples (and examples are deduplicated)."""
+        self.config["exclude_near_duplicates"] = enabled
+
+    def set_propagate_duplicate_labels(self, enabled: bool) -> None:
+        """Set whether saved annotations are copied to exact duplicates (same text) of the item."""
+        self.config["propagate_duplicate_labels"] = enabled
+
+    def set_near_duplicate_threshold(self, threshold: float) -> None:
+        """Set the minimum estimated text similarity (0-1) of near-duplicates."""
+        if not 0 < threshold <= 1:
+            raise ValueError(f"Invalid near-duplicate threshold: {threshold}. It must be in (0, 1]")
+        self.config["near_duplicate_threshold"] = threshold
+
     def set_store_time(self, enabled: bool) -> None:
         """Set whether timing data should be stored (duration and change status for each annotation session)."""
         self.config["store_time"] = enabled
@@ -137,18 +162,13 @@ class ABSAAnnotatorConfig:
         self.config["disable_ai_automatic_prediction"] = disabled
 
     def set_annotation_guideline(self, guideline_path: str) -> None:
-        """Set the path to the annotation guideline PDF file and encode it as base64."""
+        """Set the path to the annotation guideline PDF file (served by the backend at /annotation-guideline)."""
         if guideline_path and not os.path.exists(guideline_path):
             raise ValueError(
                 f"Annotation guideline file not found: {guideline_path}")
 
         if guideline_path:
-            # Read and encode PDF as base64
-            import base64
-            with open(guideline_path, 'rb') as pdf_file:
-                pdf_data = pdf_file.read()
-                encoded_pdf = base64.b64encode(pdf_data).decode('utf-8')
-                self.config["annotation_guideline"] = f"data:application/pdf;base64,{encoded_pdf}"
+            self.config["annotation_guideline"] = os.path.abspath(guideline_path)
         else:
             self.config["annotation_guideline"] = None
 
@@ -162,6 +182,23 @@ class ABSAAnnotatorConfig:
             raise ValueError("Number of few-shot examples must be non-negative")
         self.config["n_few_shot"] = n_few_shot
 
+    def set_cache_predictions(self, enabled: bool) -> None:
+        """Set whether identical prediction requests (same prompt, schema and model) reuse an earlier answer."""
+        self.config["cache_predictions"] = enabled
+
+    def set_profiling(self, profile_dir: str, threshold_ms: float = 1000) -> None:
+        """Set the directory for cProfile dumps of backend requests slower than threshold_ms."""
+        if threshold_ms < 0:
+            raise ValueError("Profiling threshold must be non-negative")
+        self.config["profile_dir"] = os.path.abspath(profile_dir) if profile_dir else None
+        self.config["profile_threshold_ms"] = threshold_ms
+
+    def set_csv_engine(self, engine: str) -> None:
+        """Set the pandas engine used to parse CSV data files (None for the default C engine)."""
+        if engine not in (None, "c", "pyarrow"):
+            raise ValueError(f"Invalid CSV engine: {engine}. Valid options: c, pyarrow")
+        self.config["csv_engine"] = engine
+
     def set_session_id(self, session_id: str) -> None:
         """Set the session ID for this annotation session."""
         self.config["session_id"] = session_id
@@ -219,14 +256,29 @@ class ABSAAnnotatorConfig:
         print(
             f"🔧 Auto-add Positions: {'✅' if self.config['auto_positions'] else '❌'}")
         print(f"🎯 Few-shot Examples: {self.config['n_few_shot']}")
+        if self.config.get('cache_predictions'):
+            print("🗃️  Prediction cache: ✅")
+        if self.config.get('exclude_near_duplicates') or self.config.get('propagate_duplicate_labels'):
+            print(f"🧬 Near-duplicates (similarity >= {self.config['near_duplicate_threshold']}): "
+                  f"excluded from examples {'✅' if self.config['exclude_near_duplicates'] else '❌'}, "
+                  f"labels propagated to exact duplicates {'✅' if self.config['propagate_duplicate_labels'] else '❌'}")
+        if self.config.get('profile_dir'):
+            print(
+                f"🐢 Profiling: requests > {self.config['profile_threshold_ms']} ms -> {self.config['profile_dir']}")
+        if self.config.get('csv_engine'):
+            print(f"📑 CSV Engine: {self.config['csv_engine']}")
         if self.config.get('openai_key'):
             print(f"🤖 AI Provider: OpenAI (API Key configured)")
         else:
             print(f"🤖 AI Provider: Local LLM (Ollama)")
 
 
-def start_backend(port: int = 8000, host: str = "localhost", data_path: str = None, config: ABSAAnnotatorConfig = None):
-    """Start the FastAPI backend server."""
+def start_backend(port: int = 8000, host: str = "localhost", data_path: str = None, config: ABSAAnnotatorConfig = None, reload: bool = True, frontend_dir: str = None, workers: int = 1):
+    """Start the FastAPI backend server (with uvicorn's auto-reloader unless reload is False).
+
+    If frontend_dir is given, the backend also serves that built frontend on the same port.
+    With workers > 1, uvicorn runs that many processes (without reloader) sharing the data file.
+    """
     global backend_process
     try:
         # Check if port is already in use
@@ -244,11 +296,24 @@ def start_backend(port: int = 8000, host: str = "localhost", data_path: str = No
             config_file = "temp_absa_config.json"
             config.save_config(config_file)
             os.environ['ABSA_CONFIG_PATH'] = config_file
-
-        backend_process = subprocess.Popen([
-            sys.executable, "-m", "uvicorn",
-            "main:app", "--reload", f"--port={port}", f"--host={host}"
-        ])
+        if frontend_dir:
+            os.environ['ABSA_FRONTEND_DIR'] = os.path.abspath(frontend_dir)
+
+        command = [sys.executable, "-m", "uvicorn", "main:app", f"--port={port}", f"--host={host}",
+                   f"--timeout-graceful-shutdown={GRACEFUL_SHUTDOWN_SECONDS}"]
+        if workers > 1:
+            # The workers coordinate writes and caches through files next to the data file
+            import uuid
+            from shared_state import reset_change_feed
+            os.environ['ABSA_WORKERS'] = str(workers)
+            os.environ['ABSA_INSTANCE_ID'] = uuid.uuid4().hex[:12]
+            reset_change_feed(os.environ.get('ABSA_DATA_PATH', "annotations.csv"))
+            command.append(f"--workers={workers}")
+            print(f"👥 Running {workers} backend workers")
+        elif reload:
+            # The reloader adds a file watcher and a second process; useful during development only
+            command.append("--reload")
+        backend_process = subprocess.Popen(command)
 
         # Wait for process to finish or shutdown signal
         while backend_process.poll() is None and not shutdown_flag.is_set():
@@ -296,20 +361,24 @@ def start_frontend(port: int = 3000, host: str = "localhost", backend_host: str
         return False
 
 
-def start_full_app(backend_port: int = 8000, backend_host: str = "localhost", frontend_port: int = 3000, frontend_host: str = "localhost", data_path: str = None, config: ABSAAnnotatorConfig = None):
+def start_full_app(backend_port: int = 8000, backend_host: str = "localhost", frontend_port: int = 3000, frontend_host: str = "localhost", data_path: str = None, config: ABSAAnnotatorConfig = None, reload: bool = True, workers: int = 1):
     """Start both backend and frontend servers."""
     print("🚀 Starting AnnoABSA...")
     print("=" * 50)
 
     # Start backend in a separate thread
     backend_thread = threading.Thread(target=start_backend, args=(
-        backend_port, backend_host, data_path, config))
+        backend_port, backend_host, data_path, config, reload), kwargs={"workers": workers})
     backend_thread.daemon = False  # Don't make it daemon so we can properly clean up
     backend_thread.start()
 
-    # Wait a moment for backend to start
+    # Wait until the backend accepts connections
     print("⏳ Waiting for backend to initialize...")
-    time.sleep(3)
+    started = time.time()
+    if wait_for_port(backend_host, backend_port, timeout=30):
+        print(f"✅ Backend up after {time.time() - started:.1f}s")
+    else:
+        print("⚠️  Backend did not respond within 30s, starting frontend anyway")
 
     # Start frontend (this will block until stopped)
     try:
@@ -353,6 +422,18 @@ def update_vite_port_config(port: int, host: str):
             f.write(content)
 
 
+def wait_for_port(host: str, port: int, timeout: float = 30) -> bool:
+    """Wait until a server accepts connections on host:port. Returns False on timeout or shutdown."""
+    deadline = time.time() + timeout
+    while time.time() < deadline and not shutdown_flag.is_set():
+        try:
+            with socket.create_connection((host, port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.05)
+    return False
+
+
 def is_port_in_use(host: str, port: int) -> bool:
     """Check if a port is already in use."""
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
@@ -471,6 +552,25 @@ Examples:
         help="Automatically add missing position data (at_start, at_end, ot_start, ot_end) for existing phrases on server start"
     )
 
+    parser.add_argument(
+        "--exclude-near-duplicates",
+        action="store_true",
+        help="Leave near-duplicates of the annotated text out of the few-shot examples and use one example per duplicate cluster"
+    )
+
+    parser.add_argument(
+        "--propagate-duplicate-labels",
+        action="store_true",
+        help="Copy saved annotations to exact duplicates (identical text) that are unannotated or had the same label"
+    )
+
+    parser.add_argument(
+        "--near-duplicate-threshold",
+        type=float,
+        default=0.8,
+        help="Minimum estimated similarity (0-1, Jaccard of character 5-grams) of near-duplicate texts (default: 0.8)"
+    )
+
     parser.add_argument(
         "--store-time",
         action="store_true",
@@ -505,6 +605,12 @@ Examples:
         help="Save configuration to JSON file (default: absa_config.json)"
     )
 
+    parser.add_argument(
+        "--export",
+        metavar="OUTPUT",
+        help="Write the data file with all recorded timings merged into the items' 'timings' field to OUTPUT and exit"
+    )
+
     parser.add_argument(
         "--load-config",
         metavar="PATH",
@@ -544,6 +650,34 @@ Examples:
         help="Maximum number of few-shot examples to include in LLM prompts (default: 10)"
     )
 
+    parser.add_argument(
+        "--cache-predictions",
+        action="store_true",
+        help="Answer identical prediction requests (same prompt, schema and model) from an in-memory cache "
+             "instead of asking the model again"
+    )
+
+    parser.add_argument(
+        "--profile-dir",
+        metavar="DIR",
+        help="Profile backend requests with cProfile and save slow ones as .prof files in DIR"
+    )
+
+    parser.add_argument(
+        "--profile-threshold-ms",
+        type=float,
+        default=1000,
+        metavar="MS",
+        help="Only keep profiles of requests slower than MS milliseconds (default: 1000)"
+    )
+
+    parser.add_argument(
+        "--csv-engine",
+        choices=["c", "pyarrow"],
+        help="Parser for CSV data files: pandas' C engine (default) or pyarrow (faster on large files, "
+             "requires the pyarrow package; line breaks inside quoted cells are not supported)"
+    )
+
     # Server control arguments
     parser.add_argument(
         "--backend",
@@ -551,6 +685,42 @@ Examples:
         help="Start only the backend server"
     )
 
+    parser.add_argument(
+        "--serve",
+        metavar="BUILD_DIR",
+        nargs="?",
+        const=os.path.join("frontend", "build"),
+        help="Production mode: serve the pre-built frontend (npm run build) from the backend on a single port, without the Vite dev server (default: frontend/build)"
+    )
+
+    parser.add_argument(
+        "--projects",
+        metavar="PROJECTS_FILE",
+        help="JSON file of further projects ({name: {\"data_path\": ..., \"config_path\": ...}}) served by the same backend under /projects/<name>; open them with ?project=<name>"
+    )
+
+    parser.add_argument(
+        "--project-memory-mb",
+        type=float,
+        default=1024,
+        metavar="MB",
+        help="Memory budget of the loaded projects; least recently used projects are unloaded beyond it (default: 1024)"
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Run N backend worker processes that share the data file (implies --no-reload; Linux/macOS only)"
+    )
+
+    parser.add_argument(
+        "--no-reload",
+        action="store_true",
+        help="Run the backend without uvicorn's auto-reloader (faster startup, one process; recommended in production)"
+    )
+
     parser.add_argument(
         "--backend-port",
         type=int,
@@ -634,6 +804,15 @@ Examples:
     if args.auto_positions:
         config.set_auto_positions(True)
 
+    if args.exclude_near_duplicates:
+        config.set_exclude_near_duplicates(True)
+
+    if args.propagate_duplicate_labels:
+        config.set_propagate_duplicate_labels(True)
+
+    if args.near_duplicate_threshold != 0.8:
+        config.set_near_duplicate_threshold(args.near_duplicate_threshold)
+
     if args.store_time:
         config.set_store_time(True)
 
@@ -655,6 +834,21 @@ Examples:
     if args.n_few_shot:
         config.set_n_few_shot(args.n_few_shot)
 
+    if args.cache_predictions:
+        config.set_cache_predictions(True)
+
+    if args.profile_dir:
+        config.set_profiling(args.profile_dir, args.profile_threshold_ms)
+
+    if args.csv_engine:
+        if args.csv_engine == "pyarrow":
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                print("❌ Error: --csv-engine pyarrow requires the pyarrow package (pip install pyarrow)")
+                sys.exit(1)
+        config.set_csv_engine(args.csv_engine)
+
     # Show configuration if requested
     if args.show_config:
         config.print_config()
@@ -663,18 +857,60 @@ Examples:
     if args.save_config:
         config.save_config(args.save_config)
 
+    if args.export:
+        from telemetry import export_data
+        try:
+            export_data(args.data_path, args.export)
+        except ValueError as e:
+            print(f"❌ Error: {e}")
+            sys.exit(1)
+        return
+
     # Start servers if requested
     backend_port = args.backend_port
     backend_host = args.backend_ip
     frontend_port = args.frontend_port
     frontend_host = args.frontend_ip
 
-    if args.backend:
-        start_backend(backend_port, backend_host, args.data_path, config)
+    reload = not args.no_reload
+    workers = max(args.workers, 1)
+    if workers > 1:
+        from shared_state import supports_multiple_workers
+        if not supports_multiple_workers():
+            print("❌ Error: --workers needs file locking (fcntl), which is not available on this platform")
+            sys.exit(1)
+
+    if args.projects:
+        if workers > 1:
+            print("❌ Error: --projects cannot be combined with --workers (projects are hosted in one process)")
+            sys.exit(1)
+        from projects import load_definitions
+        try:
+            definitions = load_definitions(args.projects)
+        except (OSError, ValueError) as e:
+            print(f"❌ Error: Could not read projects file '{args.projects}': {e}")
+            sys.exit(1)
+        missing = [name for name, definition in definitions.items() if not os.path.exists(definition["data_path"])]
+        if missing:
+            print(f"⚠️  Data files not found for projects: {', '.join(missing)}")
+        os.environ['ABSA_PROJECTS_FILE'] = os.path.abspath(args.projects)
+        os.environ['ABSA_PROJECT_MEMORY_MB'] = str(args.project_memory_mb)
+        print(f"🗂️  Hosting {len(definitions)} projects from {args.projects} under /projects/<name>")
+
+    if args.serve:
+        if not os.path.exists(os.path.join(args.serve, "index.html")):
+            print(f"❌ No built frontend found in '{args.serve}'!")
+            print("💡 Build it once with: cd frontend && npm install && npm run build")
+            sys.exit(1)
+        print(f"🌐 AnnoABSA will be available at http://{backend_host}:{backend_port}")
+        start_backend(backend_port, backend_host, args.data_path, config, reload=False, frontend_dir=args.serve,
+                      workers=workers)
+    elif args.backend:
+        start_backend(backend_port, backend_host, args.data_path, config, reload, workers=workers)
     else:
         # Default behavior: start both servers
         start_full_app(backend_port, backend_host, frontend_port,
-                       frontend_host, args.data_path, config)
+                       frontend_host, args.data_path, config, reload, workers)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,378 @@
+"""
+Compact in-memory representation of a dataset for serving /data.
+
+A list of dicts (JSON) or an object-dtype DataFrame (CSV) costs one Python
+object per string and per label field, several GB for a million reviews.
+CompactStore keeps:
+
+- texts, translations and other CSV cells in contiguous UTF-8 buffers
+  with an offset array per column (StringColumn)
+- labels as packed arrays: per item the position and number of its tuples,
+  per tuple the ids of its aspect term, category, polarity and opinion term
+  (interned, so every distinct string is stored once), its span offsets
+  (at_start, at_end, ot_start, ot_end) and the id of its key order
+- aspect_category_list values interned by their JSON encoding
+
+Python objects are only created when an item is serialized for a response,
+and the serialized item is the same as the one built from the loaded data.
+CSV labels are parsed once, when the store is built; annotations() and
+annotated() return them parsed for both formats.
+Labels that do not fit the packed layout (other keys or value types) are
+kept as they are.
+
+Token tables (token offsets and lowercase forms, see token_tables.py) are
+computed on first use per item and kept in an LRU of TOKEN_TABLE_CACHE_SIZE
+items; texts never change while the store lives.
+
+Changing a label appends its tuples and points the item at them; the old
+tuples are dropped when the garbage outweighs the live tuples.
+"""
+import itertools
+import json
+import threading
+from array import array
+from collections import OrderedDict
+
+from token_tables import TokenTable
+
+LABEL_STRING_KEYS = ("aspect_term", "aspect_category", "sentiment_polarity", "opinion_term")
+LABEL_POSITION_KEYS = ("at_start", "at_end", "ot_start", "ot_end")
+_KEY_SLOTS = {key: slot for slot, key in enumerate(LABEL_STRING_KEYS + LABEL_POSITION_KEYS)}
+_INT32_MIN, _INT32_MAX = -2 ** 31, 2 ** 31 - 1
+TOKEN_TABLE_CACHE_SIZE = 10000
+
+# Item label states
+NO_LABEL = 0  # unannotated (JSON: no "label" key, CSV: empty cell)
+PACKED = 1
+RAW = 2  # kept as loaded
+
+
+def _array_nbytes(values):
+    return values.itemsize * len(values)
+
+
+class StringColumn:
+    """Strings in one contiguous UTF-8 buffer with an offset array."""
+
+    def __init__(self, values=()):
+        encoded = [value.encode("utf-8") for value in values]
+        self._buffer = b"".join(encoded)
+        self._offsets = array("q", [0])
+        self._offsets.extend(itertools.accumulate(map(len, encoded)))
+        if len(self._buffer) <= 0xFFFFFFFF:
+            self._offsets = array("I", self._offsets)
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, idx):
+        return self._buffer[self._offsets[idx]:self._offsets[idx + 1]].decode("utf-8")
+
+    def __eq__(self, other):
+        return (isinstance(other, StringColumn) and self._buffer == other._buffer
+                and self._offsets == other._offsets)
+
+    def nbytes(self):
+        return len(self._buffer) + _array_nbytes(self._offsets)
+
+
+class Interner:
+    """Distinct values stored once, referenced by id."""
+
+    def __init__(self):
+        self.values = []
+        self._ids = {}
+
+    def id(self, value):
+        value_id = self._ids.get(value)
+        if value_id is None:
+            value_id = self._ids[value] = len(self.values)
+            self.values.append(value)
+        return value_id
+
+    def nbytes(self):
+        # The strings plus their dict and list slots
+        return sum(len(value) if isinstance(value, str) else 64 for value in self.values) + 100 * len(self.values)
+
+
+class CompactStore:
+    """The items of a dataset in packed columns. Build it with from_json() or from_dataframe()."""
+
+    def __init__(self, file_type, columns=()):
+        self.file_type = file_type
+        # CSV: all columns in file order (serialized items have the same keys); JSON: not used
+        self.columns = list(columns)
+        self.texts = StringColumn()
+        self.translations = StringColumn()
+        self._has_translation = bytearray()
+        self._aspect_lists = array("i")  # id in _aspect_list_values, -1 if the item has none
+        self._aspect_list_values = Interner()
+        self._extra = {}  # CSV column -> StringColumn of JSON-encoded cells
+        self._label_state = bytearray()
+        self._label_start = array("I")
+        self._label_count = array("H")
+        self._raw_labels = {}  # idx -> label that does not fit the packed layout
+        self._tuple_shape = array("H")  # id in _shapes: the keys of the tuple in their order
+        self._tuple_values = array("i")  # 8 slots per tuple: 4 string ids, 4 positions
+        self._shapes = Interner()
+        self._strings = Interner()
+        self._garbage = 0
+        self._token_tables = OrderedDict()  # idx -> TokenTable, least recently used first
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_json(cls, items):
+        store = cls("json")
+        store.texts = StringColumn([str(item.get("text", "")) for item in items])
+        translations = [item.get("translation") for item in items]
+        store._has_translation = bytearray(translation is not None for translation in translations)
+        store.translations = StringColumn(
+            [str(translation) if translation is not None else "" for translation in translations])
+        for item in items:
+            aspects = item.get("aspect_category_list")
+            store._aspect_lists.append(
+                store._aspect_list_values.id(json.dumps(aspects, ensure_ascii=False)) if aspects is not None else -1)
+            store._append_label(item["label"] if "label" in item else None, "label" in item)
+        return store
+
+    @classmethod
+    def from_dataframe(cls, df):
+        """Build from a DataFrame read from a CSV file; missing cells (NaN, inf) become ""."""
+        import numpy as np
+        store = cls("csv", df.columns)
+        n = len(df)
+
+        def cells(column):
+            if column not in df.columns:
+                return [""] * n
+            # Missing values are replaced for the whole column at once
+            series = df[column]
+            missing = series.isna().to_numpy()
+            if series.dtype.kind == "f":
+                missing = missing | np.isinf(series.to_numpy())
+            values = series.to_numpy(dtype=object, copy=True)
+            values[missing] = ""
+            return values.tolist()
+
+        store.texts = StringColumn([str(text) for text in cells("text")])
+        store.translations = StringColumn([str(translation) for translation in cells("translation")])
+        store._has_translation = bytearray([1]) * n
+        for label in cells("label"):
+            store._append_label(label, label != "")
+        for column in store.columns:
+            if column in ("text", "translation", "label"):
+                continue
+            store._extra[column] = StringColumn(
+                [json.dumps(value, ensure_ascii=False) for value in cells(column)])
+        return store
+
+    def __len__(self):
+        return len(self._label_state)
+
+    # Labels
+
+    def _pack(self, tuples):
+        """Append the tuples to the packed arrays; returns their start or None if they do not fit."""
+        packed = []
+        string_id = self._strings.id
+        for entry in tuples:
+            if not isinstance(entry, dict):
+                return None
+            values = [0] * 8
+            for key, value in entry.items():
+                slot = _KEY_SLOTS.get(key)
+                if slot is None:
+                    return None
+                if slot < 4:
+                    if not isinstance(value, str):
+                        return None
+                    values[slot] = string_id(value)
+                else:
+                    if type(value) is not int or not _INT32_MIN <= value <= _INT32_MAX:
+                        return None
+                    values[slot] = value
+            packed.append((self._shapes.id(tuple(entry)), values))
+        start = len(self._tuple_shape)
+        for shape, values in packed:
+            self._tuple_shape.append(shape)
+            self._tuple_values.extend(values)
+        return start
+
+    def _append_label(self, label, present):
+        """Add the label of the next item: a list of dicts (JSON) or its JSON string (CSV)."""
+        self._label_state.append(NO_LABEL)
+        self._label_start.append(0)
+        self._label_count.append(0)
+        self._store_label(len(self._label_state) - 1, label, present)
+
+    def _store_label(self, idx, label, present):
+        self._raw_labels.pop(idx, None)
+        if not present:
+            self._label_state[idx] = NO_LABEL
+            self._label_count[idx] = 0
+            return
+        tuples = label
+        if self.file_type == "csv":
+            try:
+                tuples = json.loads(label) if isinstance(label, str) else None
+            except json.JSONDecodeError:
+                tuples = None
+            # Only labels that serialize back to the same text can be packed
+            if tuples is not None and json.dumps(tuples) != label:
+                tuples = None
+        start = self._pack(tuples) if isinstance(tuples, list) and len(tuples) <= 0xFFFF else None
+        if start is None:
+            self._label_state[idx] = RAW
+            self._label_count[idx] = 0
+            self._raw_labels[idx] = label
+        else:
+            self._label_state[idx] = PACKED
+            self._label_start[idx] = start
+            self._label_count[idx] = len(tuples)
+
+    def _unpack(self, idx):
+        start, count = self._label_start[idx], self._label_count[idx]
+        strings, shapes = self._strings.values, self._shapes.values
+        tuples = []
+        for position in range(start, start + count):
+            values = self._tuple_values[position * 8:position * 8 + 8]
+            entry = {}
+            for key in shapes[self._tuple_shape[position]]:
+                slot = _KEY_SLOTS[key]
+                entry[key] = strings[values[slot]] if slot < len(LABEL_STRING_KEYS) else values[slot]
+            tuples.append(entry)
+        return tuples
+
+    def label(self, idx):
+        """The label as loaded: a list of dicts (JSON) or a JSON string (CSV); None if unannotated."""
+        with self._lock:
+            state = self._label_state[idx]
+            if state == NO_LABEL:
+                return None
+            if state == RAW:
+                return self._raw_labels[idx]
+            tuples = self._unpack(idx)
+        return tuples if self.file_type == "json" else json.dumps(tuples)
+
+    def annotations(self, idx):
+        """The parsed label (list of annotation dicts) of an item; None if unannotated or not a list."""
+        with self._lock:
+            state = self._label_state[idx]
+            if state == PACKED:
+                return self._unpack(idx)
+            label = self._raw_labels.get(idx)
+        if self.file_type == "csv" and isinstance(label, str):
+            try:
+                label = json.loads(label)
+            except json.JSONDecodeError:
+                return None
+        return label if isinstance(label, list) else None
+
+    def annotated(self):
+        """(idx, annotations) of all items with a non-empty list of annotations."""
+        for idx in range(len(self)):
+            if self._label_state[idx] == NO_LABEL or (self._label_state[idx] == PACKED and not self._label_count[idx]):
+                continue
+            annotations = self.annotations(idx)
+            if annotations:
+                yield idx, annotations
+
+    def packed_labels(self):
+        """Copy of the label arrays for bulk readers (see search_index.py).
+
+        Returns (states, starts, counts, tuple shapes, tuple values, the key tuple of each shape,
+        the interned strings, {idx: annotations} of the items with a label that is not packed).
+        """
+        with self._lock:
+            arrays = (bytes(self._label_state), array("I", self._label_start), array("H", self._label_count),
+                      array("H", self._tuple_shape), array("i", self._tuple_values))
+            shapes, strings = list(self._shapes.values), list(self._strings.values)
+            raw = list(self._raw_labels)
+        return (*arrays, shapes, strings, {idx: self.annotations(idx) for idx in raw})
+
+    def has_label(self, idx):
+        """Whether the item has a label (JSON: a "label" key, CSV: a non-empty cell)."""
+        return self._label_state[idx] != NO_LABEL
+
+    def first_unannotated(self):
+        """Index of the first item without a label (JSON: no "label" key, CSV: empty cell), or len(self)."""
+        idx = self._label_state.find(NO_LABEL)
+        return idx if idx != -1 else len(self)
+
+    def set_label(self, idx, annotations):
+        """Replace the label of an item with a list of annotations (as saved by POST /annotations)."""
+        with self._lock:
+            self._garbage += self._label_count[idx]
+            self._store_label(idx, annotations if self.file_type == "json" else json.dumps(annotations), True)
+            if self._garbage > 1024 and self._garbage > len(self._tuple_shape) // 2:
+                self._compact()
+
+    def _compact(self):
+        """Copy the live tuples to new arrays, dropping the ones of replaced labels."""
+        shapes, values = array("H"), array("i")
+        for idx in range(len(self._label_state)):
+            if self._label_state[idx] != PACKED:
+                continue
+            start, count = self._label_start[idx], self._label_count[idx]
+            self._label_start[idx] = len(shapes)
+            shapes.extend(self._tuple_shape[start:start + count])
+            values.extend(self._tuple_values[start * 8:(start + count) * 8])
+        self._tuple_shape, self._tuple_values = shapes, values
+        self._garbage = 0
+
+    # Items
+
+    def tokens(self, idx):
+        """The TokenTable of an item's text."""
+        with self._lock:
+            table = self._token_tables.get(idx)
+            if table is not None:
+                self._token_tables.move_to_end(idx)
+                return table
+        table = TokenTable(self.texts[idx])
+        with self._lock:
+            self._token_tables[idx] = table
+            while len(self._token_tables) > TOKEN_TABLE_CACHE_SIZE:
+                self._token_tables.popitem(last=False)
+        return table
+
+    def serialize(self, idx, default_aspects):
+        """The /data representation of an item: label as a JSON string, translation and aspect categories."""
+        label = self.label(idx)
+        if self.file_type == "json":
+            aspect_id = self._aspect_lists[idx]
+            return {
+                "text": self.texts[idx],
+                "label": json.dumps(label) if label else "",
+                "translation": self.translations[idx] if self._has_translation[idx] else "",
+                "aspect_category_list": (json.loads(self._aspect_list_values.values[aspect_id])
+                                         if aspect_id >= 0 else default_aspects),
+            }
+
+        item = {}
+        for column in self.columns:
+            if column == "text":
+                item[column] = self.texts[idx]
+            elif column == "translation":
+                item[column] = self.translations[idx]
+            elif column == "label":
+                item[column] = label if label is not None else ""
+            else:
+                item[column] = json.loads(self._extra[column][idx])
+        if "translation" not in item:
+            item["translation"] = ""
+        item["aspect_category_list"] = item.get("aspect_category_list") or default_aspects
+        return item
+
+    def nbytes(self):
+        """Approximate memory of the store in bytes."""
+        arrays = (self._aspect_lists, self._label_start, self._label_count, self._tuple_shape, self._tuple_values)
+        raw = sum(len(json.dumps(label)) if not isinstance(label, str) else len(label)
+                  for label in self._raw_labels.values())
+        with self._lock:
+            tables = list(self._token_tables.values())
+        return (self.texts.nbytes() + self.translations.nbytes() + len(self._has_translation)
+                + len(self._label_state) + sum(_array_nbytes(values) for values in arrays)
+                + sum(column.nbytes() for column in self._extra.values())
+                + self._strings.nbytes() + self._shapes.nbytes() + self._aspect_list_values.nbytes() + raw
+                + sum(table.nbytes() for table in tables))
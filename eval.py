@@ -14,6 +14,7 @@ def main():
     parser.add_argument("--dataset_name", type=str, default="rest16", help="Name of the dataset, z.B. rest16")
     parser.add_argument("--seed", type=int, default=42, help="Random seed for reproducibility")
     parser.add_argument("--mode", type=str, default="random", help="Type of example retrieval mechanism")
+    parser.add_argument("--neighbours", type=str, default="evaluation/neighbours.npz", help="Precomputed BM25 neighbours (see eval_neighbours.py), used in rag mode if present")
     global args
     args = parser.parse_args()
 
@@ -142,6 +143,19 @@ print(unique_polarities)
 
 predictions = []
 
+# In rag mode, use precomputed neighbours if available instead of rebuilding BM25 for every sentence
+neighbour_ids = None
+if args.mode == "rag" and args.neighbours and os.path.exists(args.neighbours):
+    from eval_neighbours import load_neighbours, neighbours_key
+    task_str = "tasd" if task in ['tasd', 'acd', 'e2e'] else task
+    key = neighbours_key(task_str, args.dataset_name, args.seed, str(args.pool_size))
+    neighbour_ids = load_neighbours(args.neighbours).get(key)
+    if neighbour_ids is not None and len(neighbour_ids) == len(test_data):
+        print(f"Using precomputed neighbours {key} from {args.neighbours}")
+    else:
+        print(f"No matching precomputed neighbours for {key}, retrieving per sentence.")
+        neighbour_ids = None
+
 
 for idx, example in enumerate(test_data):
     example["text"] = example["text"].replace('"', "'")  # replace double quotes with single quotes
@@ -154,8 +168,11 @@ for idx, example in enumerate(test_data):
     signal.signal(signal.SIGALRM, timeout_handler)
     signal.alarm(10)
     
+    few_shot_examples = None
     if args.mode == "rag":
         few_shot_pool = pool
+        if neighbour_ids is not None:
+            few_shot_examples = [pool[i] for i in neighbour_ids[idx][:n_few_shot]]
     else:
         few_shot_pool = random.sample(pool, 10)
         print("took ", len(few_shot_pool), "examples from pool.")
@@ -169,7 +186,8 @@ for idx, example in enumerate(test_data):
         allow_implicit_aspect_terms=allow_implicit_aspect_terms,
         allow_implicit_opinion_terms=allow_implicit_opinion_terms,
         n_few_shot=n_few_shot,
-        llm_model=llm)[0]
+        llm_model=llm,
+        few_shot_examples=few_shot_examples)[0]
       signal.alarm(0)
     except TimeoutError:
       print("Prediction timed out after 10 seconds")
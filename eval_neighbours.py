@@ -0,0 +1,131 @@
+"""
+Precompute BM25 few-shot neighbours for the evaluation runs.
+
+In `rag` mode eval.py retrieves the 10 most similar pool examples for every
+test sentence, which rebuilds the BM25 index over the same pool each time.
+This script builds one index per (task data, dataset, seed, pool size) and
+scores all test sentences against it in a single batched pass. The resulting
+top-k pool indices are stored in one compressed .npz file:
+
+    key:   "{task_str}/{dataset}/seed_{seed}/{pool_size}"
+    value: uint16 array of shape (n_test_sentences, k), best neighbour first
+
+`task_str` is the data directory eval.py reads from ("tasd" for tasd/acd,
+"asqp" for asqp). Row i belongs to the i-th sentence of test.txt, column j is
+an index into the shuffled pool (train_data[:int(1000 * pool_size)]). The
+rankings are identical to `get_most_similar_examples` in main.py.
+"""
+import argparse, json, os, random
+import numpy as np
+from rank_bm25 import BM25Okapi
+from main import tokenize_for_bm25, top_n_indices
+
+POOL_SIZES = ["0.1", "0.2", "0.3", "0.4", "0.5", "0.6", "0.7", "0.8", "0.9", "1.0"]
+DATASET_NAMES = ["rest16", "flightabsa", "coursera", "hotels"]
+SEEDS = [42, 43, 44]
+TASK_STRS = ["tasd", "asqp"]
+
+
+def neighbours_key(task_str, dataset_name, seed, pool_size):
+    return f"{task_str}/{dataset_name}/seed_{seed}/{pool_size}"
+
+
+def load_texts(task_str, dataset_name, split):
+    """Read only the sentences of a split, in file order (labels are not needed for retrieval)."""
+    with open(f"evaluation/data/{task_str}/{dataset_name}/{split}.txt", "r", encoding="utf-8") as f:
+        return [line.strip().split("####")[0] for line in f]
+
+
+def batched_bm25_scores(tokenized_pool, tokenized_queries):
+    """Score every query against the pool with one shared BM25 index.
+
+    Term weights are computed once per vocabulary term with the same
+    expression BM25Okapi.get_scores uses, and query terms are accumulated in
+    query order, so the scores match the per-query path bit for bit.
+    """
+    bm25 = BM25Okapi(tokenized_pool)
+    vocab = {term: i for i, term in enumerate(bm25.idf)}
+
+    doc_len = np.array(bm25.doc_len)
+    # Row len(vocab) stays zero and is used for padding / unknown query terms
+    weights = np.zeros((len(vocab) + 1, bm25.corpus_size))
+    tf = np.zeros((len(vocab), bm25.corpus_size))
+    for doc_idx, freqs in enumerate(bm25.doc_freqs):
+        for term, freq in freqs.items():
+            tf[vocab[term], doc_idx] = freq
+    for term, term_id in vocab.items():
+        q_freq = tf[term_id]
+        weights[term_id] = (bm25.idf.get(term) or 0) * (q_freq * (bm25.k1 + 1) /
+                                                        (q_freq + bm25.k1 * (1 - bm25.b + bm25.b * doc_len / bm25.avgdl)))
+
+    max_len = max((len(q) for q in tokenized_queries), default=0)
+    query_ids = np.full((len(tokenized_queries), max_len), len(vocab))
+    for row, query in enumerate(tokenized_queries):
+        query_ids[row, :len(query)] = [vocab.get(term, len(vocab)) for term in query]
+
+    scores = np.zeros((len(tokenized_queries), bm25.corpus_size))
+    for position in range(max_len):
+        scores += weights[query_ids[:, position]]
+    return scores
+
+
+def compute_neighbours(task_str, dataset_name, seed, pool_sizes, k):
+    """Return {pool_size: (n_test, k) array} for one dataset and seed."""
+    train_texts = load_texts(task_str, dataset_name, "train")
+    # Same shuffle as eval.py: random.shuffle only depends on the seed and list length
+    random.seed(seed)
+    random.shuffle(train_texts)
+    # eval.py replaces double quotes before predicting
+    test_texts = [t.replace('"', "'") for t in load_texts(task_str, dataset_name, "test")]
+
+    tokenized_train = [tokenize_for_bm25(t) for t in train_texts]
+    tokenized_test = [tokenize_for_bm25(t) for t in test_texts]
+
+    result = {}
+    for pool_size in pool_sizes:
+        tokenized_pool = tokenized_train[:int(1000 * float(pool_size))]
+        n = min(k, len(tokenized_pool))
+        if len(tokenized_pool) == 1:
+            result[pool_size] = np.zeros((len(test_texts), 1), dtype=np.uint16)
+            continue
+        scores = batched_bm25_scores(tokenized_pool, tokenized_test)
+        result[pool_size] = np.array([top_n_indices(np.ascontiguousarray(row), n) for row in scores],
+                                     dtype=np.uint16).reshape(len(test_texts), n)
+    return result
+
+
+def load_neighbours(path):
+    """Load a neighbours file as a dict of arrays (keys as described in the module docstring)."""
+    with np.load(path) as f:
+        return {key: f[key] for key in f.files}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute BM25 few-shot neighbours for eval.py")
+    parser.add_argument("--output", type=str, default="evaluation/neighbours.npz", help="Output .npz file")
+    parser.add_argument("--k", type=int, default=10, help="Number of neighbours per test sentence")
+    parser.add_argument("--dataset_names", nargs="+", default=DATASET_NAMES)
+    parser.add_argument("--seeds", nargs="+", type=int, default=SEEDS)
+    parser.add_argument("--pool_sizes", nargs="+", default=POOL_SIZES)
+    parser.add_argument("--task_strs", nargs="+", default=TASK_STRS, help="Data directories, tasd (also used by acd) and asqp")
+    args = parser.parse_args()
+
+    arrays = {}
+    for task_str in args.task_strs:
+        for dataset_name in args.dataset_names:
+            if not os.path.exists(f"evaluation/data/{task_str}/{dataset_name}"):
+                print(f"Skipping {task_str}/{dataset_name}: no data")
+                continue
+            for seed in args.seeds:
+                print(f"Computing neighbours for {task_str}/{dataset_name}, seed {seed}")
+                for pool_size, ids in compute_neighbours(task_str, dataset_name, seed, args.pool_sizes, args.k).items():
+                    arrays[neighbours_key(task_str, dataset_name, seed, pool_size)] = ids
+
+    arrays["__meta__"] = np.array(json.dumps({"k": args.k, "retrieval": "bm25okapi"}))
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    np.savez_compressed(args.output, **arrays)
+    print(f"Saved {len(arrays) - 1} neighbour tables to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
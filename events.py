@@ -0,0 +1,121 @@
+"""
+Server-sent events for the AnnoABSA frontend.
+
+Clients connect to GET /events (an EventSource in the browser) and receive
+named events as JSON instead of polling /settings and /avg-annotation-time:
+
+- "progress": total_count, current_index and max_number_of_idxs
+- "avg_annotation_time": the payload of /avg-annotation-time
+- "prediction": data_idx of an AI prediction that just finished
+- "auto_positions": progress of a job filling missing phrase positions
+- "label_stats": the payload of /stats
+- "items_changed": {"items": [...]} indices of items written since the last such event, or {"all": true}
+
+publish() may be called from any thread (sync endpoints run in a
+threadpool); events are handed to each subscriber's event loop. The writer
+computes an update once and every connected client receives it, so the cost
+of a write does not grow with the number of open tabs.
+
+Each backend (every project of a multi-project server, see projects.py)
+has its own Channel, so its clients only receive its own events.
+
+A stream ends when its client disconnects (checked every
+DISCONNECT_CHECK_SECONDS) or when the backend shuts down and closes its
+Channel. uvicorn waits for open connections before it runs the shutdown
+event, so the CLI starts it with a graceful-shutdown timeout after which
+the remaining streams are cancelled; browsers reconnect automatically.
+"""
+import asyncio
+import json
+import threading
+import time
+
+HEARTBEAT_SECONDS = 15
+DISCONNECT_CHECK_SECONDS = 1
+QUEUE_SIZE = 100
+
+
+class _Subscriber:
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.dropped = False
+
+    def put(self, message):
+        if message is None:
+            # Shutdown: end the stream even if the queue is full
+            self.dropped = True
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # A client that does not keep up is disconnected; EventSource reconnects
+            # and gets a fresh snapshot.
+            self.dropped = True
+
+
+def format_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class Channel:
+    """The SSE clients of one backend."""
+
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def has_subscribers(self):
+        return bool(self._subscribers)
+
+    def publish(self, event, data):
+        """Send an event to all connected clients. Thread-safe."""
+        if not self._subscribers:
+            return
+        self._broadcast(format_event(event, data))
+
+    def close(self):
+        """End all open streams of this channel. Thread-safe."""
+        self._broadcast(None)
+
+    def _broadcast(self, message):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.put, message)
+            except RuntimeError:
+                # The subscriber's event loop is closed
+                with self._lock:
+                    self._subscribers.discard(subscriber)
+
+    async def stream(self, request, snapshot=()):
+        """Yield SSE messages for one client: the snapshot events first, then published events.
+
+        The stream ends once the client disconnects; a comment line is sent
+        every HEARTBEAT_SECONDS without events so proxies keep the connection open.
+        """
+        subscriber = _Subscriber(asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.add(subscriber)
+        try:
+            yield "retry: 3000\n\n"
+            for event, data in snapshot:
+                yield format_event(event, data)
+            last_sent = time.monotonic()
+            while not subscriber.dropped:
+                try:
+                    message = await asyncio.wait_for(subscriber.queue.get(), DISCONNECT_CHECK_SECONDS)
+                    if message is None:
+                        break
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    if time.monotonic() - last_sent < HEARTBEAT_SECONDS:
+                        continue
+                    message = ": keep-alive\n\n"
+                last_sent = time.monotonic()
+                yield message
+        finally:
+            with self._lock:
+                self._subscribers.discard(subscriber)
+
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from "react";
+import React, { useState, useEffect, useRef } from "react";
 import { getAnnotationColorClasses, createTextHighlights, renderHighlightedText, getUsedColorIndices, getColorByIndex } from "./phraseColoring";
 import { AspectItem, NewAspect, FieldType, TextPosition, Settings } from "./types";
 import { useDarkMode } from "./hooks/useDarkMode";
@@ -11,6 +11,8 @@ function App() {
 
   const [displayedText, setDisplayedText] = useState<string>("");
   const [displayedTranslation, setDisplayedTranslation] = useState<string>("");
+  // [start, end] of each token of displayedText, from /data
+  const [tokenOffsets, setTokenOffsets] = useState<[number, number][] | null>(null);
   const [consideredSentimentElements, setConsideredSentimentElements] = useState<string[]>([]);
   const [newAspect, setNewAspect] = useState<NewAspect>({
     "aspect_term": "",
@@ -43,6 +45,12 @@ function App() {
   const [enablePrePrediction, setEnablePrePrediction] = useState<boolean>(false);
   const [disableAiAutomaticPrediction, setDisableAiAutomaticPrediction] = useState<boolean>(false);
   const [annotationGuideline, setAnnotationGuideline] = useState<string | null>(null);
+  // True while the /events stream is open; progress and average time are then pushed by the backend
+  const eventStreamConnected = useRef(false);
+  // Upcoming items fetched in one request (GET /data?start=&count=); each entry is used once
+  const prefetchedItems = useRef<Map<number, any>>(new Map());
+  // Bumped whenever prefetched items are dropped; batches requested before that may hold the old state
+  const prefetchGeneration = useRef(0);
   const [isAIPredicting, setIsAIPredicting] = useState<boolean>(false);
 
   // Backend states
@@ -66,8 +74,11 @@ function App() {
   const [aiTriggeredForIndex, setAiTriggeredForIndex] = useState<boolean>(false);
 
 
-  // Get backend URL from environment or use default
-  const backendUrl = (import.meta as any).env?.VITE_BACKEND_URL || 'http://localhost:8000';
+  // Get backend URL from environment or use default; ?project=<name> selects a project of a multi-project backend
+  const project = new URLSearchParams(window.location.search).get('project');
+  const backendUrl = ((import.meta as any).env?.VITE_BACKEND_URL ||
+    ((import.meta as any).env?.PROD ? window.location.origin : 'http://localhost:8000')) +
+    (project ? `/projects/${encodeURIComponent(project)}` : '');
 
   // Function to mix colors mathematically
   // Helper functions
@@ -109,9 +120,34 @@ function App() {
     return trimmedText.substring(0, maxLength) + "...";
   };
 
+  // Index of the last token starting at or before charIndex (-1 if none)
+  const findToken = (offsets: [number, number][], charIndex: number): number => {
+    let low = 0;
+    let high = offsets.length - 1;
+    while (low <= high) {
+      const mid = (low + high) >> 1;
+      if (offsets[mid][0] <= charIndex) low = mid + 1;
+      else high = mid - 1;
+    }
+    return high;
+  };
+
   const getTokenBounds = (text: string, charIndex: number): { start: number; end: number } => {
     if (!text || charIndex < 0 || charIndex >= text.length) return { start: charIndex, end: charIndex };
 
+    // The backend's token table uses code point offsets, which only match string indices without surrogate pairs
+    if (tokenOffsets && text === displayedText && !/[\uD800-\uDFFF]/.test(text)) {
+      const token = findToken(tokenOffsets, charIndex);
+      if (token >= 0 && tokenOffsets[token][1] >= charIndex) {
+        return { start: tokenOffsets[token][0], end: tokenOffsets[token][1] };
+      }
+      // A boundary character: extend over the tokens directly before and after it
+      const before = token >= 0 && tokenOffsets[token][1] === charIndex - 1 ? tokenOffsets[token][0] : charIndex;
+      const next = tokenOffsets[token + 1];
+      const after = next && next[0] === charIndex + 1 ? next[1] : charIndex;
+      return { start: before, end: after };
+    }
+
     // Define token boundaries (whitespace and punctuation)
     const isTokenBoundary = (char: string): boolean => /[\s.,;:!?¡¿"'`´''""„«»()[\]{}]+/.test(char);
 
@@ -763,14 +799,15 @@ function App() {
       setShowAvgAnnotationTime(settings["display_avg_annotation_time"] === true); // Default to false
       setEnablePrePrediction(settings["enable_pre_prediction"] === true); // Default to false
       setDisableAiAutomaticPrediction(settings["disable_ai_automatic_prediction"] === true); // Default to false
-      setAnnotationGuideline(settings["annotation_guideline"]);
+      // The backend returns a relative, content-versioned URL for the guideline PDF
+      setAnnotationGuideline(settings["annotation_guideline"] ? `${backendUrl}${settings["annotation_guideline"]}` : null);
       setSettingsCurrentIndex(settings["current_index"]);
       setMaxIndex(settings["max_number_of_idxs"]);
       setTotalCount(settings["total_count"]);
       setSessionId(settings["session_id"] || null);
 
-      // Load average annotation time if enabled
-      if (settings["display_avg_annotation_time"] === true) {
+      // Load average annotation time if enabled (pushed via /events while connected)
+      if (settings["display_avg_annotation_time"] === true && !eventStreamConnected.current) {
         await fetchAvgAnnotationTime();
       }
 
@@ -792,6 +829,25 @@ function App() {
     }
   };
 
+  const PREFETCH_COUNT = 5;
+
+  // Prefetch the items after the current one so that "next" needs no round trip
+  const prefetchItems = async (start: number): Promise<void> => {
+    if (totalCount > 0 && start >= totalCount) return;
+    const generation = prefetchGeneration.current;
+    try {
+      const response = await fetch(
+        `${backendUrl}/data?start=${start}&count=${PREFETCH_COUNT}&fields=text,label,translation,aspect_category_list,tokens`
+      );
+      if (!response.ok) return;
+      const batch = await response.json();
+      if (generation !== prefetchGeneration.current) return;
+      batch.items.forEach((item: any) => prefetchedItems.current.set(item.idx, item));
+    } catch (error) {
+      // Prefetching is best effort; fetchData falls back to /data/{index}
+    }
+  };
+
   // fetchData: Zeitmessung starten und letzte Annotation merken
   const fetchData = async (index: number): Promise<void> => {
     // Abort any ongoing AI prediction when changing index
@@ -799,13 +855,23 @@ function App() {
     
     setIsLoadingData(true);
     try {
-      const response = await fetch(`${backendUrl}/data/${index}`);
-      const data = await response.json();
+      let data = prefetchedItems.current.get(index);
+      if (data) {
+        // Used once, so revisiting an item always shows its saved state
+        prefetchedItems.current.delete(index);
+      } else {
+        const response = await fetch(`${backendUrl}/data/${index}`);
+        data = await response.json();
+      }
+      if (!prefetchedItems.current.has(index + 1)) {
+        prefetchItems(index + 1);
+      }
       // Update aspect category options based on example-specific list
       if (data.aspect_category_list) {
         setValidAspectCategories(data.aspect_category_list);
       }
       setDisplayedText(data.text || "");
+      setTokenOffsets(Array.isArray(data.tokens) ? data.tokens : null);
       setDisplayedTranslation(data.translation || "");
       let existingAnnotations = [];
       if (data.label && data.label !== "") {
@@ -965,6 +1031,12 @@ function App() {
       });
 
       if (response.ok) {
+        const result = await response.json();
+        // Exact duplicates that received the same annotations must not be shown from the prefetch cache
+        if ((result.propagated_to || []).length) {
+          prefetchGeneration.current += 1;
+          result.propagated_to.forEach((idx: number) => prefetchedItems.current.delete(idx));
+        }
         return true;
       }
     } catch (error) {
@@ -978,8 +1050,8 @@ function App() {
 
     const success = await saveAnnotations(aspectList);
     if (success) {
-      // Fetch updated settings to get new current_index
-      await fetchSettings();
+      // Fetch updated settings to get new current_index (pushed via /events while connected)
+      if (!eventStreamConnected.current) await fetchSettings();
       const nextIndex = currentIndex + 1;
       // Allow navigation to next index as long as it's not beyond the total count
       if (nextIndex < totalCount) {
@@ -998,7 +1070,7 @@ function App() {
     // saveAnnotations ohne Timing aufrufen (skipTiming = true)
     const success = await saveAnnotations([], true);
     if (success) {
-      await fetchSettings();
+      if (!eventStreamConnected.current) await fetchSettings();
       const nextIndex = currentIndex + 1;
       // Allow navigation to next index as long as it's not beyond the total count
       if (nextIndex < totalCount) {
@@ -1047,6 +1119,44 @@ function App() {
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, [totalCount]);
 
+  // Subscribe to progress and average annotation time updates pushed by the backend
+  useEffect(() => {
+    if (typeof EventSource === 'undefined') return;
+    const source = new EventSource(`${backendUrl}/events`);
+    source.onopen = () => {
+      eventStreamConnected.current = true;
+      // Changes made while the stream was down were missed, so prefetched items may be stale
+      prefetchGeneration.current += 1;
+      prefetchedItems.current.clear();
+    };
+    // EventSource reconnects by itself; fall back to fetching settings until it does
+    source.onerror = () => { eventStreamConnected.current = false; };
+    source.addEventListener('progress', (event) => {
+      const progress = JSON.parse((event as MessageEvent).data);
+      setSettingsCurrentIndex(progress.current_index);
+      setMaxIndex(progress.max_number_of_idxs);
+      setTotalCount(progress.total_count);
+    });
+    // Items saved by anyone (other annotators, other workers, auto-positions) must be fetched again
+    source.addEventListener('items_changed', (event) => {
+      const changed = JSON.parse((event as MessageEvent).data);
+      prefetchGeneration.current += 1;
+      if (changed.all) {
+        prefetchedItems.current.clear();
+      } else {
+        (changed.items || []).forEach((idx: number) => prefetchedItems.current.delete(idx));
+      }
+    });
+    source.addEventListener('avg_annotation_time', (event) => {
+      setAvgAnnotationTime(JSON.parse((event as MessageEvent).data).avg_annotation_time || 0);
+    });
+    return () => {
+      eventStreamConnected.current = false;
+      source.close();
+    };
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, []);
+
   // Initialize form when consideredSentimentElements changes
   useEffect(() => {
     if (consideredSentimentElements.length > 0) {
@@ -1209,7 +1319,7 @@ function App() {
                       const prevIndex = currentIndex - 1;
                       setCurrentIndex(prevIndex);
                       await fetchData(prevIndex);
-                      await fetchSettings(); // Update settings after navigation
+                      if (!eventStreamConnected.current) await fetchSettings(); // Update settings after navigation
                     }}
                     disabled={currentIndex <= 0 || isLoadingData}
                     className="px-4 py-1 rounded bg-gray-100 hover:bg-gray-200 disabled:bg-gray-50 disabled:text-gray-300 dark:bg-gray-700 dark:hover:bg-gray-600 dark:disabled:bg-gray-800 dark:disabled:text-gray-500 text-gray-600 dark:text-gray-300"
@@ -1227,7 +1337,7 @@ function App() {
                       const nextIndex = currentIndex + 1;
                       setCurrentIndex(nextIndex);
                       await fetchData(nextIndex);
-                      await fetchSettings(); // Update settings after navigation
+                      if (!eventStreamConnected.current) await fetchSettings(); // Update settings after navigation
                     }}
                     disabled={currentIndex >= settingsCurrentIndex || isLoadingData}
                     className="px-4 py-1 rounded bg-gray-100 hover:bg-gray-200 disabled:bg-gray-50 disabled:text-gray-300 dark:bg-gray-700 dark:hover:bg-gray-600 dark:disabled:bg-gray-800 dark:disabled:text-gray-500 text-gray-600 dark:text-gray-300"
@@ -1245,7 +1355,7 @@ function App() {
                         : settingsCurrentIndex;
                       setCurrentIndex(targetIndex);
                       await fetchData(targetIndex);
-                      await fetchSettings(); // Update settings after navigation
+                      if (!eventStreamConnected.current) await fetchSettings(); // Update settings after navigation
                     }}
                     disabled={currentIndex + 1 > settingsCurrentIndex || isLoadingData}
                     className="px-4 py-1 rounded bg-gray-100 hover:bg-gray-200 disabled:bg-gray-50 disabled:text-gray-300 dark:bg-gray-700 dark:hover:bg-gray-600 dark:disabled:bg-gray-800 dark:disabled:text-gray-500 text-gray-600 dark:text-gray-300"
@@ -0,0 +1,139 @@
+"""
+Running statistics of the annotations of a dataset.
+
+The backend keeps one LabelStats per compact store: it is counted once
+from the store's packed label arrays and then, on every annotation write,
+updated by removing the old label of the item and adding the new one, so
+GET /stats answers in O(number of distinct categories and polarities)
+instead of scanning every label.
+
+Counted are the items with a label, the annotations per item, the
+annotations per aspect_category, per sentiment_polarity and per
+(aspect_category, sentiment_polarity) pair, and how many aspect and
+opinion terms are implicit ("NULL").
+"""
+import threading
+from collections import Counter
+
+import numpy as np
+
+from compact_store import LABEL_STRING_KEYS, PACKED
+
+_ASPECT, _CATEGORY, _POLARITY, _OPINION = range(len(LABEL_STRING_KEYS))
+
+
+def _rate(part, whole):
+    return round(part / whole, 4) if whole else None
+
+
+class LabelStats:
+    """Counters of the labels of one dataset."""
+
+    def __init__(self):
+        self.total_items = 0
+        self.annotated_items = 0  # items with a label, including empty ones
+        self.annotations_per_item = Counter()  # number of annotations -> annotated items
+        self.categories = Counter()
+        self.polarities = Counter()
+        self.pairs = Counter()  # (category, polarity) -> annotations
+        self.aspect_terms = 0
+        self.null_aspect_terms = 0
+        self.opinion_terms = 0
+        self.null_opinion_terms = 0
+        self.lock = threading.Lock()
+
+    def add_packed(self, packed, total_items):
+        """Count the labels of a CompactStore.packed_labels() snapshot of total_items items."""
+        states, starts, counts, shapes, values, shape_keys, strings, raw = packed
+        items = np.flatnonzero(np.frombuffer(states, dtype=np.uint8) == PACKED)
+        counts = np.frombuffer(counts, dtype=np.uint16).astype(np.int64)[items]
+        tuples = (np.repeat(np.frombuffer(starts, dtype=np.uint32).astype(np.int64)[items], counts)
+                  + np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts, counts))
+        tuple_values = np.frombuffer(values, dtype=np.int32).reshape(-1, 8)[tuples]
+        shape_fields = np.array([[key in keys for key in LABEL_STRING_KEYS] for keys in shape_keys],
+                                dtype=bool).reshape(-1, len(LABEL_STRING_KEYS))
+        present = shape_fields[np.frombuffer(shapes, dtype=np.uint16)[tuples]]
+
+        def count_ids(ids):
+            return {strings[value_id]: int(count) for value_id, count in enumerate(np.bincount(ids)) if count}
+
+        def count_null(slot):
+            terms = tuple_values[present[:, slot], slot]
+            null_id = strings.index("NULL") if "NULL" in strings else -1
+            return len(terms), int(np.count_nonzero(terms == null_id))
+
+        both = present[:, _CATEGORY] & present[:, _POLARITY]
+        width = max(len(strings), 1)
+        pair_keys = tuple_values[both, _CATEGORY].astype(np.int64) * width + tuple_values[both, _POLARITY]
+        pair_keys, pair_counts = np.unique(pair_keys, return_counts=True)
+        aspect_terms, null_aspect_terms = count_null(_ASPECT)
+        opinion_terms, null_opinion_terms = count_null(_OPINION)
+        with self.lock:
+            self.total_items += total_items
+            self.annotated_items += len(items)
+            self.annotations_per_item.update(
+                {n: int(count) for n, count in enumerate(np.bincount(counts)) if count})
+            self.categories.update(count_ids(tuple_values[present[:, _CATEGORY], _CATEGORY]))
+            self.polarities.update(count_ids(tuple_values[present[:, _POLARITY], _POLARITY]))
+            self.pairs.update({(strings[key // width], strings[key % width]): count
+                               for key, count in zip(pair_keys.tolist(), pair_counts.tolist())})
+            self.aspect_terms += aspect_terms
+            self.null_aspect_terms += null_aspect_terms
+            self.opinion_terms += opinion_terms
+            self.null_opinion_terms += null_opinion_terms
+        for annotations in raw.values():
+            self.replace(None, annotations or [])
+
+    def _count(self, annotations, sign):
+        if annotations is None:
+            return
+        self.annotated_items += sign
+        self.annotations_per_item[len(annotations)] += sign
+        for annotation in annotations:
+            if not isinstance(annotation, dict):
+                continue
+            category, polarity = annotation.get("aspect_category"), annotation.get("sentiment_polarity")
+            if isinstance(category, str):
+                self.categories[category] += sign
+            if isinstance(polarity, str):
+                self.polarities[polarity] += sign
+            if isinstance(category, str) and isinstance(polarity, str):
+                self.pairs[(category, polarity)] += sign
+            if isinstance(annotation.get("aspect_term"), str):
+                self.aspect_terms += sign
+                self.null_aspect_terms += sign * (annotation["aspect_term"] == "NULL")
+            if isinstance(annotation.get("opinion_term"), str):
+                self.opinion_terms += sign
+                self.null_opinion_terms += sign * (annotation["opinion_term"] == "NULL")
+
+    def replace(self, old, new):
+        """Change the counts of one item from its old to its new annotations (None: the item has no label)."""
+        with self.lock:
+            self._count(old, -1)
+            self._count(new, 1)
+            for counter in (self.annotations_per_item, self.categories, self.polarities, self.pairs):
+                # Drop the keys that reached zero
+                counter += Counter()
+
+    def summary(self):
+        """The /stats payload: counts sorted by frequency, and the implicit (NULL) term rates."""
+        with self.lock:
+            annotations = sum(n * count for n, count in self.annotations_per_item.items())
+            by_category = {}
+            for (category, polarity), count in sorted(self.pairs.items(), key=lambda pair: (-pair[1], pair[0])):
+                by_category.setdefault(category, {})[polarity] = count
+            return {
+                "total_count": self.total_items,
+                "annotated_items": self.annotated_items,
+                "annotations": annotations,
+                "annotations_per_item": {str(n): count for n, count in sorted(self.annotations_per_item.items())},
+                "mean_annotations_per_item": round(annotations / self.annotated_items, 4) if self.annotated_items else None,
+                "aspect_categories": dict(self.categories.most_common()),
+                "sentiment_polarities": dict(self.polarities.most_common()),
+                "category_polarities": {category: by_category[category] for category in
+                                        sorted(by_category, key=lambda category: -self.categories[category])},
+                "null_aspect_terms": self.null_aspect_terms,
+                "null_aspect_term_rate": _rate(self.null_aspect_terms, self.aspect_terms),
+                "null_opinion_terms": self.null_opinion_terms,
+                "null_opinion_term_rate": _rate(self.null_opinion_terms, self.opinion_terms),
+            }
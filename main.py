@@ -1,15 +1,72 @@
+import time
+_IMPORT_START = time.perf_counter()
+import importlib
 import re
-import numpy as np
-from rank_bm25 import BM25Okapi
-from fastapi import FastAPI
+from fastapi import FastAPI, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import FileResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
-import pandas as pd
 import json
 import os
+import shutil
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
 from fastapi import HTTPException
+import auto_positions
+import compact_store
+import events
+import write_queue
+import metrics
+import profiling
+import shared_state
+import telemetry
+import timing_stats
+import token_tables
+
+# Startup time breakdown in seconds, printed when the server starts.
+# pandas (CSV only), numpy and rank_bm25 (AI predictions only) are imported on first use.
+STARTUP_TIMINGS = OrderedDict(imports=time.perf_counter() - _IMPORT_START)
+_LAZY_MODULES = {}
+
+
+def lazy_import(name):
+    """Import a heavy module the first time a feature needs it and record how long that took."""
+    module = _LAZY_MODULES.get(name)
+    if module is None:
+        start = time.perf_counter()
+        module = importlib.import_module(name)
+        duration = time.perf_counter() - start
+        _LAZY_MODULES[name] = module
+        STARTUP_TIMINGS[f"import {name}"] = duration
+        print(f"📦 Loaded {name} on first use ({duration * 1000:.0f} ms)")
+    return module
+
+# API routes whose responses are never gzipped: the event stream has to reach clients unbuffered,
+# and the guideline PDF is served with byte ranges of the uncompressed file
+UNCOMPRESSED_ROUTES = {"/events", "/annotation-guideline"}
+GZIP_MINIMUM_SIZE = 1024
+
+
+class CompressedRoute(profiling.ProfilingRoute):
+    """Route of the JSON API: its responses are gzipped unless the path is in UNCOMPRESSED_ROUTES.
+
+    Compression is set up per route, so mounts (the built frontend with its precompressed
+    files, the backends of projects) are left alone and no request is routed twice.
+    """
+
+    def __init__(self, path, endpoint, **kwargs):
+        super().__init__(path, endpoint, **kwargs)
+        if path not in UNCOMPRESSED_ROUTES:
+            self.app = GZipMiddleware(self.app, minimum_size=GZIP_MINIMUM_SIZE)
+
 
 app = FastAPI()
+# Profiles slow sync endpoint calls when profiling is enabled (see profiling.py) and gzips API responses
+app.router.route_class = CompressedRoute
 
 # Global variable to store the data file path and type
 DATA_FILE_PATH = os.environ.get('ABSA_DATA_PATH', "annotations.csv")  # Default
@@ -18,6 +75,7 @@ CONFIG_PATH = os.environ.get('ABSA_CONFIG_PATH', None)  # Path to config file
 CONFIG_DATA = {}  # Store configuration data including session_id
 
 # Load configuration if provided
+_CONFIG_START = time.perf_counter()
 CONFIG_PATH = os.environ.get('ABSA_CONFIG_PATH')
 if CONFIG_PATH and os.path.exists(CONFIG_PATH):
     try:
@@ -26,15 +84,83 @@ if CONFIG_PATH and os.path.exists(CONFIG_PATH):
     except Exception as e:
         print(f"Warning: Could not load config from {CONFIG_PATH}: {e}")
 
+# Number of uvicorn worker processes (annoabsa --workers). With more than one, data file writes
+# and the version counters below are coordinated through files next to the data file, see shared_state.py
+WORKERS = int(os.environ.get('ABSA_WORKERS', '1'))
+_CHANGE_FEED = None
+
+# Version counters behind the ETags of /settings, /data/{idx} and /avg-annotation-time.
+# They are kept in memory: the epoch changes on every start so ETags of earlier runs never match,
+# and edits made to the data file outside of the backend are only picked up after a restart.
+# All workers of one server share the epoch (ABSA_INSTANCE_ID, set by the CLI).
+_VERSION_EPOCH = os.environ.get('ABSA_INSTANCE_ID') or f"{os.getpid():x}{time.time_ns():x}"
+_VERSION_LOCK = threading.Lock()
+_DATA_VERSION = 0  # bumped on every change of the dataset
+_DATA_GENERATION = 0  # bumped when the whole dataset changes (new file, bulk updates)
+_CONFIG_VERSION = 0
+_ITEM_VERSIONS = {}  # data_idx -> number of changes since the last generation
+_DATA_LENGTH = None  # (generation, number of items), so timing events are validated without a load
+# Items changed since the last "items_changed" event, so clients drop their prefetched copies;
+# beyond MAX_CHANGED_ITEMS (or on a change of the whole dataset) all items are reported as changed
+_CHANGED_ITEMS = set()
+_ALL_ITEMS_CHANGED = False
+MAX_CHANGED_ITEMS = 10000
+
+# Running timing statistics of the current dataset, rebuilt lazily when the generation changes
+# and fed with the events appended to the timing sink (by any worker) since _TIMING_SINK_OFFSET
+_TIMING_STATS = None
+_TIMING_STATS_GENERATION = None
+_TIMING_SINK_OFFSET = 0
+_TIMING_STATS_LOCK = threading.Lock()
+_TIMING_SINK = None  # append-only timing events of the current data file, see telemetry.py
+
+# The dataset in compact form for /data (see compact_store.py), built on first use and kept
+# current by the change records: label changes are applied to it, other changes drop it
+_STORE = None
+_STORE_LOCK = threading.Lock()
+
+# Near-duplicate index over the item texts (see near_duplicates.py), built on first use and synced
+# with the store whenever that is rebuilt (only changed texts are hashed again)
+_NEAR_DUPLICATES = None
+_NEAR_DUPLICATES_STORE = None  # weak reference to the store it was synced with
+_NEAR_DUPLICATES_LOCK = threading.Lock()
+
+# Inverted index over the item texts and annotations for /search (see search_index.py), built on first use.
+# Label changes are applied to it along with the store; when the store is rebuilt, it is synced with the new one
+_SEARCH_INDEX = None
+_SEARCH_INDEX_STORE = None  # weak reference to the store whose label changes it receives
+# Label changes of that store recorded while a new index is built for it, applied once the build is done.
+# The index is built without holding _VERSION_LOCK, so writes do not wait for it
+_SEARCH_INDEX_PENDING = None
+_SEARCH_INDEX_LOCK = threading.Lock()  # held while an index is built, never by the write path
+
+# Label statistics for /stats (see label_stats.py), counted once per store and updated with the old and
+# new label of every label change applied to that store
+_LABEL_STATS = None
+_LABEL_STATS_STORE = None  # weak reference to the store whose label changes it receives
+_LABEL_STATS_LOCK = threading.Lock()
+
+# Built frontend to serve from the backend (annoabsa --serve), None when Vite serves it
+FRONTEND_DIR = os.environ.get('ABSA_FRONTEND_DIR')
+
+# Projects file of a multi-project server (annoabsa --projects), served under /projects/{name}, see projects.py
+PROJECTS_FILE = os.environ.get('ABSA_PROJECTS_FILE')
+PROJECT_MEMORY_MB = float(os.environ.get('ABSA_PROJECT_MEMORY_MB', '1024'))
+PROJECT_HOST = None
+
 # Get auto_positions flag from loaded configuration
 AUTO_POSITIONS = CONFIG_DATA.get('auto_positions', False)
 
+profiling.configure(CONFIG_DATA.get('profile_dir'), CONFIG_DATA.get('profile_threshold_ms'))
+STARTUP_TIMINGS["config"] = time.perf_counter() - _CONFIG_START
+
 
 def set_data_file(file_path: str):
     """Set the data file path and determine file type."""
     global DATA_FILE_PATH, DATA_FILE_TYPE
     DATA_FILE_PATH = file_path
     DATA_FILE_TYPE = "json" if file_path.endswith('.json') else "csv"
+    mark_data_changed()
 
 
 def set_config_file(config_path: str):
@@ -72,31 +198,302 @@ def load_config():
 
 def set_config(config_dict: dict):
     """Set the configuration data including session_id."""
-    global CONFIG_DATA
+    global CONFIG_DATA, _CONFIG_VERSION
     CONFIG_DATA = config_dict
+    with _VERSION_LOCK:
+        _CONFIG_VERSION += 1
+    profiling.configure(config_dict.get('profile_dir'), config_dict.get('profile_threshold_ms'))
+
+
+def change_feed():
+    """The change feed shared by the worker processes, None with a single worker."""
+    global _CHANGE_FEED
+    if WORKERS <= 1:
+        return None
+    path = shared_state.feed_path(DATA_FILE_PATH)
+    if _CHANGE_FEED is None or _CHANGE_FEED.path != path:
+        _CHANGE_FEED = shared_state.ChangeFeed(path)
+    return _CHANGE_FEED
+
+
+def _apply_change(change):
+    """Bump the version counters and update the store for one change; the caller holds _VERSION_LOCK."""
+    global _DATA_VERSION, _DATA_GENERATION, _STORE, _ALL_ITEMS_CHANGED
+    _DATA_VERSION += 1
+    if "item" in change:
+        _ITEM_VERSIONS[change["item"]] = _ITEM_VERSIONS.get(change["item"], 0) + 1
+        if not _ALL_ITEMS_CHANGED:
+            _CHANGED_ITEMS.add(change["item"])
+            if len(_CHANGED_ITEMS) > MAX_CHANGED_ITEMS:
+                _ALL_ITEMS_CHANGED = True
+                _CHANGED_ITEMS.clear()
+        if _STORE is not None and "label" in change and 0 <= change["item"] < len(_STORE):
+            counted = _LABEL_STATS_STORE is not None and _LABEL_STATS_STORE() is _STORE
+            if counted:
+                old = (_STORE.annotations(change["item"]) or []) if _STORE.has_label(change["item"]) else None
+            _STORE.set_label(change["item"], change["label"])
+            if counted:
+                _LABEL_STATS.replace(old, _STORE.annotations(change["item"]) or [])
+            if _SEARCH_INDEX_STORE is not None and _SEARCH_INDEX_STORE() is _STORE:
+                if _SEARCH_INDEX_PENDING is not None:
+                    _SEARCH_INDEX_PENDING.append((change["item"], change["label"]))
+                else:
+                    _SEARCH_INDEX.set_label(change["item"], change["label"])
+        else:
+            _STORE = None
+    else:
+        _DATA_GENERATION += 1
+        _ITEM_VERSIONS.clear()
+        _STORE = None
+        _ALL_ITEMS_CHANGED = True
+        _CHANGED_ITEMS.clear()
+
+
+def _record_change(change):
+    feed = change_feed()
+    if feed is None:
+        with _VERSION_LOCK:
+            _apply_change(change)
+    else:
+        # Every worker, this one included, applies the change when replaying the feed
+        feed.append(change)
+        sync_versions()
+
+
+def sync_versions():
+    """Replay the changes of all workers from the change feed. Returns whether there were any."""
+    feed = change_feed()
+    if feed is None:
+        return False
+    with _VERSION_LOCK:
+        changes = feed.read_new()
+        for change in changes:
+            _apply_change(change)
+    return bool(changes)
+
+
+def mark_item_changed(data_idx: int, label=None):
+    """Record that one item was written, invalidating its ETags. label is its new annotations, if that was the change."""
+    _record_change({"item": data_idx} if label is None else {"item": data_idx, "label": label})
+
+
+def mark_data_changed():
+    """Record that the whole dataset changed (new file, bulk update), invalidating all ETags."""
+    _record_change({"data": True})
+
+
+def timing_version():
+    """Version of the recorded timings: the size of the append-only timing sink, shared by all workers."""
+    try:
+        return os.path.getsize(telemetry.sink_path(DATA_FILE_PATH))
+    except OSError:
+        return 0
+
+
+def data_file_lock():
+    """Exclusive lock on the data file across worker processes, or across the backends of this process."""
+    if WORKERS > 1:
+        return shared_state.FileLock(DATA_FILE_PATH)
+    return shared_state.local_lock(DATA_FILE_PATH)
+
+
+def dataset_length():
+    """Number of items, loaded once per dataset generation."""
+    global _DATA_LENGTH
+    cached = _DATA_LENGTH
+    if cached is not None and cached[0] == _DATA_GENERATION:
+        return cached[1]
+    generation = _DATA_GENERATION
+    length = len(load_data())
+    _DATA_LENGTH = (generation, length)
+    return length
+
+
+def get_store():
+    """The current dataset as a CompactStore, built with one load of the data file on first use."""
+    global _STORE
+    store = _STORE
+    if store is not None:
+        return store
+    with _STORE_LOCK:
+        if _STORE is not None:
+            return _STORE
+        version = _DATA_VERSION
+        data = load_data()
+        start = time.perf_counter()
+        if DATA_FILE_TYPE == "json":
+            store = compact_store.CompactStore.from_json(data)
+        else:
+            store = compact_store.CompactStore.from_dataframe(data)
+        print(f"🗜️  Built compact store of {len(store)} items ({store.nbytes() / 1024 ** 2:.1f} MB) in "
+              f"{(time.perf_counter() - start) * 1000:.0f} ms")
+        with _VERSION_LOCK:
+            # A change recorded while the file was loaded may be missing from it; build again on next use
+            if _DATA_VERSION == version:
+                _STORE = store
+        return store
+
+
+def get_near_duplicate_index():
+    """The near-duplicate index of the current item texts."""
+    global _NEAR_DUPLICATES, _NEAR_DUPLICATES_STORE
+    store = get_store()
+    with _NEAR_DUPLICATES_LOCK:
+        if _NEAR_DUPLICATES_STORE is not None and _NEAR_DUPLICATES_STORE() is store:
+            return _NEAR_DUPLICATES
+        if _NEAR_DUPLICATES is None:
+            _NEAR_DUPLICATES = lazy_import("near_duplicates").NearDuplicateIndex()
+        start = time.perf_counter()
+        changed = _NEAR_DUPLICATES.sync(store.texts)
+        if changed:
+            print(f"🧬 Indexed {changed} items for near-duplicate detection in "
+                  f"{(time.perf_counter() - start) * 1000:.0f} ms")
+        _NEAR_DUPLICATES_STORE = weakref.ref(store)
+        return _NEAR_DUPLICATES
+
+
+def near_duplicate_threshold(config=None):
+    """Minimum estimated similarity (Jaccard of character shingles) of two near-duplicate texts."""
+    return float((config if config is not None else CONFIG_DATA).get("near_duplicate_threshold", 0.8))
+
+
+def warm_near_duplicate_index():
+    try:
+        get_near_duplicate_index()
+    except Exception as e:
+        print(f"⚠️  Could not build the near-duplicate index: {e}")
+
+
+def get_search_index():
+    """The search index of the current dataset.
+
+    A new index is built next to the one in use and swapped in; the label
+    changes recorded during the build are applied to it first.
+    """
+    global _SEARCH_INDEX, _SEARCH_INDEX_STORE, _SEARCH_INDEX_PENDING
+    store = get_store()
+    with _SEARCH_INDEX_LOCK:
+        if _SEARCH_INDEX_STORE is not None and _SEARCH_INDEX_STORE() is store and not _SEARCH_INDEX.stale:
+            return _SEARCH_INDEX
+        # Before syncing: label changes applied to the store from now on are recorded for the new index
+        # (a change that is also in the snapshot is applied twice, which replaces the label with itself)
+        pending = []
+        with _VERSION_LOCK:
+            _SEARCH_INDEX_STORE, _SEARCH_INDEX_PENDING = weakref.ref(store), pending
+        start = time.perf_counter()
+        index = lazy_import("search_index").SearchIndex()
+        try:
+            indexed = index.sync(store, previous=_SEARCH_INDEX)
+        except BaseException:
+            with _VERSION_LOCK:
+                _SEARCH_INDEX_STORE, _SEARCH_INDEX_PENDING = None, None
+            raise
+        with _VERSION_LOCK:
+            for idx, label in pending:
+                index.set_label(idx, label)
+            _SEARCH_INDEX, _SEARCH_INDEX_PENDING = index, None
+        print(f"🔎 Indexed {len(store)} items for search ({indexed} texts tokenized) in "
+              f"{(time.perf_counter() - start) * 1000:.0f} ms")
+        return index
+
+
+def get_label_stats():
+    """The label statistics of the current dataset."""
+    global _LABEL_STATS, _LABEL_STATS_STORE
+    store = get_store()
+    with _LABEL_STATS_LOCK:
+        if _LABEL_STATS_STORE is not None and _LABEL_STATS_STORE() is store:
+            return _LABEL_STATS
+        stats = lazy_import("label_stats").LabelStats()
+        # Snapshot and subscribe at once: every later label change is counted as a difference instead
+        with _VERSION_LOCK:
+            packed = store.packed_labels()
+            _LABEL_STATS, _LABEL_STATS_STORE = stats, weakref.ref(store)
+        start = time.perf_counter()
+        stats.add_packed(packed, len(store))
+        print(f"📈 Counted the labels of {len(store)} items in {(time.perf_counter() - start) * 1000:.0f} ms")
+        return stats
+
+
+def get_timing_sink():
+    """The timing event sink of the current data file (replaced when the data file changes)."""
+    global _TIMING_SINK
+    path = telemetry.sink_path(DATA_FILE_PATH)
+    if _TIMING_SINK is None or _TIMING_SINK.path != path:
+        if _TIMING_SINK is not None:
+            _TIMING_SINK.close()
+        _TIMING_SINK = telemetry.TimingSink(path)
+    return _TIMING_SINK
+
+
+def check_etag(request: Request, response: Response, *versions):
+    """Set a strong ETag built from version counters on response.
+
+    Returns a 304 response if the client already has this version, so the
+    caller can answer without loading the data file.
+    """
+    etag = '"' + "-".join([_VERSION_EPOCH, *(str(v) for v in versions)]) + '"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
 
 
 def load_data():
     """Load data from CSV or JSON file with UTF-8 encoding."""
-    if DATA_FILE_TYPE == "json":
-        with open(DATA_FILE_PATH, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    else:
-        return pd.read_csv(DATA_FILE_PATH, encoding='utf-8')
+    with metrics.timer(metrics.FILE_LOAD_SECONDS, server_timing="load", format=DATA_FILE_TYPE):
+        if DATA_FILE_TYPE == "json":
+            with open(DATA_FILE_PATH, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        else:
+            # The CSV is parsed once per load; csv_engine "pyarrow" parses large files faster
+            data = lazy_import("pandas").read_csv(DATA_FILE_PATH, encoding='utf-8',
+                                                  engine=CONFIG_DATA.get("csv_engine") or None)
+    metrics.FILE_LOAD_BYTES.observe(os.path.getsize(DATA_FILE_PATH), format=DATA_FILE_TYPE)
+    return data
 
 
 def save_data(data):
-    """Save data to CSV or JSON file with UTF-8 encoding."""
-    if DATA_FILE_TYPE == "json":
-        with open(DATA_FILE_PATH, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-    else:
-        if isinstance(data, list):
-            # Convert list of dicts to DataFrame
-            df = pd.DataFrame(data)
-        else:
-            df = data
-        df.to_csv(DATA_FILE_PATH, index=False, encoding='utf-8')
+    """Save data to CSV or JSON file with UTF-8 encoding.
+
+    The file is written to a temporary file next to it and renamed over it,
+    so readers see either the old or the new content, never a partial file.
+    """
+    directory = os.path.dirname(os.path.abspath(DATA_FILE_PATH))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(DATA_FILE_PATH)}.", suffix=".tmp")
+    try:
+        with metrics.timer(metrics.FILE_SAVE_SECONDS, server_timing="save", format=DATA_FILE_TYPE):
+            with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+                if DATA_FILE_TYPE == "json":
+                    json.dump(data, f, indent=2, ensure_ascii=False)
+                else:
+                    if isinstance(data, list):
+                        # Convert list of dicts to DataFrame
+                        df = lazy_import("pandas").DataFrame(data)
+                    else:
+                        df = data
+                    df.to_csv(f, index=False)
+                f.flush()
+                os.fsync(f.fileno())
+            if os.path.exists(DATA_FILE_PATH):
+                shutil.copymode(DATA_FILE_PATH, temp_path)
+            os.replace(temp_path, DATA_FILE_PATH)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    metrics.FILE_SAVE_BYTES.observe(os.path.getsize(DATA_FILE_PATH), format=DATA_FILE_TYPE)
+
+
+# Server-sent events to the clients of this backend, see events.py
+EVENTS = events.Channel()
+
+# All writes to the data file are applied and saved by one writer thread, see write_queue.py
+DATA_WRITES = write_queue.WriteQueue(load_data, save_data,
+                                     after_save=lambda data: (publish_changed_items(), publish_progress(data)),
+                                     lock=data_file_lock)
 
 
 app.add_middleware(
@@ -109,6 +506,40 @@ app.add_middleware(
 )
 
 
+if WORKERS > 1:
+    @app.middleware("http")
+    async def sync_shared_state(request: Request, call_next):
+        """Apply the changes other workers made before answering (a stat() of the change feed)."""
+        sync_versions()
+        return await call_next(request)
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Record request latency per route template (e.g. /data/{data_idx}) and add a Server-Timing header."""
+    if PROJECT_HOST is not None and request.url.path.startswith("/projects/"):
+        return await call_next(request)
+    start = time.perf_counter()
+    stages = metrics.collect_stages()
+    response = await call_next(request)
+    duration = time.perf_counter() - start
+    route = request.scope.get("route")
+    metrics.REQUEST_SECONDS.observe(
+        duration,
+        method=request.method,
+        # Projects of a multi-project server record their own requests, prefixed with /projects/{name}
+        route=request.scope.get("root_path", "") + route.path if route is not None else "unmatched",
+        status=response.status_code)
+    response.headers["Server-Timing"] = metrics.server_timing_header(stages, duration)
+    return response
+
+
+@app.get("/metrics")
+def get_metrics():
+    """Expose backend metrics in the Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 # Datenmodell für POST Requests
 class Item(BaseModel):
     name: str
@@ -121,11 +552,24 @@ class AnnotationData(BaseModel):
     name: str
     value: list
 
+
+class BatchAnnotation(BaseModel):
+    idx: int
+    value: list
+
+
+class AnnotationBatch(BaseModel):
+    annotations: list[BatchAnnotation]
+
 # GET Endpoint
 
 
 @app.get("/settings")
-def get_settings():
+def get_settings(request: Request, response: Response):
+    not_modified = check_etag(request, response, "s", _CONFIG_VERSION, _DATA_VERSION)
+    if not_modified:
+        return not_modified
+    guideline = get_guideline()
     settings = {
         "sentiment elements": CONFIG_DATA.get("sentiment_elements", ["aspect_term", "aspect_category", "sentiment_polarity", "opinion_term"]),
         "total_count": get_total_count(),
@@ -143,7 +587,8 @@ def get_settings():
         "display_avg_annotation_time": CONFIG_DATA.get("display_avg_annotation_time", False),
         "enable_pre_prediction": CONFIG_DATA.get("enable_pre_prediction", CONFIG_DATA.get("enable_preprediction", False)),
         "disable_ai_automatic_prediction": CONFIG_DATA.get("disable_ai_automatic_prediction", False),
-        "annotation_guideline": CONFIG_DATA.get("annotation_guideline", None),
+        "annotation_guideline": guideline_url(),
+        "annotation_guideline_hash": guideline["sha256"] if guideline else None,
         "current_index": get_current_index(),
         "max_number_of_idxs": max_number_of_idxs()
     }
@@ -155,69 +600,267 @@ def get_settings():
     return settings
 
 
+# Cached guideline metadata, keyed by the config value and the file's size and mtime
+_GUIDELINE_CACHE = {}
+GUIDELINE_CACHE_CONTROL = "public, max-age=86400"
+
+
+def get_guideline():
+    """Describe the configured annotation guideline PDF (path or legacy data: URL), or None.
+
+    Returns a dict with "path" (None for data: URLs), "content" (bytes for
+    data: URLs), "size" and "sha256". The hash is only recomputed when the
+    file changes.
+    """
+    source = CONFIG_DATA.get("annotation_guideline")
+    if not source:
+        return None
+    if source.startswith("data:"):
+        # Configs written by older versions embed the PDF as a base64 data: URL
+        key = ("data", hash(source))
+    elif os.path.exists(source):
+        stat = os.stat(source)
+        key = (source, stat.st_size, stat.st_mtime_ns)
+    else:
+        return None
+
+    cached = _GUIDELINE_CACHE.get("entry")
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    import hashlib
+    if source.startswith("data:"):
+        import base64
+        content = base64.b64decode(source.split(",", 1)[1])
+        guideline = {"path": None, "content": content, "size": len(content),
+                     "sha256": hashlib.sha256(content).hexdigest()}
+    else:
+        digest = hashlib.sha256()
+        with open(source, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        guideline = {"path": source, "content": None, "size": key[1], "sha256": digest.hexdigest()}
+    _GUIDELINE_CACHE["entry"] = (key, guideline)
+    return guideline
+
+
+def guideline_url():
+    """URL of the guideline endpoint, versioned by the content hash so browsers can cache it."""
+    guideline = get_guideline()
+    if guideline is None:
+        return None
+    return f"/annotation-guideline?v={guideline['sha256'][:16]}"
+
+
+def parse_byte_range(range_header, size):
+    """Parse a single "bytes=start-end" range. Returns (start, end) inclusive, None to send the
+    whole file (missing, malformed or multi-range headers) or raises HTTPException 416."""
+    match = re.fullmatch(r"\s*bytes=(\d*)-(\d*)\s*", range_header or "")
+    if not match or (not match.group(1) and not match.group(2)):
+        return None
+    if match.group(1):
+        start = int(match.group(1))
+        end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+    else:
+        # Suffix range: the last N bytes
+        start = max(size - int(match.group(2)), 0)
+        end = size - 1
+    if start >= size or start > end:
+        raise HTTPException(status_code=416, detail="Requested range not satisfiable",
+                            headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+
+@app.get("/annotation-guideline")
+def get_annotation_guideline(request: Request):
+    """Serve the annotation guideline PDF with ETag, Cache-Control and single-range support."""
+    guideline = get_guideline()
+    if guideline is None:
+        raise HTTPException(status_code=404, detail="No annotation guideline configured")
+
+    etag = f'"{guideline["sha256"]}"'
+    headers = {"ETag": etag, "Cache-Control": GUIDELINE_CACHE_CONTROL, "Accept-Ranges": "bytes"}
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if if_range is None or if_range == etag:
+        byte_range = parse_byte_range(request.headers.get("range"), guideline["size"])
+
+    if byte_range is None:
+        if guideline["path"] is None:
+            return Response(guideline["content"], media_type="application/pdf", headers=headers)
+        return FileResponse(guideline["path"], media_type="application/pdf", headers=headers)
+
+    start, end = byte_range
+    if guideline["path"] is None:
+        content = guideline["content"][start:end + 1]
+    else:
+        with open(guideline["path"], "rb") as f:
+            f.seek(start)
+            content = f.read(end - start + 1)
+    headers["Content-Range"] = f"bytes {start}-{end}/{guideline['size']}"
+    return Response(content, status_code=206, media_type="application/pdf", headers=headers)
+
+
 @app.get("/data/{data_idx}")
-def get_data(data_idx: int):
+def get_data(data_idx: int, request: Request, response: Response):
+    not_modified = check_etag(request, response, "d", _CONFIG_VERSION, _DATA_GENERATION,
+                              data_idx, _ITEM_VERSIONS.get(data_idx, 0))
+    if not_modified:
+        return not_modified
     try:
-        data = load_data()
-        if data_idx >= len(data) or data_idx < 0:
+        store = get_store()
+        if data_idx >= len(store) or data_idx < 0:
             raise HTTPException(status_code=404, detail="Index out of range")
 
         default_aspects = CONFIG_DATA.get("aspect_categories", ['location general', 'food prices', 'food quality', 'food general',
                                                                 'ambience general', 'service general', 'restaurant prices',
                                                                 'drinks prices', 'restaurant miscellaneous', 'drinks quality',
                                                                 'drinks style_options', 'restaurant general', 'food style_options'])
+        item = store.serialize(data_idx, default_aspects)
+        # [start, end] of each token of the text, for snapping selections to tokens
+        item["tokens"] = store.tokens(data_idx).offsets()
+        return item
 
-        if DATA_FILE_TYPE == "json":
-            item = data[data_idx]
-            # Check if item has been annotated
-            if 'label' in item:
-                # Item has been annotated (could be empty list or list with annotations)
-                label_value = json.dumps(
-                    item['label']) if item['label'] else ""
-            else:
-                # Item has not been annotated yet
-                label_value = ""
-
-            # Determine aspect categories for this example
-            aspects = item.get('aspect_category_list', default_aspects)
-            return {
-                "text": item.get('text', ''),
-                "label": label_value,
-                "translation": item.get('translation', ''),
-                "aspect_category_list": aspects
-            }
-        else:
-            # CSV handling
-            df = data
-            row = df.iloc[data_idx]
-            row_dict = row.to_dict()
-            # Replace NaN values with empty strings
-            for key, value in row_dict.items():
-                if pd.isna(value) or (isinstance(value, float) and (value == float('inf') or value == float('-inf'))):
-                    row_dict[key] = ""
-            # Ensure translation field exists
-            if 'translation' not in row_dict:
-                row_dict['translation'] = ""
-            # Determine aspect categories for this example (CSV column or default)
-            raw_aspects = row_dict.get('aspect_category_list', None)
-            if raw_aspects:
-                aspects = raw_aspects
-            else:
-                aspects = default_aspects
-            row_dict['aspect_category_list'] = aspects
-            return row_dict
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=404, detail=f"{DATA_FILE_PATH} not found")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
+
+MAX_DATA_WINDOW = 200
+
+
+@app.get("/data")
+def get_data_window(request: Request, response: Response,
+                    start: int = Query(0, ge=0), count: int = Query(10, ge=1, le=MAX_DATA_WINDOW),
+                    ids: str = None, fields: str = None):
+    """Several items in one response, e.g. for prefetching: the window [start, start + count) or the
+    comma-separated indices in ids, optionally projected to the comma-separated fields."""
+    try:
+        indices = [int(idx) for idx in ids.split(",") if idx.strip()] if ids else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be comma-separated indices")
+    if indices is not None and len(indices) > MAX_DATA_WINDOW:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_DATA_WINDOW} ids per request")
+    projection = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+
+    not_modified = check_etag(request, response, "w", _CONFIG_VERSION, _DATA_VERSION)
+    if not_modified:
+        return not_modified
+    try:
+        store = get_store()
     except FileNotFoundError:
         raise HTTPException(
             status_code=404, detail=f"{DATA_FILE_PATH} not found")
+
+    if indices is None:
+        indices = range(start, min(start + count, len(store)))
+    elif any(idx < 0 or idx >= len(store) for idx in indices):
+        raise HTTPException(status_code=404, detail="Index out of range")
+
+    default_aspects = CONFIG_DATA.get("aspect_categories", ['location general', 'food prices', 'food quality', 'food general',
+                                                            'ambience general', 'service general', 'restaurant prices',
+                                                            'drinks prices', 'restaurant miscellaneous', 'drinks quality',
+                                                            'drinks style_options', 'restaurant general', 'food style_options'])
+    try:
+        items = []
+        for idx in indices:
+            item = store.serialize(idx, default_aspects)
+            if projection is None or "tokens" in projection:
+                item["tokens"] = store.tokens(idx).offsets()
+            if projection is not None:
+                item = {field: item[field] for field in projection if field in item}
+            items.append({"idx": idx, **item})
+        return {"items": items, "total_count": len(store)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/near-duplicates")
+def get_near_duplicate_clusters(threshold: float = Query(None, ge=0.0, le=1.0), limit: int = Query(100, ge=1)):
+    """Report of the clusters of near-duplicate items, largest first (at most limit clusters)."""
+    try:
+        index = get_near_duplicate_index()
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=404, detail=f"{DATA_FILE_PATH} not found")
+    if threshold is None:
+        threshold = near_duplicate_threshold()
+    clusters = index.clusters(threshold)
+    return {
+        "threshold": threshold,
+        "total_count": len(index),
+        "cluster_count": len(clusters),
+        "duplicate_items": sum(cluster["size"] for cluster in clusters),
+        "exact_clusters": sum(1 for cluster in clusters if cluster["exact"]),
+        "clusters": clusters[:limit],
+    }
+
+
+@app.get("/near-duplicates/{data_idx}")
+def get_item_near_duplicates(data_idx: int, threshold: float = Query(None, ge=0.0, le=1.0)):
+    """Items whose text is similar to the text of item data_idx, most similar first."""
+    try:
+        index = get_near_duplicate_index()
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=404, detail=f"{DATA_FILE_PATH} not found")
+    if data_idx < 0 or data_idx >= len(index):
+        raise HTTPException(status_code=404, detail="Index out of range")
+    if threshold is None:
+        threshold = near_duplicate_threshold()
+    exact = set(index.exact_duplicates(data_idx))
+    return {
+        "data_idx": data_idx,
+        "threshold": threshold,
+        "duplicates": [{"idx": idx, "similarity": round(similarity, 3), "exact": idx in exact}
+                       for idx, similarity in index.near_duplicates(data_idx, threshold)],
+    }
+
+
+@app.get("/search")
+def search_items(q: str = "", aspect_term: str = None, aspect_category: str = None,
+                 sentiment_polarity: str = None, opinion_term: str = None,
+                 offset: int = Query(0, ge=0), limit: int = Query(20, ge=1, le=MAX_DATA_WINDOW)):
+    """Items whose text contains all words of q and that have an annotation with all given field values."""
+    labels = {field: value for field, value in (("aspect_term", aspect_term), ("aspect_category", aspect_category),
+                                                ("sentiment_polarity", sentiment_polarity),
+                                                ("opinion_term", opinion_term)) if value}
+    tokens = set(lazy_import("search_index").query_tokens(q))
+    if not tokens and not labels:
+        raise HTTPException(status_code=400, detail="Give a query q or a value for aspect_term, aspect_category, "
+                                                    "sentiment_polarity or opinion_term")
+    try:
+        index = get_search_index()
+        store = get_store()
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=404, detail=f"{DATA_FILE_PATH} not found")
+
+    matches = index.search(q, labels)
+    items = []
+    for idx in matches[offset:offset + limit].tolist():
+        if idx >= len(store):
+            continue
+        table = store.tokens(idx)
+        items.append({
+            "idx": idx,
+            "text": store.texts[idx],
+            "label": store.annotations(idx) or [],
+            # [start, end] of the tokens of the text that match q, for highlighting
+            "matches": [[start, end] for start, end, token in zip(table.starts, table.ends, table.lower)
+                        if token in tokens],
+        })
+    return {"total_count": len(matches), "offset": offset, "limit": limit, "items": items}
+
+
 def get_total_count():
     try:
-        data = load_data()
-        return len(data)
+        return len(get_store())
     except FileNotFoundError:
         raise HTTPException(
             status_code=404, detail=f"{DATA_FILE_PATH} not found")
@@ -225,9 +868,11 @@ def get_total_count():
         raise HTTPException(status_code=500, detail=str(e))
 
 
-def get_current_index():
+def get_current_index(data=None):
+    """Index of the first item that is not annotated yet (of the loaded data, if given)."""
     try:
-        data = load_data()
+        if data is None:
+            return get_store().first_unannotated()
         if DATA_FILE_TYPE == "json":
             # Find first entry that doesn't have a "label" key (not annotated yet)
             for idx, item in enumerate(data):
@@ -235,12 +880,12 @@ def get_current_index():
                     return idx
             return len(data)  # All entries have been annotated
         else:
-            # CSV handling
-            df = data
-            for idx in range(len(df)):
-                if pd.isna(df.iloc[idx]['label']) or df.iloc[idx]['label'] == "":
-                    return idx
-            return len(df)
+            # CSV handling: first empty label cell, checked for the whole column at once
+            if 'label' not in data.columns:
+                return 0
+            labels = data['label']
+            unannotated = (labels.isna() | (labels.astype(str) == "")).to_numpy()
+            return int(unannotated.argmax()) if unannotated.any() else len(data)
     except FileNotFoundError:
         return 0
     except Exception as e:
@@ -249,8 +894,7 @@ def get_current_index():
 
 def max_number_of_idxs():
     try:
-        data = load_data()
-        return len(data)
+        return len(get_store())
     except FileNotFoundError:
         raise HTTPException(
             status_code=404, detail=f"{DATA_FILE_PATH} not found")
@@ -264,11 +908,12 @@ def max_number_of_idxs():
 def post_data(data_idx: int, item: Item):
     # add value to row label
     try:
-        df = pd.read_csv("annotations.csv")
+        df = lazy_import("pandas").read_csv("annotations.csv")
         if data_idx >= len(df) or data_idx < 0:
             raise HTTPException(status_code=404, detail="Index out of range")
         df.at[data_idx, 'label'] = item.value
         df.to_csv("annotations.csv", index=False)
+        mark_item_changed(data_idx)
         return {"message": "Data updated successfully"}
     except FileNotFoundError:
         raise HTTPException(
@@ -279,27 +924,105 @@ def post_data(data_idx: int, item: Item):
 # POST Endpoint for Annotations
 
 
-@app.post("/annotations/{data_idx}")
-def post_annotations(data_idx: int, annotation_data: AnnotationData):
-    try:
-        data = load_data()
-        if data_idx >= len(data) or data_idx < 0:
-            raise HTTPException(status_code=404, detail="Index out of range")
-
-        annotation_data = annotation_data.value
+def annotation_write(changes):
+    """A write queue job that sets the labels of a list of (data_idx, annotations) changes.
 
+    The job applies all changes or, if one index is out of range, none of them.
+    """
+    def apply(data):
+        invalid = [idx for idx, _ in changes if idx >= len(data) or idx < 0]
+        if invalid:
+            raise HTTPException(
+                status_code=404, detail=f"Index out of range: {', '.join(str(idx) for idx in invalid)}")
         if DATA_FILE_TYPE == "json":
             # Update JSON format - set "label" key with annotation data
-            data[data_idx]['label'] = annotation_data
-            save_data(data)
+            for idx, annotations in changes:
+                data[idx]['label'] = annotations
         else:
-            # Update CSV format
-            df = data
-            annotations_json = json.dumps(annotation_data)
-            df.at[data_idx, 'label'] = annotations_json
-            save_data(df)
+            # Update CSV format (an empty label column is read as float)
+            if data['label'].dtype != object:
+                data['label'] = data['label'].astype(object)
+            for idx, annotations in changes:
+                data.at[idx, 'label'] = json.dumps(annotations)
+        return True
+    return apply
+
+
+def duplicate_label_changes(changes):
+    """The same annotations for the exact duplicates (identical text) of each changed item.
+
+    A duplicate is only updated if it is unannotated or has the label the item had before,
+    so labels that were changed on purpose are kept.
+    """
+    store = get_store()
+    index = get_near_duplicate_index()
+    changed = {idx for idx, _ in changes}
+    propagated = []
+    for idx, annotations in changes:
+        if idx < 0 or idx >= len(store):
+            continue
+        previous = store.annotations(idx)
+        for duplicate in index.exact_duplicates(idx):
+            if duplicate in changed:
+                continue
+            if store.label(duplicate) is None or (previous is not None and store.annotations(duplicate) == previous):
+                propagated.append((duplicate, annotations))
+                changed.add(duplicate)
+    return propagated
+
+
+def save_annotations(changes):
+    """Persist (data_idx, annotations) changes through the write queue.
+
+    With propagate_duplicate_labels, exact duplicates of the items get the same annotations
+    in the same write. Returns the indices they were propagated to.
+    """
+    propagated = []
+    if CONFIG_DATA.get("propagate_duplicate_labels", False):
+        propagated = duplicate_label_changes(changes)
+        changes = changes + propagated
+    def applied():
+        for idx, annotations in changes:
+            mark_item_changed(idx, annotations)
+
+    # The store is updated on the writer thread, in the same order as the file
+    DATA_WRITES.submit(annotation_write(changes), applied)
+    publish_label_stats()
+    metrics.ANNOTATION_WRITES.inc(len(changes))
+    return [idx for idx, _ in propagated]
+
+
+@app.post("/annotations/batch")
+def post_annotations_batch(batch: AnnotationBatch):
+    """Save many annotations at once: all of them are validated, applied together and saved once."""
+    if not batch.annotations:
+        raise HTTPException(status_code=400, detail="No annotations given")
+    try:
+        propagated = save_annotations([(item.idx, item.value) for item in batch.annotations])
+        result = {"message": "Annotations saved successfully", "count": len(batch.annotations)}
+        if propagated:
+            result["propagated_to"] = propagated
+        return result
+    except HTTPException:
+        raise
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=404, detail=f"{DATA_FILE_PATH} not found")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        return {"message": "Annotations saved successfully"}
+
+@app.post("/annotations/{data_idx}")
+def post_annotations(data_idx: int, annotation_data: AnnotationData):
+    try:
+        propagated = save_annotations([(data_idx, annotation_data.value)])
+        result = {"message": "Annotations saved successfully"}
+        if propagated:
+            # Exact duplicates of the item that received the same annotations
+            result["propagated_to"] = propagated
+        return result
+    except HTTPException:
+        raise
     except FileNotFoundError:
         raise HTTPException(
             status_code=404, detail=f"{DATA_FILE_PATH} not found")
@@ -311,31 +1034,23 @@ def post_annotations(data_idx: int, annotation_data: AnnotationData):
 
 @app.post("/timing/{data_idx}")
 def post_timing(data_idx: int, timing: dict):
-    """Speichere Timing-Informationen für ein Beispiel (append an Liste)."""
+    """Record a timing event ({duration, change}) in the append-only timing sink.
+
+    The data file is not touched; the events are merged into the items' "timings" on export.
+    """
     try:
-        data = load_data()
-        if data_idx >= len(data) or data_idx < 0:
+        if data_idx >= dataset_length() or data_idx < 0:
             raise HTTPException(status_code=404, detail="Index out of range")
         timing_entry = {"duration": timing.get(
             "duration", 0), "change": timing.get("change", False)}
-        if DATA_FILE_TYPE == "json":
-            item = data[data_idx]
-            if "timings" not in item or not isinstance(item["timings"], list):
-                item["timings"] = []
-            item["timings"].append(timing_entry)
-            save_data(data)
-        else:
-            df = data
-            timings_col = df.at[data_idx,
-                                "timings"] if "timings" in df.columns else None
-            try:
-                timings = json.loads(timings_col) if timings_col else []
-            except Exception:
-                timings = []
-            timings.append(timing_entry)
-            df.at[data_idx, "timings"] = json.dumps(
-                timings, ensure_ascii=False)
-            save_data(df)
+        if CONFIG_DATA.get("session_id"):
+            timing_entry["session_id"] = CONFIG_DATA["session_id"]
+        # The running statistics pick the event up from the sink on their next use
+        get_timing_sink().append({"timestamp": telemetry.utc_timestamp(), "data_idx": data_idx,
+                                  "session_id": CONFIG_DATA.get("session_id"), **timing_entry})
+        metrics.TIMING_WRITES.inc()
+        if CONFIG_DATA.get("display_avg_annotation_time", False) and EVENTS.has_subscribers():
+            EVENTS.publish("avg_annotation_time", get_timing_stats().average())
         return {"message": "Timing gespeichert"}
     except FileNotFoundError:
         raise HTTPException(
@@ -344,186 +1059,222 @@ def post_timing(data_idx: int, timing: dict):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-def find_phrase_positions(text: str, phrase: str):
-    """
-    Find start and end positions of a phrase in text.
-    Returns tuple (start, end) or (None, None) if not found.
-    """
-    if not phrase or phrase == "NULL" or not text:
-        return None, None
+def iter_timings(data):
+    """Yield all timing entries of the loaded data (JSON lists or CSV 'timings' JSON strings)."""
+    if DATA_FILE_TYPE == "json":
+        for item in data:
+            timings = item.get("timings")
+            if isinstance(timings, list):
+                yield from timings
+    elif "timings" in data.columns:
+        for timings_str in data["timings"]:
+            if not isinstance(timings_str, str) or not timings_str:
+                continue
+            try:
+                timings = json.loads(timings_str)
+            except Exception:
+                continue
+            if isinstance(timings, list):
+                yield from timings
 
-    # Try exact match first
-    index = text.find(phrase)
-    if index != -1:
-        return index, index + len(phrase) - 1
 
-    # If exact match fails, try case-insensitive match
-    index = text.lower().find(phrase.lower())
-    if index != -1:
-        return index, index + len(phrase) - 1
+def get_timing_stats(data=None):
+    """Running timing statistics of the current dataset and its timing sink.
 
-    return None, None
+    Built with one scan on first use; afterwards only the timing events
+    appended since the last call (by any worker) are read.
+    """
+    global _TIMING_STATS, _TIMING_STATS_GENERATION, _TIMING_SINK_OFFSET
+    with _TIMING_STATS_LOCK:
+        if _TIMING_STATS is None or _TIMING_STATS_GENERATION != _DATA_GENERATION:
+            generation = _DATA_GENERATION
+            if data is None:
+                data = load_data()
+            stats = timing_stats.TimingStats()
+            for entry in iter_timings(data):
+                stats.add(entry)
+            _TIMING_STATS, _TIMING_STATS_GENERATION, _TIMING_SINK_OFFSET = stats, generation, 0
+        new_events, _TIMING_SINK_OFFSET = telemetry.read_new_events(
+            telemetry.sink_path(DATA_FILE_PATH), _TIMING_SINK_OFFSET)
+        for event in new_events:
+            _TIMING_STATS.add(event)
+        return _TIMING_STATS
+
+
+POSITION_JOBS = OrderedDict()  # job id -> auto_positions.Job, oldest first
+_POSITION_JOBS_LOCK = threading.Lock()
+MAX_POSITION_JOBS = 20
+_POSITION_BOARD = None
+
+
+def position_board():
+    """The job snapshots shared by the worker processes, None with a single worker."""
+    global _POSITION_BOARD
+    if WORKERS <= 1:
+        return None
+    path = shared_state.jobs_path(DATA_FILE_PATH)
+    if _POSITION_BOARD is None or _POSITION_BOARD.path != path:
+        _POSITION_BOARD = shared_state.JobBoard(DATA_FILE_PATH)
+    return _POSITION_BOARD
+
+
+def _label_fingerprint(label):
+    """A comparable form of a loaded label, to notice labels that changed while positions were searched."""
+    return label if isinstance(label, str) else json.dumps(label)
+
+
+def position_tasks(data):
+    """(idx, text, annotations) of the loaded items with terms that lack positions, and their label fingerprints."""
+    if DATA_FILE_TYPE == "json":
+        rows = ((item.get('text'), item.get('label')) for item in data)
+    else:
+        if 'text' not in data.columns or 'label' not in data.columns:
+            return [], {}
+        rows = zip(data['text'].tolist(), data['label'].tolist())
 
+    tasks, fingerprints = [], {}
+    for idx, (text, label) in enumerate(rows):
+        if not isinstance(text, str) or not text:
+            continue
+        annotations = auto_positions.parse_label(label)
+        if annotations and auto_positions.missing_phrases(annotations):
+            tasks.append((idx, text, annotations))
+            fingerprints[idx] = _label_fingerprint(label)
+    return tasks, fingerprints
 
-def auto_add_missing_positions():
-    """Automatically add missing position data for existing phrases."""
-    if not AUTO_POSITIONS:
-        print("ℹ️  Auto position filling disabled (use --auto-positions to enable)")
-        return
 
-    print("🔍 Scanning for missing position data...")
+def positions_write(results, fingerprints):
+    """A write queue job that saves the filled annotations of items whose label is unchanged.
 
-    try:
-        data = load_data()
-        data_changed = False
-        updated_count = 0
+    Items annotated again since the scan are skipped. Returns the job and the list of saved results.
+    """
+    saved = []
+
+    def apply(data):
+        saved.clear()
+        if DATA_FILE_TYPE != "json" and data['label'].dtype != object:
+            data['label'] = data['label'].astype(object)
+        for idx, annotations, added in results:
+            if idx >= len(data):
+                continue
+            current = data[idx].get('label') if DATA_FILE_TYPE == "json" else data.at[idx, 'label']
+            if _label_fingerprint(current) != fingerprints[idx]:
+                continue
+            if DATA_FILE_TYPE == "json":
+                # Store as array, not as JSON string
+                data[idx]['label'] = annotations
+            else:
+                data.at[idx, 'label'] = json.dumps(annotations)
+            saved.append((idx, annotations, added))
+        return bool(saved)
+    return apply, saved
 
-        if DATA_FILE_TYPE == "json":
-            # Handle JSON format
-            for item in data:
-                if 'text' not in item:
-                    continue
-
-                text = item['text']
-                label_data = item.get('label', [])
-
-                # Handle both string and array formats
-                if isinstance(label_data, str):
-                    if not label_data or label_data == '':
-                        continue
-                    try:
-                        annotations = json.loads(label_data)
-                    except (json.JSONDecodeError, TypeError):
-                        continue
-                else:
-                    # Already an array
-                    annotations = label_data
-
-                if not isinstance(annotations, list):
-                    continue
-
-                annotations_updated = False
-
-                for annotation in annotations:
-                    # Check aspect_term positions
-                    if ('aspect_term' in annotation and
-                        annotation['aspect_term'] and
-                        annotation['aspect_term'] != 'NULL' and
-                            ('at_start' not in annotation or 'at_end' not in annotation)):
-
-                        phrase = annotation['aspect_term']
-                        start_pos = text.find(phrase)
-                        if start_pos != -1:
-                            annotation['at_start'] = start_pos
-                            annotation['at_end'] = start_pos + len(phrase) - 1
-                            annotations_updated = True
-                            updated_count += 1
-
-                    # Check opinion_term positions
-                    if ('opinion_term' in annotation and
-                        annotation['opinion_term'] and
-                        annotation['opinion_term'] != 'NULL' and
-                            ('ot_start' not in annotation or 'ot_end' not in annotation)):
-
-                        phrase = annotation['opinion_term']
-                        start_pos = text.find(phrase)
-                        if start_pos != -1:
-                            annotation['ot_start'] = start_pos
-                            annotation['ot_end'] = start_pos + len(phrase) - 1
-                            annotations_updated = True
-                            updated_count += 1
-
-                if annotations_updated:
-                    # Store as array, not as JSON string
-                    item['label'] = annotations
-                    data_changed = True
 
-        else:
-            # Handle CSV format
-            for idx, row in data.iterrows():
-                if pd.isna(row.get('text')):
-                    continue
-
-                text = row['text']
-                label_str = row.get('label', '')
-
-                if not label_str or pd.isna(label_str) or label_str == '':
-                    continue
-
-                try:
-                    annotations = json.loads(label_str)
-                    if not isinstance(annotations, list):
-                        continue
-
-                    annotations_updated = False
-
-                    for annotation in annotations:
-                        # Check aspect_term positions
-                        if ('aspect_term' in annotation and
-                            annotation['aspect_term'] and
-                            annotation['aspect_term'] != 'NULL' and
-                                ('at_start' not in annotation or 'at_end' not in annotation)):
-
-                            phrase = annotation['aspect_term']
-                            start_pos = text.find(phrase)
-                            if start_pos != -1:
-                                annotation['at_start'] = start_pos
-                                annotation['at_end'] = start_pos + \
-                                    len(phrase) - 1
-                                annotations_updated = True
-                                updated_count += 1
-
-                        # Check opinion_term positions
-                        if ('opinion_term' in annotation and
-                            annotation['opinion_term'] and
-                            annotation['opinion_term'] != 'NULL' and
-                                ('ot_start' not in annotation or 'ot_end' not in annotation)):
-
-                            phrase = annotation['opinion_term']
-                            start_pos = text.find(phrase)
-                            if start_pos != -1:
-                                annotation['ot_start'] = start_pos
-                                annotation['ot_end'] = start_pos + \
-                                    len(phrase) - 1
-                                annotations_updated = True
-                                updated_count += 1
-
-                    if annotations_updated:
-                        data.at[idx, 'label'] = json.dumps(
-                            annotations, ensure_ascii=False)
-                        data_changed = True
-
-                except (json.JSONDecodeError, TypeError):
-                    continue
-
-        if data_changed:
-            save_data(data)
-            print(
-                f"✅ Auto-added {updated_count} missing position entries and saved to {DATA_FILE_PATH}")
+def run_auto_positions_job(job, board=None):
+    """Search the missing positions of all items and save them with one write, reporting progress on job.
+
+    board is the shared job board whose lock this worker holds for the job, if there are several workers.
+    """
+    def report(**fields):
+        job.update(**fields)
+        snapshot = job.snapshot()
+        if board is not None:
+            board.write(snapshot)
+        EVENTS.publish("auto_positions", snapshot)
+
+    start = time.perf_counter()
+    report(status="running")
+    try:
+        tasks, fingerprints = position_tasks(load_data())
+        report(total_items=len(tasks))
+        results = auto_positions.fill_positions(
+            tasks, progress=lambda done: report(processed_items=done), cancelled=lambda: job.cancel_requested)
+        if job.cancel_requested:
+            report(status="cancelled")
+            return job
+
+        saved = []
+        if results:
+            # Runs on the writer thread, so concurrent annotation saves are not overwritten
+            apply, saved = positions_write(results, fingerprints)
+            DATA_WRITES.submit(apply, lambda: [mark_item_changed(idx, annotations) for idx, annotations, _ in saved])
+            if saved:
+                publish_label_stats()
+        added = sum(added for _, _, added in saved)
+        report(status="completed", updated_items=len(saved), added_positions=added)
+        if added:
+            print(f"✅ Auto-added {added} missing position entries to {len(saved)} items and saved to "
+                  f"{DATA_FILE_PATH} ({time.perf_counter() - start:.1f} s)")
         else:
             print("ℹ️  No missing positions found")
-
     except Exception as e:
+        report(status="failed", error=str(e))
         print(f"❌ Error during auto position filling: {e}")
+    finally:
+        if board is not None:
+            board.release()
+    return job
+
 
-# POST Endpoint to manually trigger position data addition
+def start_auto_positions_job():
+    """Start filling missing positions in a background thread; returns the snapshot of the new job or the running one.
+
+    With several workers, the job runs in the worker that takes the job board's lock; the others
+    return the snapshot that worker shares.
+    """
+    board = position_board()
+    with _POSITION_JOBS_LOCK:
+        for job in POSITION_JOBS.values():
+            if job.active:
+                return job.snapshot()
+        if board is not None and not board.try_acquire():
+            snapshot = board.latest()
+            if snapshot is None or snapshot["status"] not in ("queued", "running"):
+                raise HTTPException(status_code=409, detail="Another worker is starting an auto-positions job")
+            return snapshot
+        job = auto_positions.Job()
+        POSITION_JOBS[job.id] = job
+        while len(POSITION_JOBS) > MAX_POSITION_JOBS:
+            POSITION_JOBS.popitem(last=False)
+        if board is not None:
+            board.write(job.snapshot())
+    print("🔍 Scanning for missing position data in the background...")
+    threading.Thread(target=run_auto_positions_job, args=(job, board), name="absa-auto-positions",
+                     daemon=True).start()
+    return job.snapshot()
+
+# Endpoints to trigger position data addition and follow its progress
 
 
 @app.post("/auto-add-positions")
 def manual_auto_add_positions():
-    """Manually trigger the auto-addition of missing position data."""
+    """Start the auto-addition of missing position data in the background; returns the job id."""
+    if not AUTO_POSITIONS:
+        return {"message": "Auto position filling is disabled (use --auto-positions to enable)", "job_id": None}
     try:
-        auto_add_missing_positions()
-        return {"message": "Position data auto-addition completed successfully"}
+        return {"message": "Position data auto-addition started", **start_auto_positions_job()}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Error adding position data: {str(e)}")
 
 
-def predict_llm(text, considered_sentiment_elements, examples, aspect_categories, polarities, allow_implicit_aspect_terms=False, allow_implicit_opinion_terms=False, n_few_shot=10, llm_model="gemma3:4b"):
-    from ollama import generate
-    from pydantic import BaseModel, create_model
+@app.get("/auto-add-positions/{job_id}")
+def get_auto_add_positions_job(job_id: str):
+    """Progress of an auto-positions job (of any worker)."""
+    job = POSITION_JOBS.get(job_id)
+    if job is not None:
+        return job.snapshot()
+    board = position_board()
+    snapshot = board.read().get(job_id) if board is not None else None
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job '{job_id}'")
+    return snapshot
 
+
+def build_prompt(text, considered_sentiment_elements, few_shot_examples, aspect_categories, polarities, allow_implicit_aspect_terms=False, allow_implicit_opinion_terms=False):
+    """Build the few-shot prompt shared by the Ollama and OpenAI predictions."""
     prompt_head = "According to the following sentiment elements definition: \n\n"
 
     if "aspect_term" in considered_sentiment_elements:
@@ -551,8 +1302,6 @@ def predict_llm(text, considered_sentiment_elements, examples, aspect_categories
     prompt_head = prompt_head[:-2]  # remove last comma and space
     prompt_head += ".\n\n"
 
-    few_shot_examples = get_most_similar_examples(text, examples, n=n_few_shot)
-
     prompt = prompt_head + "Here are some examples:\n"
     for ex in few_shot_examples:
         prompt += f"Text: {ex['text']}\n"
@@ -566,163 +1315,192 @@ def predict_llm(text, considered_sentiment_elements, examples, aspect_categories
         prompt = prompt[:-2]  # remove last comma and space
         prompt += "]\n"
     prompt += f"Text: {text}\nSentiment elements: "
+    return prompt
+
 
+def build_aspects_model(text, considered_sentiment_elements, aspect_categories, polarities, allow_implicit_aspect_terms=False, allow_implicit_opinion_terms=False, tokens=None):
+    """Build the pydantic model for structured output, restricting terms to phrases of the text.
 
+    tokens is the cached TokenTable of the text, if there is one.
+    """
+    from pydantic import BaseModel, create_model
     from enum import Enum
-    allowed_phrases = find_valid_phrases_list(text)
-    allowed_aspect_terms = allowed_phrases + \
-        ["NULL"] if allow_implicit_aspect_terms else allowed_phrases
-    allowed_opinion_terms = allowed_phrases + \
-        ["NULL"] if allow_implicit_opinion_terms else allowed_phrases
-
-    AspectEnum = Enum("AspectEnum", {p: p for p in allowed_aspect_terms})
-    OpinionEnum = Enum("OpinionEnum", {p: p for p in allowed_opinion_terms})
-    PolarityEnum = Enum("PolarityEnum", {p: p for p in polarities})
-    CategoryEnum = Enum("CategoryEnum", {c: c for c in aspect_categories})
-
-    # Mapping von Namen -> Typen
-    field_types = {
-        "aspect_term": (AspectEnum, ...),
-        "aspect_category": (CategoryEnum, ...),
-        "opinion_term": (OpinionEnum, ...),
-        "sentiment_polarity": (PolarityEnum, ...)
-    }
 
-    # dynamisch Modell bauen
-    SentimentElement = create_model(
-        "SentimentElement",
-        **{name: field_types[name] for name in considered_sentiment_elements}
-    )
+    with metrics.stage_timer("phrases"):
+        allowed_phrases = find_valid_phrases_list(text, tokens=tokens)
+    metrics.SCHEMA_PHRASES.observe(len(allowed_phrases))
+
+    with metrics.stage_timer("schema"):
+        allowed_aspect_terms = allowed_phrases + \
+            ["NULL"] if allow_implicit_aspect_terms else allowed_phrases
+        allowed_opinion_terms = allowed_phrases + \
+            ["NULL"] if allow_implicit_opinion_terms else allowed_phrases
+
+        AspectEnum = Enum("AspectEnum", {p: p for p in allowed_aspect_terms})
+        OpinionEnum = Enum("OpinionEnum", {p: p for p in allowed_opinion_terms})
+        PolarityEnum = Enum("PolarityEnum", {p: p for p in polarities})
+        CategoryEnum = Enum("CategoryEnum", {c: c for c in aspect_categories})
+
+        # Mapping von Namen -> Typen
+        field_types = {
+            "aspect_term": (AspectEnum, ...),
+            "aspect_category": (CategoryEnum, ...),
+            "opinion_term": (OpinionEnum, ...),
+            "sentiment_polarity": (PolarityEnum, ...)
+        }
+
+        # dynamisch Modell bauen
+        SentimentElement = create_model(
+            "SentimentElement",
+            **{name: field_types[name] for name in considered_sentiment_elements}
+        )
+
+        class Aspects(BaseModel):
+            aspects: list[SentimentElement]
+
+    return Aspects
+
+
+# Answers to identical prediction requests, only with cache_predictions (annoabsa --cache-predictions):
+# even at temperature 0 a model may answer differently, and reloading or updating it does not change the key
+PREDICTION_CACHE_SIZE = 256
+_PREDICTION_CACHE = OrderedDict()
+_PREDICTION_CACHE_LOCK = threading.Lock()
+
+
+def _prediction_cache_key(provider, llm_model, prompt, schema):
+    """The cache key of a prediction request; None if the prediction cache is disabled.
 
-    class Aspects(BaseModel):
-        aspects: list[SentimentElement]
+    schema is a function returning the JSON schema, so it is only built when the cache is used.
+    """
+    if not CONFIG_DATA.get("cache_predictions", False):
+        return None
+    return (provider, llm_model, prompt, json.dumps(schema(), sort_keys=True))
+
+
+def _get_cached_prediction(key):
+    if key is None:
+        return None
+    with _PREDICTION_CACHE_LOCK:
+        cached = _PREDICTION_CACHE.get(key)
+        if cached is not None:
+            _PREDICTION_CACHE.move_to_end(key)
+    metrics.PREDICTION_CACHE.inc(result="hit" if cached is not None else "miss")
+    return json.loads(cached) if cached is not None else None
+
+
+def _store_cached_prediction(key, prediction):
+    if key is None:
+        return
+    with _PREDICTION_CACHE_LOCK:
+        _PREDICTION_CACHE[key] = json.dumps(prediction, ensure_ascii=False)
+        while len(_PREDICTION_CACHE) > PREDICTION_CACHE_SIZE:
+            _PREDICTION_CACHE.popitem(last=False)
+
+
+def predict_llm(text, considered_sentiment_elements, examples, aspect_categories, polarities, allow_implicit_aspect_terms=False, allow_implicit_opinion_terms=False, n_few_shot=10, llm_model="gemma3:4b", few_shot_examples=None, tokens=None):
+    """Predict sentiment elements with a local Ollama model.
+
+    If few_shot_examples is given (e.g. precomputed neighbours), it is used
+    as-is instead of retrieving the n_few_shot most similar examples.
+    """
+    from ollama import generate
+
+    if few_shot_examples is None:
+        with metrics.timer(metrics.RETRIEVAL_SECONDS, server_timing="retrieval"):
+            few_shot_examples = get_most_similar_examples(text, examples, n=n_few_shot)
+
+    with metrics.timer(metrics.PROMPT_BUILD_SECONDS, server_timing="prompt"):
+        prompt = build_prompt(text, considered_sentiment_elements, few_shot_examples, aspect_categories,
+                              polarities, allow_implicit_aspect_terms, allow_implicit_opinion_terms)
+
+    Aspects = build_aspects_model(text, considered_sentiment_elements, aspect_categories, polarities,
+                                  allow_implicit_aspect_terms, allow_implicit_opinion_terms, tokens)
+    with metrics.stage_timer("json_schema"):
+        schema = Aspects.model_json_schema()
+
+    cache_key = _prediction_cache_key("ollama", llm_model, prompt, lambda: schema)
+    cached = _get_cached_prediction(cache_key)
+    if cached is not None:
+        return cached, few_shot_examples
 
-    response = generate(
-        prompt=prompt,
-        model=llm_model,
-        raw=True,
-        options={"temperature": 0.0, "max_tokens": 1024},
-        format=Aspects.model_json_schema()
-    )
+    with metrics.timer(metrics.LLM_GENERATION_SECONDS, server_timing="llm", provider="ollama", model=llm_model):
+        response = generate(
+            prompt=prompt,
+            model=llm_model,
+            raw=True,
+            options={"temperature": 0.0, "max_tokens": 1024},
+            format=schema
+        )
 
     # response.message.content is a JSON string
-    aspects = Aspects.model_validate_json(response.response)
+    with metrics.stage_timer("validation"):
+        aspects = Aspects.model_validate_json(response.response)
 
     if not aspects.aspects:
         return [], few_shot_examples
     else:
-        return json.loads(response.response), few_shot_examples
+        prediction = json.loads(response.response)
+        _store_cached_prediction(cache_key, prediction)
+        return prediction, few_shot_examples
 
 
-def predict_openai(text, considered_sentiment_elements, examples, aspect_categories, polarities, allow_implicit_aspect_terms=False, allow_implicit_opinion_terms=False, n_few_shot=10, llm_model="gpt-4o-2024-08-06", openai_key=None):
+def predict_openai(text, considered_sentiment_elements, examples, aspect_categories, polarities, allow_implicit_aspect_terms=False, allow_implicit_opinion_terms=False, n_few_shot=10, llm_model="gpt-4o-2024-08-06", openai_key=None, tokens=None):
     """Predict sentiment elements using OpenAI's structured output."""
     from openai import OpenAI
-    from pydantic import BaseModel, create_model
-    from enum import Enum
-    
+
     if not openai_key:
         raise ValueError("OpenAI API key is required for OpenAI predictions")
-    
+
     client = OpenAI(api_key=openai_key)
-    
-    # Build dynamic pydantic model based on considered sentiment elements
-    allowed_phrases = find_valid_phrases_list(text)
-    allowed_aspect_terms = allowed_phrases + ["NULL"] if allow_implicit_aspect_terms else allowed_phrases
-    allowed_opinion_terms = allowed_phrases + ["NULL"] if allow_implicit_opinion_terms else allowed_phrases
-
-    AspectEnum = Enum("AspectEnum", {p: p for p in allowed_aspect_terms})
-    OpinionEnum = Enum("OpinionEnum", {p: p for p in allowed_opinion_terms})
-    PolarityEnum = Enum("PolarityEnum", {p: p for p in polarities})
-    CategoryEnum = Enum("CategoryEnum", {c: c for c in aspect_categories})
-
-    # Mapping von Namen -> Typen
-    field_types = {
-        "aspect_term": (AspectEnum, ...),
-        "aspect_category": (CategoryEnum, ...),
-        "opinion_term": (OpinionEnum, ...),
-        "sentiment_polarity": (PolarityEnum, ...)
-    }
 
-    # dynamisch Modell bauen
-    SentimentElement = create_model(
-        "SentimentElement",
-        **{name: field_types[name] for name in considered_sentiment_elements}
-    )
+    # Build dynamic pydantic model based on considered sentiment elements
+    Aspects = build_aspects_model(text, considered_sentiment_elements, aspect_categories, polarities,
+                                  allow_implicit_aspect_terms, allow_implicit_opinion_terms, tokens)
 
-    class Aspects(BaseModel):
-        aspects: list[SentimentElement]
+    with metrics.timer(metrics.RETRIEVAL_SECONDS, server_timing="retrieval"):
+        few_shot_examples = get_most_similar_examples(text, examples, n=n_few_shot)
 
     # Build prompt similar to Ollama version
-    prompt_head = "According to the following sentiment elements definition: \n\n"
+    with metrics.timer(metrics.PROMPT_BUILD_SECONDS, server_timing="prompt"):
+        prompt = build_prompt(text, considered_sentiment_elements, few_shot_examples, aspect_categories,
+                              polarities, allow_implicit_aspect_terms, allow_implicit_opinion_terms)
 
-    if "aspect_term" in considered_sentiment_elements:
-        prompt_head += "- The 'aspect term' is the exact word or phrase in the text that represents a specific feature, attribute, or aspect of a product or service that a user may express an opinion about. "
-        if allow_implicit_aspect_terms:
-            prompt_head += "The aspect term might be 'NULL' for implicit aspect."
-        prompt_head += "\n"
-    if "aspect_category" in considered_sentiment_elements:
-        prompt_head += f"- The 'aspect category' refers to the category that aspect belongs to, and the available categories includes: {', '.join(aspect_categories)}.\n"
-    if "sentiment_polarity" in considered_sentiment_elements:
-        prompt_head += f"- The 'sentiment polarity' refers to the degree of positivity, negativity or neutrality expressed in the opinion towards a particular aspect or feature of a product or service, and the available polarities include: {', '.join(polarities)}.\n"
-    if "opinion_term" in considered_sentiment_elements:
-        prompt_head += "- The 'opinion term' is the exact word or phrase in the text that refers to the sentiment or attitude expressed by a user towards a particular aspect or feature of a product or service. "
-        if allow_implicit_opinion_terms:
-            prompt_head += "The opinion term might be 'NULL' for implicit opinion."
-        prompt_head += "\n"
-
-    prompt_head += "\nRecognize all sentiment elements with their corresponding "
-    for element in considered_sentiment_elements:
-        prompt_head += element.replace("_", " ") + "s, "
-    prompt_head = prompt_head[:-2]  # remove last comma and space
-    prompt_head += " in the following text in the form of a list of objects, each object having key(s) "
-    for element in considered_sentiment_elements:
-        prompt_head += f"'{element.replace('_', ' ')}', "
-    prompt_head = prompt_head[:-2]  # remove last comma and space
-    prompt_head += ".\n\n"
-
-    few_shot_examples = get_most_similar_examples(text, examples, n=n_few_shot)
-
-    prompt = prompt_head + "Here are some examples:\n"
-    for ex in few_shot_examples:
-        prompt += f"Text: {ex['text']}\n"
-        prompt += "Sentiment elements: ["
-        for label in ex['label']:
-            prompt += "("
-            for element in considered_sentiment_elements:
-                prompt += f"'{element.replace('_', ' ')}': '{label[element]}', "
-            prompt = prompt[:-2]  # remove last comma and space
-            prompt += "), "
-        prompt = prompt[:-2]  # remove last comma and space
-        prompt += "]\n"
-    prompt += f"Text: {text}\nSentiment elements: "
+    cache_key = _prediction_cache_key("openai", llm_model, prompt, Aspects.model_json_schema)
+    cached = _get_cached_prediction(cache_key)
+    if cached is not None:
+        return cached, few_shot_examples
 
     try:
         print("🔍 Sending request to OpenAI...")
-        completion = client.beta.chat.completions.parse(
-            model=llm_model,
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant for aspect-based sentiment analysis. Extract the sentiment elements from the given text according to the provided instructions."},
-                {"role": "user", "content": prompt},
-            ],
-            response_format=Aspects,
-            temperature=0.0
-        )
+        with metrics.timer(metrics.LLM_GENERATION_SECONDS, server_timing="llm", provider="openai", model=llm_model):
+            completion = client.beta.chat.completions.parse(
+                model=llm_model,
+                messages=[
+                    {"role": "system", "content": "You are a helpful assistant for aspect-based sentiment analysis. Extract the sentiment elements from the given text according to the provided instructions."},
+                    {"role": "user", "content": prompt},
+                ],
+                response_format=Aspects,
+                temperature=0.0
+            )
 
         message = completion.choices[0].message
         if message.parsed:
             # Convert to same format as Ollama response
-            aspects_data = {"aspects": []}
-            for aspect in message.parsed.aspects:
-                aspect_dict = {}
-                for element in considered_sentiment_elements:
-                    aspect_dict[element] = getattr(aspect, element).value
-                aspects_data["aspects"].append(aspect_dict)
-            
+            with metrics.stage_timer("validation"):
+                aspects_data = {"aspects": []}
+                for aspect in message.parsed.aspects:
+                    aspect_dict = {}
+                    for element in considered_sentiment_elements:
+                        aspect_dict[element] = getattr(aspect, element).value
+                    aspects_data["aspects"].append(aspect_dict)
+
+            _store_cached_prediction(cache_key, aspects_data)
             return aspects_data, few_shot_examples
         else:
             print(f"OpenAI refused the request: {message.refusal}")
             return {"aspects": []}, few_shot_examples
-            
+
     except Exception as e:
         print(f"Error in OpenAI prediction: {e}")
         return {"aspects": []}, few_shot_examples
@@ -762,105 +1540,82 @@ def get_most_similar_examples(input_text, examples, n):
             text = str(ex)
         example_texts.append(text)
 
-    # Tokenize texts for BM25
-    def tokenize(text):
-        # Simple tokenization: lowercase and split on whitespace/punctuation
-        return re.findall(r'\b\w+\b', text.lower())
-
-    tokenized_examples = [tokenize(text) for text in example_texts]
-    tokenized_query = tokenize(input_text_str)
+    tokenized_examples = [tokenize_for_bm25(text) for text in example_texts]
+    tokenized_query = tokenize_for_bm25(input_text_str)
 
     # Create BM25 model and get scores
-    bm25 = BM25Okapi(tokenized_examples)
+    bm25 = lazy_import("rank_bm25").BM25Okapi(tokenized_examples)
     scores = bm25.get_scores(tokenized_query)
 
-    # Get top n indices
-    if n < len(examples):
-        # Get indices of top n scores
-        top_indices = np.argsort(scores)[-n:][::-1]  # Sort descending
-    else:
-        # If we need all examples, just sort everything
-        top_indices = np.argsort(scores)[::-1]
+    return [examples[i] for i in top_n_indices(scores, n)]
+
+
+def tokenize_for_bm25(text):
+    """Simple tokenization for BM25: lowercase and split on whitespace/punctuation."""
+    return re.findall(r'\b\w+\b', text.lower())
 
-    return [examples[i] for i in top_indices]
+
+def top_n_indices(scores, n):
+    """Return the indices of the n highest BM25 scores, best first."""
+    np = lazy_import("numpy")
+    if n < len(scores):
+        # Get indices of top n scores
+        return np.argsort(scores)[-n:][::-1]  # Sort descending
+    # If we need all examples, just sort everything
+    return np.argsort(scores)[::-1]
 
 
-def find_valid_phrases_list(text, max_tokens_in_phrase=None):
-    phrases = []
-    # identify split positions based on punctuation and spaces
-    split_positions = [0]
-    for match in re.finditer(r'(?<=\w)(?=[,\.\!\?\;\:])|[\s]+', text):
-        split_positions.append(match.end())
+def find_valid_phrases_list(text, max_tokens_in_phrase=None, tokens=None):
+    """Candidate aspect and opinion phrases of a text (see TokenTable.valid_phrases).
 
-    n_splits = len(split_positions)
-    if max_tokens_in_phrase is None:
-        max_tokens_in_phrase = n_splits
+    With the cached TokenTable of the text (store.tokens(idx)) the phrases are only enumerated once per item.
+    """
+    if tokens is None:
+        tokens = token_tables.TokenTable(text)
+    return tokens.valid_phrases(max_tokens_in_phrase)
 
-    # print all phrases between split positions
-    for i in range(len(split_positions)):
-        for j in range(i+1, len(split_positions)):
-            phrase = text[split_positions[i]:split_positions[j]].strip()
-            if phrase:
-                num_tokens = len(phrase.split())
-                if num_tokens <= max_tokens_in_phrase:
-                    phrases.append(phrase)
 
-    # remove phrases with special characters at the beginning or end
-    phrases = [p for p in phrases if re.match(r'^[\w].*[\w]$', p)]
+def collect_prediction_examples(store, data_idx, default_aspects, near_duplicates=None, threshold=None):
+    """Return (text, examples, aspect_categories) for predicting item data_idx.
 
-    return phrases
+    Examples are all other annotated items with a non-empty label. With a near-duplicate
+    index, items in the duplicate cluster of data_idx are left out and every other
+    cluster contributes only its first annotated item.
+    """
+    if data_idx < 0 or data_idx >= len(store):
+        raise HTTPException(
+            status_code=404, detail="Index out of range")
+    text = store.texts[data_idx]
+    # The labels are kept parsed in the store, for CSV as well as JSON files
+    annotated = store.annotated()
+    if near_duplicates is not None:
+        cluster_ids = near_duplicates.cluster_ids(threshold)
+        seen_clusters = {cluster_ids[data_idx]}
+        unique = []
+        for idx, annotations in annotated:
+            if cluster_ids[idx] not in seen_clusters:
+                seen_clusters.add(cluster_ids[idx])
+                unique.append((idx, annotations))
+        annotated = unique
+    examples = [{'text': store.texts[idx], 'label': annotations} for idx, annotations in annotated]
+    aspect_categories = store.serialize(data_idx, default_aspects)['aspect_category_list']
+
+    # filter examples that are identical to the requested text
+    examples = [ex for ex in examples if ex['text'] != text]
+    return text, examples, aspect_categories
 
 
 @app.get("/ai_prediction/{data_idx}")
 def get_ai_prediction(data_idx: int):
     try:
-        data = load_data()
+        store = get_store()
         config = load_config()
         default_aspects = config.get('aspect_categories', [])
-        examples = []
-        # Branch by file type
-        if DATA_FILE_TYPE == "json":
-            # JSON data is a list of dicts
-            if data_idx < 0 or data_idx >= len(data):
-                raise HTTPException(
-                    status_code=404, detail="Index out of range")
-            item = data[data_idx]
-            text = item.get('text', '')
-            # Collect examples with non-empty labels
-            for entry in data:
-                lbl = entry.get('label', [])
-                if isinstance(lbl, list) and lbl:
-                    examples.append(
-                        {'text': entry.get('text', ''), 'label': lbl})
-            aspect_categories = item.get(
-                'aspect_category_list', default_aspects)
-        else:
-            # CSV data is a DataFrame
-            df = data
-            if data_idx < 0 or data_idx >= len(df):
-                raise HTTPException(
-                    status_code=404, detail="Index out of range")
-            # Current row
-            row = df.iloc[data_idx].to_dict()
-            text = row.get('text', '')
-            # Collect examples with non-empty label field
-            for _, r in df.iterrows():
-                lbl_str = r.get('label', '')
-                if pd.isna(lbl_str) or lbl_str == '':
-                    continue
-                try:
-                    lbl = json.loads(lbl_str)
-                    if isinstance(lbl, list) and lbl:
-                        examples.append(
-                            {'text': r.get('text', ''), 'label': lbl})
-                except Exception:
-                    continue
-            # Determine aspect categories per example
-            raw_aspects = row.get('aspect_category_list', None)
-            aspect_categories = raw_aspects if raw_aspects else default_aspects
-
-        # filter examples that are identical to the requested text
-        examples = [ex for ex in examples if ex['text'] != text]
+        with metrics.stage_timer("pool"):
+            near_duplicates = get_near_duplicate_index() if config.get("exclude_near_duplicates", False) else None
+            text, examples, aspect_categories = collect_prediction_examples(
+                store, data_idx, default_aspects, near_duplicates, near_duplicate_threshold(config))
+        tokens = store.tokens(data_idx)
 
         # Check if OpenAI key is available, use OpenAI if yes, otherwise use Ollama
         openai_key = config.get('openai_key')
@@ -879,7 +1634,8 @@ def get_ai_prediction(data_idx: int):
                     'implicit_opinion_term_allowed', False),
                 n_few_shot=config.get('n_few_shot', 10),
                 llm_model=config.get('llm_model', 'gpt-4o-2024-08-06'),
-                openai_key=openai_key
+                openai_key=openai_key,
+                tokens=tokens
             )[0]
         else:
             predictions = predict_llm(
@@ -895,24 +1651,25 @@ def get_ai_prediction(data_idx: int):
                 allow_implicit_opinion_terms=config.get(
                     'implicit_opinion_term_allowed', False),
                 n_few_shot=config.get('n_few_shot', 10),
-                llm_model=config.get('llm_model', 'gemma3:4b')
+                llm_model=config.get('llm_model', 'gemma3:4b'),
+                tokens=tokens
             )[0]
         predictions = predictions["aspects"]
 
         # if position saving is enabled, add positions to predictions
         if config.get('save_phrase_positions', True) and not config.get("disable-save-positions", False):
-            for aspect in predictions:
-                if 'aspect_term' in aspect and aspect['aspect_term'] != 'NULL':
-                    start, end = find_phrase_positions(
-                        text, aspect['aspect_term'])
-                    aspect['at_start'] = start
-                    aspect['at_end'] = end
-                if 'opinion_term' in aspect and aspect['opinion_term'] != 'NULL':
-                    start, end = find_phrase_positions(
-                        text, aspect['opinion_term'])
-                    aspect['ot_start'] = start
-                    aspect['ot_end'] = end
-
+            with metrics.stage_timer("positions"):
+                for aspect in predictions:
+                    if 'aspect_term' in aspect and aspect['aspect_term'] != 'NULL':
+                        start, end = tokens.find(aspect['aspect_term'])
+                        aspect['at_start'] = start
+                        aspect['at_end'] = end
+                    if 'opinion_term' in aspect and aspect['opinion_term'] != 'NULL':
+                        start, end = tokens.find(aspect['opinion_term'])
+                        aspect['ot_start'] = start
+                        aspect['ot_end'] = end
+
+        EVENTS.publish("prediction", {"data_idx": data_idx})
         return predictions
     except Exception as e:
         raise HTTPException(
@@ -920,51 +1677,197 @@ def get_ai_prediction(data_idx: int):
 
 
 @app.get("/avg-annotation-time")
-def get_avg_annotation_time():
+def get_avg_annotation_time(request: Request, response: Response):
     """Calculate and return the average annotation time across all examples with timing data."""
+    not_modified = check_etag(request, response, "t", _DATA_GENERATION, timing_version())
+    if not_modified:
+        return not_modified
+    try:
+        return get_timing_stats().average()
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Error calculating average annotation time: {str(e)}")
+
+
+@app.get("/export")
+def export_annotations():
+    """Download the data file with all recorded timing events merged into the items' "timings"."""
     try:
         data = load_data()
-        total_duration = 0.0
-        total_entries = 0
+        get_timing_sink().sync()
+        telemetry.merge_timings(data, telemetry.read_events(telemetry.sink_path(DATA_FILE_PATH)), DATA_FILE_TYPE)
+        if DATA_FILE_TYPE == "json":
+            content = json.dumps(data, indent=2, ensure_ascii=False)
+            media_type = "application/json"
+        else:
+            content = data.to_csv(index=False)
+            media_type = "text/csv"
+        filename = os.path.basename(DATA_FILE_PATH)
+        return Response(content, media_type=media_type,
+                        headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=404, detail=f"{DATA_FILE_PATH} not found")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error exporting data: {str(e)}")
 
-        for idx, item in enumerate(data):
-            if DATA_FILE_TYPE == "json":
-                timings = item.get("timings", []) if isinstance(
-                    item.get("timings"), list) else []
-            else:
-                # CSV: timings stored as JSON string in 'timings' column
-                timings_str = item.get("timings") if hasattr(item, 'get') and callable(item.get) else (
-                    data.iloc[idx]["timings"] if "timings" in data.columns and idx < len(
-                        data) else None
-                )
-                try:
-                    timings = json.loads(
-                        timings_str) if timings_str and timings_str != '' else []
-                except Exception:
-                    timings = []
-
-            # Sum all duration values for this example
-            for timing_entry in timings:
-                if isinstance(timing_entry, dict) and "duration" in timing_entry:
-                    total_duration += timing_entry["duration"]
-                    total_entries += 1
-
-        avg_time = total_duration / total_entries if total_entries > 0 else 0.0
-
-        return {
-            "avg_annotation_time": round(avg_time, 2),
-            "total_entries": total_entries,
-            "total_duration": round(total_duration, 2)
-        }
 
+@app.get("/stats")
+def get_label_stats_summary(request: Request, response: Response):
+    """Label statistics: annotations per item, per aspect_category, per sentiment_polarity and per
+    (category, polarity) pair, and the share of implicit (NULL) aspect and opinion terms."""
+    not_modified = check_etag(request, response, "st", _DATA_VERSION)
+    if not_modified:
+        return not_modified
+    try:
+        return get_label_stats().summary()
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=404, detail=f"{DATA_FILE_PATH} not found")
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Error calculating label statistics: {str(e)}")
+
+
+@app.get("/timing-stats")
+def get_timing_stats_summary(request: Request, response: Response):
+    """Annotation time statistics (count, mean, std, min/max, p50/p90/p99) overall, by session_id and by change."""
+    not_modified = check_etag(request, response, "ts", _DATA_GENERATION, timing_version())
+    if not_modified:
+        return not_modified
+    try:
+        return get_timing_stats().summary()
     except Exception as e:
         raise HTTPException(
-            status_code=500, detail=f"Error calculating average annotation time: {str(e)}")
+            status_code=500, detail=f"Error calculating timing statistics: {str(e)}")
+
+
+def progress_events(data=None):
+    """The events describing the annotation progress of the loaded data, or of the compact store if not given."""
+    if data is None:
+        store = get_store()
+        total, current = len(store), store.first_unannotated()
+    else:
+        total, current = len(data), get_current_index(data)
+    progress = [("progress", {
+        "total_count": total,
+        "current_index": current,
+        "max_number_of_idxs": total
+    })]
+    if CONFIG_DATA.get("display_avg_annotation_time", False):
+        progress.append(("avg_annotation_time", get_timing_stats(data).average()))
+    return progress
+
+
+def publish_progress(data=None):
+    """Push progress (and the average annotation time) to /events clients after a write.
+
+    Computed once per write from the already loaded data (or the compact store), and only if a client is connected.
+    """
+    if not EVENTS.has_subscribers():
+        return
+    for event, payload in progress_events(data):
+        EVENTS.publish(event, payload)
+
+
+def publish_changed_items():
+    """Push the items changed since the last call to /events clients, which drop their prefetched copies."""
+    global _CHANGED_ITEMS, _ALL_ITEMS_CHANGED
+    with _VERSION_LOCK:
+        items, everything = _CHANGED_ITEMS, _ALL_ITEMS_CHANGED
+        _CHANGED_ITEMS, _ALL_ITEMS_CHANGED = set(), False
+    if items or everything:
+        EVENTS.publish("items_changed", {"all": True} if everything else {"items": sorted(items)})
+
+
+def publish_label_stats():
+    """Push the label statistics to /events clients once a label change has been applied to them."""
+    if not EVENTS.has_subscribers():
+        return
+    try:
+        EVENTS.publish("label_stats", get_label_stats().summary())
+    except Exception as e:
+        print(f"⚠️  Could not publish label statistics: {e}")
+
+
+@app.get("/events")
+async def get_events(request: Request):
+    """Server-sent events stream with progress, average annotation time and finished predictions."""
+    try:
+        snapshot = await run_in_threadpool(
+            lambda: progress_events() + [("label_stats", get_label_stats().summary())])
+    except FileNotFoundError:
+        snapshot = []
+    return StreamingResponse(EVENTS.stream(request, snapshot), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+STARTUP_TIMINGS["app setup"] = time.perf_counter() - _IMPORT_START - sum(STARTUP_TIMINGS.values())
+
+
+# Memory of a loaded dataset relative to its file size (measured on the synthetic benchmark data)
+DATASET_MEMORY_FACTOR = {"json": 3.0, "csv": 1.5}
+
+
+def memory_usage():
+    """Approximate bytes held by this backend, used to budget the loaded projects (see projects.py).
+
+    Without a compact store, requests load the dataset from the data file, so it is estimated from the file size.
+    """
+    total = 0
+    store = _STORE
+    if store is not None:
+        total += store.nbytes()
+    elif os.path.exists(DATA_FILE_PATH):
+        total += int(os.path.getsize(DATA_FILE_PATH) * DATASET_MEMORY_FACTOR[DATA_FILE_TYPE])
+    if _NEAR_DUPLICATES is not None:
+        total += _NEAR_DUPLICATES.nbytes()
+    if _SEARCH_INDEX is not None:
+        total += _SEARCH_INDEX.nbytes()
+    with _PREDICTION_CACHE_LOCK:
+        total += sum(len(key[2]) + len(key[3]) + len(value) for key, value in _PREDICTION_CACHE.items())
+    cached = _GUIDELINE_CACHE.get("entry")
+    if cached is not None and cached[1]["content"] is not None:
+        total += cached[1]["size"]
+    return total
+
+
+def watch_other_workers(interval=0.5):
+    """Push the changes made through other workers to this worker's /events clients.
+
+    Changes made through this worker are pushed once more; the events carry
+    the full state, so a repeated event is harmless.
+    """
+    seen_data_version, seen_timing_version = _DATA_VERSION, timing_version()
+    seen_jobs_version = position_board().version()
+    while True:
+        time.sleep(interval)
+        if not EVENTS.has_subscribers():
+            continue
+        try:
+            sync_versions()
+            if _DATA_VERSION != seen_data_version:
+                seen_data_version = _DATA_VERSION
+                publish_changed_items()
+                publish_progress()
+                publish_label_stats()
+            if timing_version() != seen_timing_version:
+                seen_timing_version = timing_version()
+                if CONFIG_DATA.get("display_avg_annotation_time", False):
+                    EVENTS.publish("avg_annotation_time", get_timing_stats().average())
+            if position_board().version() != seen_jobs_version:
+                seen_jobs_version = position_board().version()
+                snapshot = position_board().latest()
+                if snapshot is not None:
+                    EVENTS.publish("auto_positions", snapshot)
+        except Exception as e:
+            print(f"⚠️  Could not sync with other workers: {e}")
 
 
 @app.on_event("startup")
 async def startup_event():
     """Run startup tasks including auto-adding missing position data."""
+    startup_start = time.perf_counter()
     print(f"🚀 Starting AnnoABSA Backend...")
     print(f"📄 Data file: {DATA_FILE_PATH} (type: {DATA_FILE_TYPE})")
     if CONFIG_PATH:
@@ -972,13 +1875,54 @@ async def startup_event():
 
     # Auto-add missing position data when server starts (only if enabled)
     if AUTO_POSITIONS:
-        print("🔧 Auto-positions feature enabled - scanning for missing position data...")
-        auto_add_missing_positions()
+        if WORKERS > 1 and not position_board().claim_startup():
+            print("🔧 Auto-positions feature enabled - another worker fills missing position data")
+        else:
+            print("🔧 Auto-positions feature enabled - filling missing position data in the background...")
+            start_auto_positions_job()
     else:
         print("ℹ️  Auto-positions feature disabled (use --auto-positions to enable)")
 
+    if CONFIG_DATA.get("exclude_near_duplicates") or CONFIG_DATA.get("propagate_duplicate_labels"):
+        threading.Thread(target=warm_near_duplicate_index, name="absa-near-duplicates", daemon=True).start()
+
+    if WORKERS > 1:
+        threading.Thread(target=watch_other_workers, name="absa-worker-sync", daemon=True).start()
+        print(f"👥 Worker {os.getpid()} of {WORKERS}, sharing state through {shared_state.feed_path(DATA_FILE_PATH)}")
+
+    if PROJECTS_FILE:
+        global PROJECT_HOST
+        if WORKERS > 1:
+            raise RuntimeError("ABSA_PROJECTS_FILE cannot be combined with more than one worker (ABSA_WORKERS)")
+        import projects
+        PROJECT_HOST = projects.ProjectHost(PROJECTS_FILE, int(PROJECT_MEMORY_MB * 1024 * 1024))
+        app.mount("/projects", PROJECT_HOST)
+        print(f"🗂️  Serving {len(PROJECT_HOST.definitions())} projects from {PROJECTS_FILE} under /projects/<name> "
+              f"(memory budget {PROJECT_MEMORY_MB:.0f} MB)")
+
+    if FRONTEND_DIR:
+        from static_frontend import mount_frontend
+        compressed = mount_frontend(app, FRONTEND_DIR)
+        print(f"🌐 Serving frontend from {FRONTEND_DIR} ({compressed} files precompressed)")
+
+    STARTUP_TIMINGS["startup tasks"] = time.perf_counter() - startup_start
+    print("⏱️  Startup: " + ", ".join(
+        f"{name} {duration * 1000:.0f} ms" for name, duration in STARTUP_TIMINGS.items()))
     print("✨ Backend ready!")
 
+
+@app.on_event("shutdown")
+def shutdown_event():
+    """Stop auto-positions jobs, finish pending writes, end the event streams and close the timing sink."""
+    for job in list(POSITION_JOBS.values()):
+        job.cancel_requested = True
+    if PROJECT_HOST is not None:
+        PROJECT_HOST.close()
+    DATA_WRITES.close()
+    EVENTS.close()
+    if _TIMING_SINK is not None:
+        _TIMING_SINK.close()
+
 # BM25-based similarity matching (no caching needed)
 
 # Removed _load_embedding_cache function - BM25 doesn't need caching
@@ -0,0 +1,196 @@
+"""
+Minimal Prometheus-compatible metrics for the AnnoABSA backend.
+
+Counters and histograms are kept in memory and rendered in the Prometheus
+text exposition format by render(). Recording a value is a dict lookup and
+a few additions under a lock, so instrumentation is cheap enough for the
+request hot paths.
+
+Timed stages can also be collected per request (see collect_stages()) to
+build a Server-Timing header.
+"""
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from sub-millisecond file reads to slow LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+BYTES_BUCKETS = (1024, 16 * 1024, 128 * 1024, 1024 ** 2, 8 * 1024 ** 2, 64 * 1024 ** 2, 512 * 1024 ** 2, 4 * 1024 ** 3)
+COUNT_BUCKETS = (10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 50000)
+
+_REGISTRY = []
+
+
+def _format_labels(label_names, label_values, extra=None):
+    pairs = list(zip(label_names, label_values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonically increasing counter with optional labels."""
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _REGISTRY.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(labels.get(name, "") for name in self.label_names), 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Histogram with fixed buckets and optional labels."""
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # per label key: [bucket counts..., +Inf count], sum
+        self._values = {}
+        self._lock = threading.Lock()
+        _REGISTRY.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.label_names)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def count(self, **labels):
+        entry = self._values.get(tuple(labels.get(name, "") for name in self.label_names))
+        return sum(entry[0]) if entry else 0
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _format_labels(self.label_names, key, ("le", _format_value(float(bound))))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+# (name, seconds) pairs of the current request, None outside of collect_stages()
+_request_stages = contextvars.ContextVar("absa_request_stages", default=None)
+
+
+@contextmanager
+def timer(histogram, server_timing=None, **labels):
+    """Observe the duration of the with-block in seconds.
+
+    If server_timing is given, the duration is also recorded under that name
+    for the Server-Timing header of the current request.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        histogram.observe(duration, **labels)
+        if server_timing is not None:
+            stages = _request_stages.get()
+            if stages is not None:
+                stages.append((server_timing, duration))
+
+
+def stage_timer(name):
+    """Time an AI prediction stage that has no dedicated histogram."""
+    return timer(PREDICTION_STAGE_SECONDS, server_timing=name, stage=name)
+
+
+def collect_stages():
+    """Start collecting timed stages for the current request and return the list they are appended to.
+
+    The list is shared with contexts copied from the current one, e.g. the
+    threadpool that runs sync endpoints.
+    """
+    stages = []
+    _request_stages.set(stages)
+    return stages
+
+
+def server_timing_header(stages, total=None):
+    """Format collected stages as a Server-Timing header value (durations in ms, repeated stages summed)."""
+    durations = {}
+    for name, duration in stages:
+        durations[name] = durations.get(name, 0.0) + duration
+    if total is not None:
+        durations["total"] = total
+    return ", ".join(f"{name};dur={duration * 1000:.1f}" for name, duration in durations.items())
+
+
+def render():
+    """Render all registered metrics in the Prometheus text format."""
+    lines = []
+    for metric in _REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# Backend metrics
+REQUEST_SECONDS = Histogram("absa_http_request_duration_seconds",
+                            "HTTP request latency by route", ("method", "route", "status"))
+FILE_LOAD_SECONDS = Histogram("absa_data_load_duration_seconds", "Duration of load_data()", ("format",))
+FILE_LOAD_BYTES = Histogram("absa_data_load_bytes", "Size of the data file read by load_data()",
+                            ("format",), BYTES_BUCKETS)
+FILE_SAVE_SECONDS = Histogram("absa_data_save_duration_seconds", "Duration of save_data()", ("format",))
+FILE_SAVE_BYTES = Histogram("absa_data_save_bytes", "Size of the data file written by save_data()",
+                            ("format",), BYTES_BUCKETS)
+RETRIEVAL_SECONDS = Histogram("absa_retrieval_duration_seconds", "BM25 few-shot example retrieval time")
+PROMPT_BUILD_SECONDS = Histogram("absa_prompt_build_duration_seconds", "LLM prompt construction time")
+LLM_GENERATION_SECONDS = Histogram("absa_llm_generation_duration_seconds",
+                                   "LLM generation time per provider and model", ("provider", "model"))
+PREDICTION_STAGE_SECONDS = Histogram("absa_prediction_stage_duration_seconds",
+                                     "Duration of the remaining AI prediction stages", ("stage",))
+SCHEMA_PHRASES = Histogram("absa_schema_phrases", "Candidate phrases in the structured output schema",
+                           buckets=COUNT_BUCKETS)
+PREDICTION_CACHE = Counter("absa_prediction_cache_total", "Prediction cache lookups", ("result",))
+ANNOTATION_WRITES = Counter("absa_annotation_writes_total", "Annotations saved")
+WRITE_BATCH_SIZE = Histogram("absa_write_batch_size", "Write requests persisted per save of the data file",
+                             buckets=(1, 2, 5, 10, 25, 50, 100, 250, 1000))
+TIMING_WRITES = Counter("absa_timing_writes_total", "Timing entries saved")
+PROFILED_CALLS = Counter("absa_profiled_calls_total",
+                         "Sync endpoint calls while profiling is enabled: written (slow), discarded (fast), "
+                         "skipped (another profile was active) or skipped_slow (skipped and slow)", ("result",))
@@ -0,0 +1,283 @@
+"""
+Near-duplicate index over the item texts (MinHash signatures with LSH banding).
+
+Scraped review corpora contain the same review several times, sometimes
+with small edits. Each distinct text gets a MinHash signature of its
+character shingles (lowercased, whitespace collapsed); the Jaccard
+similarity of two texts is estimated by the share of equal signature
+values. LSH splits every signature into BANDS bands of ROWS values and
+buckets the texts by a hash of each band (kept as one sorted array per
+band), so a query only compares the texts that share a bucket with it
+instead of all items. With 16 bands of 4 rows, a
+pair with similarity 0.8 shares a bucket with probability > 0.999, one
+with similarity 0.3 with probability ~0.12; thresholds below ~0.5 miss
+pairs.
+
+Items with identical texts (exact duplicates) share one entry, so a
+dataset with many copies of a review costs one signature per distinct
+text. sync() updates the index to the current texts and only computes
+signatures for texts that changed.
+"""
+import hashlib
+import threading
+from array import array
+
+import numpy as np
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 5
+DEFAULT_THRESHOLD = 0.8
+# Bytes of text hashed at once (the hash matrix takes NUM_PERM * 8 bytes per byte of text)
+BATCH_BYTES = 1 << 16
+
+_PRIME = (1 << 31) - 1
+_random = np.random.RandomState(20240607)
+_A = _random.randint(1, _PRIME, size=(NUM_PERM, 1)).astype(np.int64)
+_B = _random.randint(0, _PRIME, size=(NUM_PERM, 1)).astype(np.int64)
+_WINDOW_SHIFTS = np.arange(SHINGLE_SIZE, dtype=np.int64) * 8
+_BAND_MULTIPLIERS = (_random.randint(1, 1 << 62, size=ROWS, dtype=np.int64).astype(np.uint64) << np.uint64(1)) | np.uint64(1)
+
+
+def normalize(text):
+    return " ".join(text.lower().split())
+
+
+def text_digest(text):
+    """64-bit digest identifying a text (exact duplicates have the same digest)."""
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+
+
+def band_keys(signatures):
+    """(len(signatures) x BANDS) hashes of the bands of each signature."""
+    rows = signatures.reshape(len(signatures), BANDS, ROWS).astype(np.uint64)
+    keys = np.zeros((len(signatures), BANDS), dtype=np.uint64)
+    for row in range(ROWS):
+        keys ^= rows[:, :, row] * _BAND_MULTIPLIERS[row]
+    return keys
+
+
+def minhash_signatures(texts):
+    """MinHash signatures (len(texts) x NUM_PERM) of the character shingles of each text."""
+    encoded = [normalize(text).encode("utf-8").ljust(SHINGLE_SIZE, b"\0") for text in texts]
+    if not encoded:
+        return np.zeros((0, NUM_PERM), dtype=np.uint32)
+    lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    buffer = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.int64)
+
+    # Every window of SHINGLE_SIZE bytes of the joined buffer, without those crossing into the next text
+    n_windows = len(buffer) - SHINGLE_SIZE + 1
+    windows = np.zeros(n_windows, dtype=np.int64)
+    for shift_index, shift in enumerate(_WINDOW_SHIFTS):
+        windows |= buffer[shift_index:shift_index + n_windows] << shift
+    valid = np.ones(n_windows, dtype=bool)
+    crossing = (starts + lengths)[:, None] - np.arange(1, SHINGLE_SIZE)[None, :]
+    crossing = crossing[crossing < n_windows]
+    valid[crossing] = False
+    shingles = windows[valid] % _PRIME
+
+    # Each text has lengths - SHINGLE_SIZE + 1 (>= 1) valid windows, in order
+    first_window = np.concatenate(([0], np.cumsum(lengths - SHINGLE_SIZE + 1)[:-1]))
+    hashes = (_A * shingles[None, :] + _B) % _PRIME
+    return np.minimum.reduceat(hashes, first_window, axis=1).T.astype(np.uint32)
+
+
+class NearDuplicateIndex:
+    """Near-duplicate and exact-duplicate lookups over the items of a dataset."""
+
+    def __init__(self):
+        self._item_entry = array("q")  # idx -> entry id of its text
+        self._item_digest = array("q")  # idx -> digest of its text
+        self._entries = {}  # digest -> entry id
+        self._members = {}  # entry id -> idx of the items with this text
+        self._signatures = np.zeros((0, NUM_PERM), dtype=np.uint32)  # entry id -> signature
+        # Per band: the band hashes of all entries, sorted, and the entry of each
+        self._bucket_keys = np.zeros((BANDS, 0), dtype=np.uint64)
+        self._bucket_entries = np.zeros((BANDS, 0), dtype=np.int64)
+        self._free_entries = []
+        self._clusters = {}  # threshold -> cluster id per idx, until the next change
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._item_entry)
+
+    def _remove_item(self, idx):
+        entry = self._item_entry[idx]
+        members = self._members[entry]
+        members.remove(idx)
+        if not members:
+            del self._members[entry]
+            del self._entries[self._item_digest[idx]]
+            self._free_entries.append(entry)
+
+    def sync(self, texts):
+        """Update the index to the texts (a sequence indexed like the items). Returns the number of changed items."""
+        digests = [text_digest(texts[idx]) for idx in range(len(texts))]
+        with self._lock:
+            changed = [idx for idx, digest in enumerate(digests)
+                       if idx >= len(self._item_digest) or self._item_digest[idx] != digest]
+            removed = range(len(digests), len(self._item_digest))
+            if not changed and not removed:
+                return 0
+            for idx in list(changed) + list(removed):
+                if idx < len(self._item_digest):
+                    self._remove_item(idx)
+            del self._item_entry[len(digests):]
+            del self._item_digest[len(digests):]
+
+            # New distinct texts get a signature, in batches
+            new_digests = {}
+            for idx in changed:
+                if digests[idx] not in self._entries and digests[idx] not in new_digests:
+                    new_digests[digests[idx]] = idx
+            batch, batch_texts, batch_bytes = [], [], 0
+            for position, idx in enumerate(new_digests.values()):
+                batch.append(idx)
+                batch_texts.append(texts[idx])
+                batch_bytes += len(batch_texts[-1])
+                if batch_bytes >= BATCH_BYTES or position == len(new_digests) - 1:
+                    for item, signature in zip(batch, minhash_signatures(batch_texts)):
+                        self._add_entry(digests[item], signature)
+                    batch, batch_texts, batch_bytes = [], [], 0
+
+            for idx in changed:
+                entry = self._entries[digests[idx]]
+                if idx < len(self._item_entry):
+                    self._item_entry[idx], self._item_digest[idx] = entry, digests[idx]
+                else:
+                    self._item_entry.append(entry)
+                    self._item_digest.append(digests[idx])
+                self._members[entry].append(idx)
+            for members in self._members.values():
+                members.sort()
+            self._rebuild_buckets()
+            self._clusters.clear()
+            return len(changed) + len(removed)
+
+    def _add_entry(self, digest, signature):
+        if self._free_entries:
+            entry = self._free_entries.pop()
+        else:
+            entry = len(self._entries) + len(self._free_entries)
+            if entry >= len(self._signatures):
+                grown = np.zeros((max(1024, 2 * len(self._signatures)), NUM_PERM), dtype=np.uint32)
+                grown[:len(self._signatures)] = self._signatures
+                self._signatures = grown
+        self._signatures[entry] = signature
+        self._entries[digest] = entry
+        self._members[entry] = []
+        return entry
+
+    def _rebuild_buckets(self):
+        """Sort the band hashes of the live entries (vectorized; signatures are not recomputed)."""
+        live = np.fromiter(self._members, dtype=np.int64, count=len(self._members))
+        keys = band_keys(self._signatures[live]).T
+        order = np.argsort(keys, axis=1, kind="stable")
+        self._bucket_keys = np.take_along_axis(keys, order, axis=1)
+        self._bucket_entries = live[order]
+
+    def _similar_entries(self, entry, threshold):
+        """(entry, estimated similarity) of the other texts with similarity >= threshold."""
+        query = band_keys(self._signatures[entry:entry + 1])[0]
+        found = []
+        for band in range(BANDS):
+            keys = self._bucket_keys[band]
+            start = np.searchsorted(keys, query[band], side="left")
+            end = np.searchsorted(keys, query[band], side="right")
+            if end - start > 1:
+                found.append(self._bucket_entries[band][start:end])
+        if not found:
+            return []
+        candidates = np.unique(np.concatenate(found))
+        candidates = candidates[candidates != entry]
+        if not len(candidates):
+            return []
+        similarities = (self._signatures[candidates] == self._signatures[entry]).mean(axis=1)
+        keep = similarities >= threshold
+        return list(zip(candidates[keep].tolist(), similarities[keep].tolist()))
+
+    def _similar_pairs(self, threshold):
+        """All (entry, entry) pairs that share a bucket and have similarity >= threshold."""
+        pairs = []
+        for band in range(BANDS):
+            keys, entries = self._bucket_keys[band], self._bucket_entries[band]
+            boundaries = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+            starts = np.concatenate(([0], boundaries))
+            ends = np.concatenate((boundaries, [len(keys)]))
+            shared = ends - starts > 1
+            for start, end in zip(starts[shared].tolist(), ends[shared].tolist()):
+                bucket = np.sort(entries[start:end])
+                first, second = np.triu_indices(len(bucket), 1)
+                pairs.append((bucket[first] << 32) | bucket[second])
+        if not pairs:
+            return []
+        pairs = np.unique(np.concatenate(pairs))
+        firsts, seconds = pairs >> 32, pairs & 0xFFFFFFFF
+        similar = []
+        for start in range(0, len(pairs), 100000):
+            a, b = firsts[start:start + 100000], seconds[start:start + 100000]
+            keep = (self._signatures[a] == self._signatures[b]).mean(axis=1) >= threshold
+            similar.extend(zip(a[keep].tolist(), b[keep].tolist()))
+        return similar
+
+    def exact_duplicates(self, idx):
+        """The other items with exactly the same text."""
+        with self._lock:
+            return [other for other in self._members[self._item_entry[idx]] if other != idx]
+
+    def near_duplicates(self, idx, threshold=DEFAULT_THRESHOLD):
+        """[(other idx, estimated similarity)] of the items similar to item idx, most similar first."""
+        with self._lock:
+            entry = self._item_entry[idx]
+            results = [(other, 1.0) for other in self._members[entry] if other != idx]
+            for similar, similarity in self._similar_entries(entry, threshold):
+                results.extend((other, similarity) for other in self._members[similar])
+        results.sort(key=lambda result: (-result[1], result[0]))
+        return results
+
+    def cluster_ids(self, threshold=DEFAULT_THRESHOLD):
+        """Cluster id of every item (the smallest idx of its cluster); similar items are linked transitively."""
+        with self._lock:
+            cached = self._clusters.get(threshold)
+            if cached is not None:
+                return cached
+            parent = {entry: entry for entry in self._members}
+
+            def find(entry):
+                while parent[entry] != entry:
+                    parent[entry] = parent[parent[entry]]
+                    entry = parent[entry]
+                return entry
+
+            for entry, similar in self._similar_pairs(threshold):
+                root, other = find(entry), find(similar)
+                if root != other:
+                    parent[max(root, other)] = min(root, other)
+            cluster_of_root = {}
+            for entry, members in self._members.items():
+                root = find(entry)
+                cluster_of_root[root] = min(cluster_of_root.get(root, members[0]), members[0])
+            cluster_ids = [cluster_of_root[find(entry)] for entry in self._item_entry]
+            self._clusters[threshold] = cluster_ids
+            return cluster_ids
+
+    def clusters(self, threshold=DEFAULT_THRESHOLD):
+        """Clusters of two or more similar items, largest first: {"items", "size", "exact"}."""
+        cluster_ids = self.cluster_ids(threshold)
+        groups = {}
+        for idx, cluster in enumerate(cluster_ids):
+            groups.setdefault(cluster, []).append(idx)
+        with self._lock:
+            result = [{"items": items, "size": len(items),
+                       "exact": len({self._item_entry[idx] for idx in items}) == 1}
+                      for items in groups.values() if len(items) > 1]
+        result.sort(key=lambda cluster: (-cluster["size"], cluster["items"][0]))
+        return result
+
+    def nbytes(self):
+        """Approximate memory of the index in bytes."""
+        with self._lock:
+            return (self._signatures.nbytes + self._bucket_keys.nbytes + self._bucket_entries.nbytes
+                    + 16 * len(self._item_entry) + 200 * len(self._members))
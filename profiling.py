@@ -0,0 +1,108 @@
+"""
+Opt-in profiling of slow backend requests.
+
+When a profile directory is configured (config key "profile_dir", CLI
+--profile-dir or the ABSA_PROFILE_DIR environment variable), every sync
+endpoint runs under cProfile in the worker thread that executes it. If the
+call takes longer than the threshold (default 1000 ms), the profile is
+written to the directory as a .prof file for `python -m pstats` or
+snakeviz; faster calls are discarded.
+"""
+import cProfile
+import functools
+import inspect
+import os
+import re
+import threading
+import time
+
+from fastapi.routing import APIRoute
+
+import metrics
+
+DEFAULT_THRESHOLD_MS = 1000.0
+
+_profile_dir = os.environ.get("ABSA_PROFILE_DIR") or None
+_threshold_ms = float(os.environ.get("ABSA_PROFILE_THRESHOLD_MS", DEFAULT_THRESHOLD_MS))
+_counter = 0
+_counter_lock = threading.Lock()
+
+
+def configure(profile_dir=None, threshold_ms=None):
+    """Enable profiling into profile_dir (None disables it). Environment variables take precedence."""
+    global _profile_dir, _threshold_ms
+    _profile_dir = os.environ.get("ABSA_PROFILE_DIR") or profile_dir or None
+    env_threshold = os.environ.get("ABSA_PROFILE_THRESHOLD_MS")
+    if env_threshold:
+        _threshold_ms = float(env_threshold)
+    elif threshold_ms is not None:
+        _threshold_ms = float(threshold_ms)
+    if _profile_dir:
+        os.makedirs(_profile_dir, exist_ok=True)
+
+
+def settings():
+    """The current (profile_dir, threshold_ms), to restore them with configure()."""
+    return _profile_dir, _threshold_ms
+
+
+def is_enabled():
+    return _profile_dir is not None
+
+
+def _dump(profiler, name, elapsed_ms):
+    global _counter
+    with _counter_lock:
+        _counter += 1
+        counter = _counter
+    filename = f"{time.strftime('%Y%m%d-%H%M%S')}_{counter:04d}_{name}_{elapsed_ms:.0f}ms.prof"
+    path = os.path.join(_profile_dir, filename)
+    profiler.dump_stats(path)
+    print(f"🐢 Slow request profiled ({elapsed_ms:.0f} ms): {path}")
+
+
+def profile_slow_calls(endpoint, name):
+    """Wrap a sync endpoint so that slow calls are profiled while profiling is enabled."""
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        if _profile_dir is None:
+            return endpoint(*args, **kwargs)
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active (Python 3.12+ allows only one at a time, so this
+            # happens to concurrent requests); counted, so the profile directory is not taken as complete
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                if elapsed_ms >= _threshold_ms:
+                    metrics.PROFILED_CALLS.inc(result="skipped_slow")
+                    print(f"🐢 Slow request not profiled ({elapsed_ms:.0f} ms, {name}): another profile was active")
+                else:
+                    metrics.PROFILED_CALLS.inc(result="skipped")
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            profiler.disable()
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if elapsed_ms >= _threshold_ms:
+                metrics.PROFILED_CALLS.inc(result="written")
+                _dump(profiler, name, elapsed_ms)
+            else:
+                metrics.PROFILED_CALLS.inc(result="discarded")
+
+    return wrapper
+
+
+class ProfilingRoute(APIRoute):
+    """APIRoute that profiles slow calls of sync endpoints (async endpoints are left untouched)."""
+
+    def __init__(self, path, endpoint, **kwargs):
+        if not inspect.iscoroutinefunction(endpoint):
+            name = re.sub(r"[^A-Za-z0-9]+", "_", path).strip("_") or "root"
+            endpoint = profile_slow_calls(endpoint, name)
+        super().__init__(path, endpoint, **kwargs)
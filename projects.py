@@ -0,0 +1,303 @@
+"""
+Many annotation projects in one backend (annoabsa --projects projects.json).
+
+Every project listed in the projects file is served under
+/projects/{name}/... with the same API as a single-project backend (e.g.
+/projects/laptops/data/3), and the frontend selects one with ?project=name.
+GET /projects/ lists the projects.
+
+    {
+      "restaurants": {"data_path": "restaurants.csv", "config_path": "restaurants_config.json"},
+      "laptops": {"data_path": "laptops.json"}
+    }
+
+Relative paths are resolved against the directory of the projects file; a
+project without config_path uses the default configuration. The file is
+read again when it changes, so projects can be added without a restart.
+
+Each project runs on its own copy of the backend module (main.py) with its
+own data file, config, version counters, writer thread, timing sink, event
+channel and caches. A copy is loaded on the first request to its project
+and kept in an LRU; when the estimated memory of the loaded projects
+exceeds the budget, the least recently used ones are unloaded and loaded
+again on their next request. An unloaded copy stops taking requests at
+once and is shut down (its pending writes saved) when its running
+requests have finished.
+"""
+import importlib.util
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+
+DEFAULT_MEMORY_MB = 1024
+# Approximate memory of a loaded copy of the backend module itself (routes, models, middleware)
+MODULE_BYTES = 1024 * 1024
+NAME_PATTERN = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+_MAIN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+
+
+def load_definitions(projects_path):
+    """Read the projects file: {name: {"data_path", "config_path"}} with absolute paths."""
+    with open(projects_path, "r", encoding="utf-8") as f:
+        raw = json.load(f)
+    if not isinstance(raw, dict):
+        raise ValueError("The projects file must map project names to {\"data_path\": ..., \"config_path\": ...}")
+
+    base = os.path.dirname(os.path.abspath(projects_path))
+    definitions = {}
+    for name, entry in raw.items():
+        if not NAME_PATTERN.match(name):
+            raise ValueError(f"Invalid project name '{name}' (use letters, digits, '_', '-' and '.')")
+        if not isinstance(entry, dict) or not entry.get("data_path"):
+            raise ValueError(f"Project '{name}' needs a data_path")
+        data_path = os.path.join(base, entry["data_path"])
+        if os.path.splitext(data_path)[1].lower() not in (".csv", ".json"):
+            raise ValueError(f"Project '{name}': unsupported data file '{entry['data_path']}' (use .csv or .json)")
+        config_path = entry.get("config_path")
+        definitions[name] = {
+            "data_path": data_path,
+            "config_path": os.path.join(base, config_path) if config_path else None,
+        }
+    return definitions
+
+
+def load_backend(name, data_path, config_path):
+    """Load a new copy of the backend module configured for one project.
+
+    The copy runs the module's import-time setup again. Of the state it reads
+    there, the profiler settings are process-wide and restored afterwards; the
+    multi-project options are reset, as only the main backend hosts projects.
+    Worker processes (ABSA_WORKERS) are not isolated per copy, so --projects
+    cannot be combined with --workers.
+    """
+    import profiling
+    profiler_settings = profiling.settings()
+    spec = importlib.util.spec_from_file_location(f"absa_project_{name}", _MAIN_PATH)
+    backend = importlib.util.module_from_spec(spec)
+    try:
+        spec.loader.exec_module(backend)
+    finally:
+        profiling.configure(*profiler_settings)
+    if backend.WORKERS > 1:
+        raise RuntimeError("Projects cannot be hosted with more than one worker (--workers)")
+    backend.PROJECTS_FILE = backend.FRONTEND_DIR = None
+    backend.set_data_file(data_path)
+    backend.set_config_file(config_path)
+    # Like the configuration read at import time; set_config() would reconfigure the process-wide profiler
+    backend.CONFIG_DATA = backend.load_config() if config_path else {}
+    backend.AUTO_POSITIONS = backend.CONFIG_DATA.get("auto_positions", False)
+    if backend.AUTO_POSITIONS:
+        backend.start_auto_positions_job()
+    return backend
+
+
+class _Project:
+    """A loaded (or loading) copy of the backend and the requests currently running on it."""
+
+    def __init__(self, name, definition):
+        self.name = name
+        self.definition = definition
+        self.backend = None
+        self.error = None
+        self.ready = threading.Event()  # set once the backend is loaded or failed to load
+        self.stopped = threading.Event()  # set once an unloaded backend is shut down
+        self.active = 0  # requests running on the backend
+        self.retired = False  # unloaded: no new requests, shut down once active drops to 0
+
+
+class ProjectHost:
+    """ASGI app serving the projects of a projects file from an LRU of loaded backends.
+
+    Loading and shutting down a backend happen outside the host lock, so a
+    slow project does not hold up the requests of the others. An unloaded
+    backend is shut down only after its last running request has finished,
+    and the project is loaded again only after that shutdown, so there is
+    never more than one copy of a project writing its data file.
+    """
+
+    def __init__(self, projects_path, memory_budget_bytes=DEFAULT_MEMORY_MB * 1024 * 1024):
+        self.projects_path = projects_path
+        self.memory_budget_bytes = memory_budget_bytes
+        self._definitions = {}
+        self._definitions_mtime = None
+        self._loaded = OrderedDict()  # name -> _Project, least recently used first
+        self._retired = {}  # name -> unloaded _Project that is not shut down yet
+        self._lock = threading.Lock()
+        self.definitions()
+
+    def definitions(self):
+        """The project definitions, re-read when the projects file changes."""
+        mtime = os.stat(self.projects_path).st_mtime_ns
+        if mtime != self._definitions_mtime:
+            self._definitions = load_definitions(self.projects_path)
+            self._definitions_mtime = mtime
+        return self._definitions
+
+    def acquire(self, name):
+        """The loaded project for one request, loading it (and unloading others) if needed; None if unknown.
+
+        Every acquired project must be passed to release() once the request is done.
+        """
+        while True:
+            to_stop = []
+            with self._lock:
+                definition = self.definitions().get(name)
+                if definition is None:
+                    return None
+                project = self._loaded.get(name)
+                if project is not None and project.ready.is_set() and project.definition != definition:
+                    # The project now points to another file
+                    to_stop += self._retire(name)
+                    project = None
+                if project is None:
+                    previous = self._retired.get(name)
+                    if previous is None:
+                        project = self._loaded[name] = _Project(name, definition)
+                        load = True
+                else:
+                    self._loaded.move_to_end(name)
+                    load = False
+                if project is not None:
+                    project.active += 1
+            self._stop_all(to_stop)
+            if project is not None:
+                break
+            # The previous copy still finishes its requests and saves its pending writes
+            previous.stopped.wait()
+
+        if load:
+            self._load(project)
+        project.ready.wait()
+        if project.error is not None:
+            self.release(project)
+            raise project.error
+        with self._lock:
+            to_stop = self._evict()
+        self._stop_all(to_stop)
+        return project
+
+    def release(self, project):
+        """End a request on a project; shuts the backend down if it was unloaded meanwhile."""
+        self._stop_all(self._release(project))
+
+    def _release(self, project):
+        """End a request on a project; returns the projects the caller has to shut down with stop()."""
+        with self._lock:
+            project.active -= 1
+            return [project] if project.retired and project.active == 0 else []
+
+    def _load(self, project):
+        start = time.perf_counter()
+        try:
+            project.backend = load_backend(project.name, project.definition["data_path"],
+                                           project.definition["config_path"])
+            print(f"📂 Loaded project '{project.name}' ({project.definition['data_path']}) in "
+                  f"{(time.perf_counter() - start) * 1000:.0f} ms")
+        except Exception as e:
+            project.error = e
+            with self._lock:
+                if self._loaded.get(project.name) is project:
+                    del self._loaded[project.name]
+        finally:
+            project.ready.set()
+
+    def memory_usage(self):
+        """Estimated bytes per loaded project."""
+        return {name: MODULE_BYTES + project.backend.memory_usage() for name, project in self._loaded.items()
+                if project.backend is not None}
+
+    def _evict(self):
+        """Unload least recently used projects beyond the budget; the caller holds the lock and stops the result."""
+        usage = self.memory_usage()
+        total = sum(usage.values())
+        to_stop = []
+        # The most recently used project stays loaded even if it alone exceeds the budget
+        for name in [name for name in self._loaded if name in usage][:-1]:
+            if total <= self.memory_budget_bytes:
+                break
+            total -= usage[name]
+            to_stop += self._retire(name)
+            print(f"♻️  Unloaded project '{name}' (loaded projects use ~{total / 1024 ** 2:.0f} MB of "
+                  f"{self.memory_budget_bytes / 1024 ** 2:.0f} MB)")
+        return to_stop
+
+    def _retire(self, name):
+        """Stop routing requests to a loaded project; the caller holds the lock and stops the result, if any."""
+        project = self._loaded.pop(name)
+        project.retired = True
+        self._retired[name] = project
+        # End its event streams right away (clients reconnect to the next copy); they would keep it busy forever
+        project.backend.EVENTS.close()
+        return [project] if project.active == 0 else []
+
+    def stop(self, project):
+        """Shut down an unloaded project: saves pending writes and closes its timing sink."""
+        try:
+            project.backend.shutdown_event()
+        finally:
+            with self._lock:
+                if self._retired.get(project.name) is project:
+                    del self._retired[project.name]
+            project.stopped.set()
+
+    def _stop_all(self, projects):
+        for project in projects:
+            self.stop(project)
+
+    def close(self):
+        with self._lock:
+            projects = [project for project in self._loaded.values() if project.backend is not None]
+            projects += self._retired.values()
+            self._loaded.clear()
+            self._retired.clear()
+        for project in projects:
+            project.backend.shutdown_event()
+            project.stopped.set()
+
+    def summary(self):
+        with self._lock:
+            definitions = self.definitions()
+            usage = self.memory_usage()
+        return {
+            "projects": [{"name": name, "data_path": definition["data_path"], "loaded": name in usage,
+                          "estimated_bytes": usage.get(name)} for name, definition in definitions.items()],
+            "memory_budget_bytes": self.memory_budget_bytes,
+            "estimated_bytes": sum(usage.values()),
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            return
+        # Starlette 0.35+ keeps the full path under a mount and extends root_path, older releases
+        # pass only the rest of the path; both are reduced to the path below /projects
+        path, root_path = scope["path"], scope.get("root_path", "")
+        if root_path and path.startswith(root_path + "/"):
+            path = path[len(root_path):]
+        name, _, rest = path.lstrip("/").partition("/")
+        if not name:
+            await JSONResponse(await run_in_threadpool(self.summary))(scope, receive, send)
+            return
+        try:
+            project = await run_in_threadpool(self.acquire, name)
+        except Exception as e:
+            await JSONResponse({"detail": f"Could not load project '{name}': {e}"}, status_code=500)(
+                scope, receive, send)
+            return
+        if project is None:
+            await JSONResponse({"detail": f"Unknown project '{name}'"}, status_code=404)(scope, receive, send)
+            return
+        try:
+            # The project's app routes the rest of the path (e.g. /data/3). Passed without the prefix,
+            # which every Starlette release routes (newer ones fall back to it when path lacks root_path)
+            await project.backend.app({**scope, "path": "/" + rest, "root_path": root_path + "/" + name},
+                                      receive, send)
+        finally:
+            for retired in self._release(project):
+                await run_in_threadpool(self.stop, retired)
@@ -0,0 +1,225 @@
+"""
+Inverted index for GET /search over the item texts and their annotations.
+
+Texts are indexed by their lowercase tokens (the tokens of token_tables.py),
+annotations by the lowercase value of each of their string fields
+(aspect_term, aspect_category, sentiment_polarity, opinion_term). Both are
+posting lists in CSR form: one offset array and one sorted array of item
+indices (texts) or annotation codes (idx << 16 | position of the annotation
+in the label) for all keys, so a million items cost a few numpy arrays
+instead of a Python set per key. A query intersects the posting lists of
+its tokens and fields; fields are matched within one annotation, so
+aspect_category=food quality and sentiment_polarity=negative finds the
+items with a negative food quality annotation.
+
+Texts never change while a store lives, and an index built for a rebuilt
+store with the same texts takes over the text postings of the previous one. Labels change on every annotation write:
+set_label() records the new annotations of the item as an override that
+replaces its entries in the label postings, and the label postings are
+built again from the store once there are more than MAX_LABEL_OVERRIDES.
+"""
+import threading
+from array import array
+from collections import defaultdict
+
+import numpy as np
+
+from compact_store import LABEL_STRING_KEYS, PACKED
+from token_tables import TOKEN_PATTERN
+
+# Items with changed labels kept as overrides before the label postings are built again
+MAX_LABEL_OVERRIDES = 20000
+_POSITION_BITS = 16
+_EMPTY = np.zeros(0, dtype=np.int64)
+
+
+def query_tokens(text):
+    """The distinct lowercase tokens of a query, in order."""
+    return list(dict.fromkeys(TOKEN_PATTERN.findall(text.lower())))
+
+
+def _postings(keys, values, size):
+    """Posting lists of values by key (0 <= key < size) as (offsets, values); values must be ascending."""
+    order = np.argsort(keys, kind="stable")
+    offsets = np.searchsorted(keys[order], np.arange(size + 1))
+    return offsets.astype(np.int64), values[order]
+
+
+def _intersect(a, b):
+    """Values in both of two ascending arrays without duplicates (binary search of the shorter in the longer)."""
+    if len(a) > len(b):
+        a, b = b, a
+    if not len(a):
+        return a
+    found = np.searchsorted(b, a)
+    found[found == len(b)] = 0
+    return a[b[found] == a]
+
+
+def _annotation_entries(annotations):
+    """(field slot, lowercase value, annotation code position) of the string fields of a list of annotations."""
+    entries = []
+    if not isinstance(annotations, list):
+        return entries
+    for position, annotation in enumerate(annotations[:1 << _POSITION_BITS]):
+        if not isinstance(annotation, dict):
+            continue
+        for slot, key in enumerate(LABEL_STRING_KEYS):
+            value = annotation.get(key)
+            if isinstance(value, str):
+                entries.append((slot, value.lower(), position))
+    return entries
+
+
+class SearchIndex:
+    """Token and label posting lists of a CompactStore. Fill it with sync(store)."""
+
+    def __init__(self):
+        self._texts = None  # the StringColumn the text postings were built from
+        self._vocabulary = {}  # lowercase token -> key
+        self._text_offsets = np.zeros(1, dtype=np.int64)
+        self._text_items = np.zeros(0, dtype=np.int32)
+        self._values = {}  # lowercase label value -> id; the key of a field value is slot * len(_values) + id
+        self._label_offsets = np.zeros(1, dtype=np.int64)
+        self._label_codes = _EMPTY
+        self._overrides = {}  # idx -> entries of its annotations since the label postings were built
+        self._override_codes = defaultdict(set)  # (slot, lowercase value) -> annotation codes of overrides
+        self._overridden = np.zeros(0, dtype=bool)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._overridden)
+
+    @property
+    def stale(self):
+        """Whether the label postings should be built again (too many overrides)."""
+        return len(self._overrides) > MAX_LABEL_OVERRIDES
+
+    def sync(self, store, previous=None):
+        """Index the items of store. Returns the number of texts indexed (0 if they did not change).
+
+        The text postings of previous (an index that is still in use) are taken over if it indexed the same texts.
+        """
+        if previous is not None:
+            with previous._lock:
+                texts = previous._texts, previous._vocabulary, previous._text_offsets, previous._text_items
+        with self._lock:
+            if previous is not None:
+                self._texts, self._vocabulary, self._text_offsets, self._text_items = texts
+            indexed = 0
+            if self._texts is None or not (store.texts is self._texts or store.texts == self._texts):
+                self._index_texts(store.texts)
+                indexed = len(store.texts)
+            self._texts = store.texts
+            self._index_labels(store)
+            return indexed
+
+    def _index_texts(self, texts):
+        vocabulary = defaultdict()
+        vocabulary.default_factory = vocabulary.__len__
+        token_keys, counts = array("i"), array("I")
+        for idx in range(len(texts)):
+            tokens = set(TOKEN_PATTERN.findall(texts[idx].lower()))
+            token_keys.extend(map(vocabulary.__getitem__, tokens))
+            counts.append(len(tokens))
+        items = np.repeat(np.arange(len(texts), dtype=np.int32), np.frombuffer(counts, dtype=np.uint32))
+        self._text_offsets, self._text_items = _postings(
+            np.frombuffer(token_keys, dtype=np.int32), items, len(vocabulary))
+        self._vocabulary = dict(vocabulary)
+
+    def _index_labels(self, store):
+        states, starts, counts, shapes, values, shape_keys, strings, raw = store.packed_labels()
+        items = np.flatnonzero(np.frombuffer(states, dtype=np.uint8) == PACKED)
+        counts = np.frombuffer(counts, dtype=np.uint16).astype(np.int64)[items]
+        positions = np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts, counts)
+        tuples = np.repeat(np.frombuffer(starts, dtype=np.uint32).astype(np.int64)[items], counts) + positions
+        codes = (np.repeat(items.astype(np.int64), counts) << _POSITION_BITS) | positions
+        tuple_values = np.frombuffer(values, dtype=np.int32).reshape(-1, 8)[tuples]
+        shape_fields = np.array([[key in keys for key in LABEL_STRING_KEYS] for keys in shape_keys],
+                                dtype=bool).reshape(-1, len(LABEL_STRING_KEYS))
+        present = shape_fields[np.frombuffer(shapes, dtype=np.uint16)[tuples]]
+
+        value_ids = {}
+        lower_ids = np.array([value_ids.setdefault(string.lower(), len(value_ids)) for string in strings],
+                             dtype=np.int64)
+        raw_entries = [(slot, value_ids.setdefault(value, len(value_ids)), (idx << _POSITION_BITS) | position)
+                       for idx, annotations in raw.items()
+                       for slot, value, position in _annotation_entries(annotations)]
+        size = len(value_ids)
+        key_parts, code_parts = [], []
+        for slot in range(len(LABEL_STRING_KEYS)):
+            mask = present[:, slot]
+            key_parts.append(slot * size + lower_ids[tuple_values[mask, slot]])
+            code_parts.append(codes[mask])
+        if raw_entries:
+            raw_entries = np.array(raw_entries, dtype=np.int64)
+            key_parts.append(raw_entries[:, 0] * size + raw_entries[:, 1])
+            code_parts.append(raw_entries[:, 2])
+        keys, codes = np.concatenate(key_parts), np.concatenate(code_parts)
+        order = np.argsort(codes, kind="stable")
+        self._label_offsets, self._label_codes = _postings(keys[order], codes[order], len(LABEL_STRING_KEYS) * size)
+        self._values = value_ids
+        self._overrides = {}
+        self._override_codes = defaultdict(set)
+        self._overridden = np.zeros(len(store), dtype=bool)
+
+    def set_label(self, idx, annotations):
+        """Replace the indexed annotations of an item (as saved by POST /annotations)."""
+        with self._lock:
+            if not 0 <= idx < len(self._overridden):
+                return
+            for slot, value, position in self._overrides.get(idx, ()):
+                self._override_codes[(slot, value)].discard((idx << _POSITION_BITS) | position)
+            entries = _annotation_entries(annotations)
+            for slot, value, position in entries:
+                self._override_codes[(slot, value)].add((idx << _POSITION_BITS) | position)
+            self._overrides[idx] = entries
+            self._overridden[idx] = True
+
+    def _text_postings(self, token):
+        key = self._vocabulary.get(token)
+        if key is None:
+            return _EMPTY
+        return self._text_items[self._text_offsets[key]:self._text_offsets[key + 1]]
+
+    def _label_postings(self, slot, value):
+        value_id = self._values.get(value)
+        codes = _EMPTY
+        if value_id is not None:
+            key = slot * len(self._values) + value_id
+            codes = self._label_codes[self._label_offsets[key]:self._label_offsets[key + 1]]
+        if self._overrides:
+            codes = codes[~self._overridden[codes >> _POSITION_BITS]]
+            changed = self._override_codes.get((slot, value))
+            if changed:
+                changed = np.sort(np.fromiter(changed, dtype=np.int64, count=len(changed)))
+                codes = np.insert(codes, np.searchsorted(codes, changed), changed)
+        return codes
+
+    def search(self, text="", labels=None):
+        """Ascending indices of the items whose text contains all tokens of text and that have an
+        annotation with all field values of labels ({field: value}); both are matched case-insensitively."""
+        with self._lock:
+            result = None
+            if labels:
+                codes = None
+                for field, value in labels.items():
+                    field_codes = self._label_postings(LABEL_STRING_KEYS.index(field), value.lower())
+                    codes = field_codes if codes is None else _intersect(codes, field_codes)
+                result = codes >> _POSITION_BITS
+                result = result[np.concatenate(([True], result[1:] != result[:-1]))] if len(result) else result
+            # Rarest tokens first, so the intermediate results stay small
+            for postings in sorted(map(self._text_postings, query_tokens(text)), key=len):
+                result = postings if result is None else _intersect(result, postings)
+                if not len(result):
+                    break
+            return np.arange(len(self._overridden)) if result is None else result.astype(np.int64)
+
+    def nbytes(self):
+        """Approximate memory in bytes."""
+        with self._lock:
+            arrays = (self._text_offsets, self._text_items, self._label_offsets, self._label_codes, self._overridden)
+            return (sum(values.nbytes for values in arrays)
+                    + sum(len(token) + 100 for token in self._vocabulary)
+                    + sum(len(value) + 100 for value in self._values)
+                    + sum(150 * len(entries) + 100 for entries in self._overrides.values()))
@@ -0,0 +1,204 @@
+"""
+State shared between backend worker processes (annoabsa --workers N).
+
+With several uvicorn workers, every process has its own module globals.
+Two local files next to the data file keep them consistent:
+
+- "<data file>.lock": an exclusive fcntl lock held by a worker's writer
+  thread while it loads, changes and saves the data file, so writes from
+  different processes are serialized like writes within one process.
+- "<data file>.changes.jsonl": an append-only change feed. Every worker
+  appends a line per change (item written, whole dataset changed) and
+  replays the lines of all workers into its version counters, so all
+  workers compute the same ETags and invalidate the same cached state.
+
+- "<data file>.positions.json": snapshots of the auto-positions jobs
+  (see auto_positions.py), written by the worker that runs a job so that
+  every worker can report its progress. That worker holds a lock on
+  "<data file>.positions.json.lock" while the job runs, so only one job
+  runs at a time across all workers.
+
+Within one process, local_lock() serializes the writers of backends that
+share a data file (e.g. a project that is unloaded and loaded again while a
+write is still in flight, see projects.py).
+
+The timing events (see telemetry.py) are already an append-only file
+that every worker reads from its last offset.
+"""
+import json
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+LOCK_SUFFIX = ".lock"
+FEED_SUFFIX = ".changes.jsonl"
+JOBS_SUFFIX = ".positions.json"
+MAX_JOBS = 20
+
+_local_locks = {}
+_local_locks_lock = threading.Lock()
+
+
+def supports_multiple_workers():
+    return fcntl is not None
+
+
+def feed_path(data_path):
+    return data_path + FEED_SUFFIX
+
+
+def jobs_path(data_path):
+    return data_path + JOBS_SUFFIX
+
+
+def reset_change_feed(data_path):
+    """Start a new feed and job board for a new server instance (the counters restart with a new instance id)."""
+    for path in (feed_path(data_path), jobs_path(data_path)):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def local_lock(data_path):
+    """The lock of a data file shared by all backends of this process."""
+    key = os.path.abspath(data_path)
+    with _local_locks_lock:
+        return _local_locks.setdefault(key, threading.Lock())
+
+
+class FileLock:
+    """Exclusive lock on "<data file>.lock" across processes (and threads)."""
+
+    def __init__(self, data_path):
+        self.path = data_path + LOCK_SUFFIX
+        self._thread_lock = threading.Lock()
+        self._fd = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        try:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        except BaseException:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+            self._thread_lock.release()
+            raise
+        return self
+
+    def __exit__(self, *exc_info):
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+        finally:
+            self._fd = None
+            self._thread_lock.release()
+
+
+class ChangeFeed:
+    """Append-only JSONL feed of changes, read incrementally by every worker."""
+
+    def __init__(self, path):
+        self.path = path
+        self._offset = 0
+        self._lock = threading.Lock()
+
+    def append(self, change):
+        line = (json.dumps(change) + "\n").encode("utf-8")
+        # One write() on an O_APPEND descriptor: lines of concurrent writers never interleave
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+
+    def read_new(self):
+        """Changes appended (by any worker) since the last call; only complete lines are consumed."""
+        with self._lock:
+            try:
+                size = os.stat(self.path).st_size
+            except FileNotFoundError:
+                return []
+            if size <= self._offset:
+                return []
+            with open(self.path, "rb") as f:
+                f.seek(self._offset)
+                chunk = f.read(size - self._offset)
+            complete = chunk[:chunk.rfind(b"\n") + 1]
+            self._offset += len(complete)
+        return [json.loads(line) for line in complete.splitlines() if line.strip()]
+
+
+class JobBoard:
+    """Snapshots of the auto-positions jobs of all workers in "<data file>.positions.json"."""
+
+    def __init__(self, data_path):
+        self.path = jobs_path(data_path)
+        self._fd = None
+        self._lock = threading.Lock()
+
+    def claim_startup(self):
+        """Whether this worker is the first of the server instance to ask, and so runs the startup job."""
+        try:
+            fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        except FileExistsError:
+            return False
+        os.close(fd)
+        return True
+
+    def try_acquire(self):
+        """Take the right to run a job without waiting; False while a job runs in another worker."""
+        with self._lock:
+            if self._fd is not None:
+                return False
+            fd = os.open(self.path + LOCK_SUFFIX, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                return False
+            self._fd = fd
+            return True
+
+    def release(self):
+        with self._lock:
+            if self._fd is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+                os.close(self._fd)
+                self._fd = None
+
+    def read(self):
+        """job id -> snapshot, oldest first."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            # Not written yet (or only claimed at startup)
+            return {}
+
+    def latest(self):
+        jobs = self.read()
+        return list(jobs.values())[-1] if jobs else None
+
+    def write(self, snapshot):
+        """Add or update the snapshot of a job; called only by the worker that holds the job lock."""
+        jobs = self.read()
+        jobs[snapshot["job_id"]] = snapshot
+        while len(jobs) > MAX_JOBS:
+            del jobs[next(iter(jobs))]
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(jobs, f)
+        os.replace(temp_path, self.path)
+
+    def version(self):
+        """Changes whenever a snapshot is written, so workers notice progress made elsewhere."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
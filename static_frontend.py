@@ -0,0 +1,124 @@
+"""
+Serving the built frontend from the backend (annoabsa --serve).
+
+The Vite build (frontend/build) is served by FastAPI on the backend port.
+Text assets are precompressed once with gzip (and brotli, if the optional
+`brotli` package is installed) and the compressed file is sent when the
+client accepts it. Vite's content-hashed files under assets/ are cached
+as immutable; everything else, in particular index.html, is revalidated.
+"""
+import gzip
+import mimetypes
+import os
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {".html", ".js", ".mjs", ".css", ".json", ".svg", ".txt", ".map", ".xml", ".webmanifest"}
+MIN_COMPRESS_SIZE = 1024
+IMMUTABLE_PREFIX = "assets" + os.sep
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+
+def _write_if_smaller(path, data, original_size):
+    if len(data) < original_size:
+        with open(path, "wb") as f:
+            f.write(data)
+        return True
+    return False
+
+
+def accepted_encodings(header):
+    """The content codings a client accepts according to its Accept-Encoding header (q=0 excludes one)."""
+    accepted = set()
+    for part in header.split(","):
+        coding, *params = [piece.strip() for piece in part.split(";")]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding and quality > 0:
+            accepted.add(coding.lower())
+    if "*" in accepted:
+        # Any coding that is not listed explicitly
+        listed = {piece.split(";")[0].strip().lower() for piece in header.split(",")}
+        accepted |= {coding for coding in ("br", "gzip") if coding not in listed}
+    return accepted
+
+
+def precompress(directory):
+    """Write .gz (and .br) siblings for compressible files that are missing or outdated. Returns the count written."""
+    written = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            path = os.path.join(root, name)
+            if os.path.splitext(name)[1] not in COMPRESSIBLE_EXTENSIONS:
+                continue
+            stat = os.stat(path)
+            if stat.st_size < MIN_COMPRESS_SIZE:
+                continue
+            with open(path, "rb") as f:
+                data = f.read()
+            targets = [(".gz", lambda d: gzip.compress(d, compresslevel=9, mtime=0))]
+            if brotli is not None:
+                targets.append((".br", lambda d: brotli.compress(d, quality=11)))
+            for suffix, compress in targets:
+                target = path + suffix
+                if os.path.exists(target) and os.stat(target).st_mtime >= stat.st_mtime:
+                    continue
+                written += _write_if_smaller(target, compress(data), stat.st_size)
+    return written
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles that prefers precompressed .br/.gz files and sets cache headers."""
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        request_headers = Headers(scope=scope)
+        accepted = accepted_encodings(request_headers.get("accept-encoding", ""))
+        media_type = mimetypes.guess_type(str(full_path))[0] or "text/plain"
+
+        response = None
+        for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+            if encoding not in accepted:
+                continue
+            try:
+                compressed_stat = os.stat(str(full_path) + suffix)
+            except OSError:
+                continue
+            response = FileResponse(str(full_path) + suffix, status_code=status_code, stat_result=compressed_stat,
+                                    media_type=media_type, headers={"Content-Encoding": encoding})
+            break
+        if response is None:
+            response = FileResponse(full_path, status_code=status_code, stat_result=stat_result,
+                                    media_type=media_type)
+
+        relative_path = os.path.relpath(str(full_path), str(self.directory))
+        response.headers["Cache-Control"] = (IMMUTABLE_CACHE_CONTROL if relative_path.startswith(IMMUTABLE_PREFIX)
+                                             else REVALIDATE_CACHE_CONTROL)
+        response.headers["Vary"] = "Accept-Encoding"
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+def mount_frontend(app, directory):
+    """Precompress and mount a built frontend at / (after all API routes, so they take precedence)."""
+    index_path = os.path.join(directory, "index.html")
+    if not os.path.exists(index_path):
+        raise FileNotFoundError(
+            f"{index_path} not found. Build the frontend first: cd frontend && npm install && npm run build")
+    written = precompress(directory)
+    app.mount("/", PrecompressedStaticFiles(directory=directory, html=True), name="frontend")
+    return written
@@ -0,0 +1,177 @@
+"""
+Append-only store for annotation timing events.
+
+POST /timing appends one JSON line per event to "<data file>.timings.jsonl"
+instead of rewriting the whole data file, so recording a timing never
+contends with annotation writes. Each line carries a UTC timestamp, the
+item index, the session id and the {duration, change} entry:
+
+    {"timestamp": "2026-10-19T12:00:00.000Z", "data_idx": 3, "session_id": "s1", "duration": 12.4, "change": true}
+
+Lines are flushed to the OS immediately; fsync is batched (every
+FSYNC_BATCH events or FSYNC_INTERVAL seconds). The events are merged into
+the items' "timings" field only on export (GET /export or annoabsa --export).
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+SUFFIX = ".timings.jsonl"
+FSYNC_BATCH = 50
+FSYNC_INTERVAL = 1.0
+
+
+def sink_path(data_path):
+    return data_path + SUFFIX
+
+
+def utc_timestamp():
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+class TimingSink:
+    """Appends timing events to a JSONL file with batched fsync."""
+
+    def __init__(self, path, fsync_batch=FSYNC_BATCH, fsync_interval=FSYNC_INTERVAL):
+        self.path = path
+        self.fsync_batch = fsync_batch
+        self.fsync_interval = fsync_interval
+        self._file = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._thread = None
+
+    def append(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+                self._thread = threading.Thread(target=self._sync_periodically, daemon=True)
+                self._thread.start()
+            self._file.write(line)
+            self._file.flush()
+            self._pending += 1
+            if self._pending >= self.fsync_batch:
+                self._sync_locked()
+
+    def sync(self):
+        with self._lock:
+            self._sync_locked()
+
+    def _sync_locked(self):
+        if self._file is not None and self._pending:
+            os.fsync(self._file.fileno())
+            self._pending = 0
+
+    def _sync_periodically(self):
+        while not self._closed.wait(self.fsync_interval):
+            self.sync()
+
+    def close(self):
+        self._closed.set()
+        with self._lock:
+            self._sync_locked()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def read_events(path):
+    """Yield the events of a timings JSONL file; a torn last line (e.g. after a crash) is skipped."""
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(event, dict):
+                yield event
+
+
+def read_new_events(path, offset):
+    """Events appended after byte offset (complete lines only) and the offset to continue from."""
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return [], offset
+    if size <= offset:
+        return [], offset
+    with open(path, "rb") as f:
+        f.seek(offset)
+        chunk = f.read(size - offset)
+    complete = chunk[:chunk.rfind(b"\n") + 1]
+    events = []
+    for line in complete.splitlines():
+        try:
+            event = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(event, dict):
+            events.append(event)
+    return events, offset + len(complete)
+
+
+def timing_entry(event):
+    """The entry stored in an item's "timings" list for an event."""
+    return {key: value for key, value in event.items() if key != "data_idx" and value is not None}
+
+
+def merge_timings(data, events, file_type):
+    """Append the events to the "timings" of their items (JSON list or CSV JSON string). Returns the count merged."""
+    by_index = {}
+    for event in events:
+        idx = event.get("data_idx")
+        if isinstance(idx, int) and 0 <= idx < len(data):
+            by_index.setdefault(idx, []).append(timing_entry(event))
+
+    if file_type != "json" and by_index:
+        # An empty or missing column is read as float NaN; timings are JSON strings
+        data["timings"] = data["timings"].astype(object) if "timings" in data.columns else ""
+
+    for idx, entries in by_index.items():
+        if file_type == "json":
+            item = data[idx]
+            if not isinstance(item.get("timings"), list):
+                item["timings"] = []
+            item["timings"].extend(entries)
+        else:
+            existing = data.at[idx, "timings"]
+            try:
+                timings = json.loads(existing) if isinstance(existing, str) and existing else []
+            except json.JSONDecodeError:
+                timings = []
+            data.at[idx, "timings"] = json.dumps(timings + entries, ensure_ascii=False)
+    return sum(len(entries) for entries in by_index.values())
+
+
+def export_data(data_path, output_path):
+    """Write the data file with all recorded timing events merged in to output_path. Returns the count merged."""
+    file_type = "json" if data_path.endswith(".json") else "csv"
+    if os.path.splitext(output_path)[1].lower() != os.path.splitext(data_path)[1].lower():
+        raise ValueError(f"Export must use the format of the data file ({file_type})")
+    if os.path.abspath(output_path) == os.path.abspath(data_path):
+        # The events would stay in the JSONL file and be counted twice
+        raise ValueError("Export to a different file than the data file")
+
+    start = time.perf_counter()
+    if file_type == "json":
+        with open(data_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    else:
+        import pandas as pd
+        data = pd.read_csv(data_path, encoding="utf-8")
+    merged = merge_timings(data, read_events(sink_path(data_path)), file_type)
+
+    if file_type == "json":
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+    else:
+        data.to_csv(output_path, index=False, encoding="utf-8")
+    print(f"📤 Exported {data_path} with {merged} timing entries to {output_path} "
+          f"({(time.perf_counter() - start) * 1000:.0f} ms)")
+    return merged
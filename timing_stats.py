@@ -0,0 +1,159 @@
+"""
+Running statistics of annotation timings.
+
+The backend keeps one TimingStats per dataset and updates it on every
+POST /timing, so /avg-annotation-time and /timing-stats answer in O(1)
+instead of scanning (and, for CSV, JSON-decoding) every timings cell.
+
+Each group keeps count, sum, min and max, Welford's running mean and
+variance, and P² estimators (Jain & Chlamtac, 1985) for p50, p90 and p99,
+which need five markers per quantile regardless of the number of entries.
+"""
+import math
+import threading
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class P2Quantile:
+    """Streaming estimate of one quantile with the P² algorithm."""
+
+    def __init__(self, p):
+        self.p = p
+        self.heights = []
+        self.positions = [0, 1, 2, 3, 4]
+        self.desired = [0, 2 * p, 4 * p, 2 + 2 * p, 4]
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, x):
+        q = self.heights
+        if len(q) < 5:
+            q.append(x)
+            q.sort()
+            return
+
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = next(i for i in range(4) if x < q[i + 1])
+
+        n = self.positions
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        for i in (1, 2, 3):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                candidate = self._parabolic(i, d)
+                if not q[i - 1] < candidate < q[i + 1]:
+                    candidate = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = candidate
+                n[i] += d
+
+    def _parabolic(self, i, d):
+        q, n = self.heights, self.positions
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+
+    def value(self):
+        q = self.heights
+        if not q:
+            return None
+        if len(q) < 5:
+            # Exact (nearest-rank) quantile of the first few entries
+            return q[min(len(q) - 1, max(0, math.ceil(self.p * len(q)) - 1))]
+        return q[2]
+
+
+class RunningStats:
+    """Count, sum, min/max, Welford mean/variance and P² quantiles of a stream of durations."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = None
+        self.max = None
+        self.quantiles = [P2Quantile(p) for p in QUANTILES]
+
+    def add(self, x):
+        self.count += 1
+        self.total += x
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (x - self.mean)
+        self.min = x if self.min is None else min(self.min, x)
+        self.max = x if self.max is None else max(self.max, x)
+        for quantile in self.quantiles:
+            quantile.add(x)
+
+    def std(self):
+        return math.sqrt(self._m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def summary(self):
+        def rounded(value):
+            return round(value, 2) if value is not None else None
+
+        result = {
+            "count": self.count,
+            "total_duration": rounded(self.total),
+            "mean": rounded(self.mean),
+            "std": rounded(self.std()),
+            "min": rounded(self.min),
+            "max": rounded(self.max),
+        }
+        for quantile in self.quantiles:
+            result[f"p{round(quantile.p * 100)}"] = rounded(quantile.value())
+        return result
+
+
+class TimingStats:
+    """Timing statistics of one dataset, overall and by session_id and by change."""
+
+    def __init__(self):
+        self.overall = RunningStats()
+        self.by_session = {}
+        self.by_change = {}
+        self.lock = threading.Lock()
+
+    def add(self, entry):
+        """Add one timing entry ({"duration", "change", optional "session_id"}); invalid entries are skipped."""
+        if not isinstance(entry, dict):
+            return
+        try:
+            duration = float(entry["duration"])
+        except (KeyError, TypeError, ValueError):
+            return
+        session = entry.get("session_id") or "none"
+        change = "true" if entry.get("change") else "false"
+        with self.lock:
+            self.overall.add(duration)
+            self.by_session.setdefault(session, RunningStats()).add(duration)
+            self.by_change.setdefault(change, RunningStats()).add(duration)
+
+    def average(self):
+        """The /avg-annotation-time payload."""
+        with self.lock:
+            return {
+                "avg_annotation_time": round(self.overall.mean, 2),
+                "total_entries": self.overall.count,
+                "total_duration": round(self.overall.total, 2)
+            }
+
+    def summary(self):
+        """Overall, per-session and per-change statistics."""
+        with self.lock:
+            return {
+                "overall": self.overall.summary(),
+                "by_session": {session: stats.summary() for session, stats in sorted(self.by_session.items())},
+                "by_change": {change: stats.summary() for change, stats in sorted(self.by_change.items())},
+            }
@@ -0,0 +1,107 @@
+"""
+Token tables: the tokens of an item's text as offset arrays.
+
+A TokenTable is computed once per item and cached by the CompactStore
+(store.tokens(idx)), so resolving phrase positions, enumerating the
+candidate phrases of the structured-output schema and snapping clicks to
+tokens in the frontend no longer re-scan or re-lowercase the text.
+
+Tokens are maximal runs of characters that are neither whitespace nor
+punctuation, with the same boundaries as the frontend's click-on-token
+snapping. Offsets are character (code point) indices with an inclusive
+end, like at_start/at_end.
+"""
+import re
+from array import array
+
+# Keep in sync with isTokenBoundary in frontend/src/App.tsx
+TOKEN_PATTERN = re.compile(r"[^\s.,;:!?¡¿\"'`´„«»()\[\]{}]+")
+# Candidate phrases start after whitespace or before punctuation that follows a word
+PHRASE_SPLIT_PATTERN = re.compile(r'(?<=\w)(?=[,\.\!\?\;\:])|[\s]+')
+PHRASE_EDGES_PATTERN = re.compile(r'[\w].*[\w]$')
+
+
+class TokenTable:
+    """Token offsets, lowercase forms and phrase split positions of one text."""
+
+    __slots__ = ("text", "starts", "ends", "_lower_text", "_lower", "_phrase_splits", "_valid_phrases")
+
+    def __init__(self, text):
+        self.text = text
+        self.starts = array("I")
+        self.ends = array("I")
+        for match in TOKEN_PATTERN.finditer(text):
+            self.starts.append(match.start())
+            self.ends.append(match.end() - 1)
+        self._lower_text = None
+        self._lower = None
+        self._phrase_splits = None
+        self._valid_phrases = None
+
+    def __len__(self):
+        return len(self.starts)
+
+    @property
+    def lower_text(self):
+        if self._lower_text is None:
+            self._lower_text = self.text.lower()
+        return self._lower_text
+
+    @property
+    def lower(self):
+        """Lowercase form of each token."""
+        if self._lower is None:
+            text = self.text
+            self._lower = tuple(text[start:end + 1].lower() for start, end in zip(self.starts, self.ends))
+        return self._lower
+
+    def offsets(self):
+        """[[start, end], ...] of all tokens, as returned by /data."""
+        return [[start, end] for start, end in zip(self.starts, self.ends)]
+
+    def find(self, phrase):
+        """(start, end) of the first occurrence of phrase, case-sensitive first; (None, None) if absent."""
+        if not phrase or phrase == "NULL" or not self.text:
+            return None, None
+        index = self.text.find(phrase)
+        if index == -1:
+            index = self.lower_text.find(phrase.lower())
+        if index == -1:
+            return None, None
+        return index, index + len(phrase) - 1
+
+    def phrase_splits(self):
+        if self._phrase_splits is None:
+            self._phrase_splits = [0] + [match.end() for match in PHRASE_SPLIT_PATTERN.finditer(self.text)]
+        return self._phrase_splits
+
+    def valid_phrases(self, max_tokens_in_phrase=None):
+        """All phrases between two split positions that start and end with a word character."""
+        if max_tokens_in_phrase is None and self._valid_phrases is not None:
+            return list(self._valid_phrases)
+        text, splits = self.text, self.phrase_splits()
+        # Without a limit every phrase qualifies: it has fewer words than there are split positions
+        limit = max_tokens_in_phrase if max_tokens_in_phrase is not None and max_tokens_in_phrase < len(splits) else None
+        phrases = []
+        for i, start in enumerate(splits):
+            for end in splits[i + 1:]:
+                phrase = text[start:end].strip()
+                if (phrase and (limit is None or len(phrase.split()) <= limit)
+                        and PHRASE_EDGES_PATTERN.match(phrase)):
+                    phrases.append(phrase)
+        if max_tokens_in_phrase is None:
+            self._valid_phrases = tuple(phrases)
+        return phrases
+
+    def nbytes(self):
+        """Approximate memory in bytes (without the text, which the store already holds)."""
+        size = 2 * self.starts.itemsize * len(self.starts) + 200
+        if self._lower_text is not None:
+            size += len(self._lower_text) + 50
+        if self._lower is not None:
+            size += sum(len(token) + 50 for token in self._lower)
+        if self._phrase_splits is not None:
+            size += 36 * len(self._phrase_splits)
+        if self._valid_phrases is not None:
+            size += sum(len(phrase) + 58 for phrase in self._valid_phrases)
+        return size
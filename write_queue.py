@@ -0,0 +1,127 @@
+"""
+Serialized writes to the data file.
+
+Every change to the data file goes through one WriteQueue, whose single
+writer thread is the only code that saves the file. Requests put a job on
+the queue and wait for it. The writer takes every job that is queued,
+loads the data once, applies the jobs in order and saves once, so
+concurrent annotators never overwrite each other's changes and a burst of
+writes costs one save instead of one per request (group commit).
+
+With several worker processes, lock() returns an exclusive lock on the
+data file (see shared_state.py) that is held from load to save, so the
+writers of different processes are serialized as well.
+
+A job is a function that mutates the loaded data and returns whether it
+changed anything. A job that raises fails alone: it must validate its
+input before mutating, the other jobs of the group are still saved.
+A job may come with an applied() callback that updates the in-memory
+state (the compact store and what is built on it) once the job is saved.
+The writer calls these in queue order while it still holds the lock, so
+memory receives concurrent changes in the same order as the file.
+"""
+import contextlib
+import queue
+import threading
+
+import metrics
+
+
+class _Job:
+    def __init__(self, apply, applied=None):
+        self.apply = apply
+        self.applied = applied
+        self.error = None
+        self.done = threading.Event()
+
+
+class WriteQueue:
+    """Single-writer queue: load(), the queued jobs, one save(data), their applied(), then after_save(data).
+
+    lock is a function returning a context manager held around load and save.
+    """
+
+    def __init__(self, load, save, after_save=None, lock=contextlib.nullcontext):
+        self.load = load
+        self.save = save
+        self.after_save = after_save
+        self.lock = lock
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, apply, applied=None):
+        """Run apply(data) on the writer thread; blocks until the data is saved and re-raises its error.
+
+        applied() runs on the writer thread after the save if apply changed the data.
+        """
+        job = _Job(apply, applied)
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, args=(self._queue,), name="absa-writer",
+                                                daemon=True)
+                self._thread.start()
+            self._queue.put(job)
+        job.done.wait()
+        if job.error is not None:
+            raise job.error
+
+    def close(self):
+        """Stop the writer thread once the queued jobs are saved. A later submit() starts a new one."""
+        with self._start_lock:
+            thread, jobs = self._thread, self._queue
+            self._thread, self._queue = None, queue.Queue()
+            if thread is not None:
+                jobs.put(None)
+        if thread is not None:
+            thread.join()
+
+    def _run(self, jobs_queue):
+        while True:
+            jobs = [jobs_queue.get()]
+            while True:
+                try:
+                    jobs.append(jobs_queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in jobs
+            jobs = [job for job in jobs if job is not None]
+            try:
+                self._write(jobs)
+            finally:
+                for job in jobs:
+                    job.done.set()
+            if stop:
+                return
+
+    def _write(self, jobs):
+        try:
+            with self.lock():
+                data = self.load()
+                changed = []
+                for job in jobs:
+                    try:
+                        if job.apply(data):
+                            changed.append(job)
+                    except Exception as e:
+                        job.error = e
+                if not changed:
+                    return
+                self.save(data)
+                for job in changed:
+                    if job.applied is not None:
+                        try:
+                            job.applied()
+                        except Exception as e:
+                            print(f"⚠️  Error applying a saved change: {e}")
+        except Exception as e:
+            # Loading or saving failed: none of the jobs was persisted
+            for job in jobs:
+                job.error = job.error or e
+            return
+        metrics.WRITE_BATCH_SIZE.observe(len(changed))
+        if self.after_save is not None:
+            try:
+                self.after_save(data)
+            except Exception as e:
+                print(f"⚠️  Error after saving: {e}")